@@ -0,0 +1,31 @@
+"""ads: unique (ad_id, message_id) on ad_runs
+
+Revision ID: 5a1f3c9d2e71
+Revises: 83c39fe151aa
+Create Date: 2026-10-19 14:02:51.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1f3c9d2e71'
+down_revision: Union[str, Sequence[str], None] = '83c39fe151aa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # дубликаты от повторных отчётов постера: оставляем самую раннюю строку
+    op.execute(
+        "DELETE r FROM ad_runs r "
+        "JOIN ad_runs k ON k.ad_id = r.ad_id AND k.message_id = r.message_id AND k.id < r.id"
+    )
+    op.create_unique_constraint("uq_ad_runs_ad_message", "ad_runs", ["ad_id", "message_id"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_ad_runs_ad_message", "ad_runs", type_="unique")
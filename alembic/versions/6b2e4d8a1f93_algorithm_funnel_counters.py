@@ -0,0 +1,43 @@
+"""algo: algorithm_funnel_counters
+
+Revision ID: 6b2e4d8a1f93
+Revises: 5a1f3c9d2e71
+Create Date: 2026-10-19 16:40:12.203771
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6b2e4d8a1f93'
+down_revision: Union[str, Sequence[str], None] = '5a1f3c9d2e71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # счётчики воронки онбординга: total, basic, advanced, step:<n>; строка reconcile — маркер сверки
+    op.create_table(
+        "algorithm_funnel_counters",
+        sa.Column("name", sa.String(32), primary_key=True),
+        sa.Column("cnt", sa.BigInteger, nullable=False, server_default=sa.text("0")),
+        sa.Column("reconciled_at", sa.DateTime(timezone=False), nullable=True),
+    )
+    # стартовые значения — один GROUP BY при миграции, дальше только дельты и сверка
+    op.execute(
+        "INSERT INTO algorithm_funnel_counters (name, cnt) "
+        "SELECT CONCAT('step:', current_step), COUNT(*) FROM user_algorithm_progress GROUP BY current_step"
+    )
+    op.execute(
+        "INSERT INTO algorithm_funnel_counters (name, cnt) "
+        "SELECT 'total', COUNT(*) FROM user_algorithm_progress "
+        "UNION ALL SELECT 'basic', COALESCE(SUM(basic_completed), 0) FROM user_algorithm_progress "
+        "UNION ALL SELECT 'advanced', COALESCE(SUM(advanced_completed), 0) FROM user_algorithm_progress"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("algorithm_funnel_counters")
@@ -0,0 +1,30 @@
+"""broadcasts: content version
+
+Revision ID: 7b6756e6a638
+Revises: 8a90eb7b9089
+Create Date: 2026-10-19 03:02:55.054576
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b6756e6a638'
+down_revision: Union[str, Sequence[str], None] = '8a90eb7b9089'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # версия контента — ключ кеша скомпилированного плана отправки
+    op.add_column(
+        "broadcasts",
+        sa.Column("version", sa.Integer(), nullable=False, server_default=sa.text("1")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("broadcasts", "version")
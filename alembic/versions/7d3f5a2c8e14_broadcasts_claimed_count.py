@@ -0,0 +1,43 @@
+"""broadcasts: claimed_count
+
+Revision ID: 7d3f5a2c8e14
+Revises: 6b2e4d8a1f93
+Create Date: 2026-10-19 19:12:47.518309
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f5a2c8e14'
+down_revision: Union[str, Sequence[str], None] = '6b2e4d8a1f93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "broadcasts",
+        sa.Column("claimed_count", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+
+    # Бэкфилл по текущим арендам (ix_bdeliveries_broadcast_status)
+    op.execute(
+        """
+        UPDATE broadcasts b
+        JOIN (
+            SELECT broadcast_id, COUNT(*) AS claimed_count
+            FROM broadcast_deliveries
+            WHERE status = 'claimed'
+            GROUP BY broadcast_id
+        ) d ON d.broadcast_id = b.id
+        SET b.claimed_count = d.claimed_count
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("broadcasts", "claimed_count")
@@ -0,0 +1,42 @@
+"""ads: ad_runs log with delete_at index
+
+Revision ID: 83c39fe151aa
+Revises: b3476368193d
+Create Date: 2026-10-19 03:11:36.047017
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '83c39fe151aa'
+down_revision: Union[str, Sequence[str], None] = 'b3476368193d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # журнал публикаций объявлений; delete_at — когда сообщение пора удалить
+    op.create_table(
+        "ad_runs",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column("ad_id", sa.Integer, sa.ForeignKey("ads.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("chat_id", sa.BigInteger, nullable=False),
+        sa.Column("thread_id", sa.Integer, nullable=True),
+        sa.Column("message_id", sa.BigInteger, nullable=False),
+        sa.Column("slot_at", sa.DateTime(timezone=False), nullable=True),
+        sa.Column("posted_at", sa.DateTime(timezone=False), nullable=False),
+        sa.Column("delete_at", sa.DateTime(timezone=False), nullable=True),
+        sa.Column("deleted_at", sa.DateTime(timezone=False), nullable=True),
+    )
+    op.create_index("ix_ad_runs_ad_id", "ad_runs", ["ad_id", "posted_at"])
+    op.create_index("ix_ad_runs_delete_due", "ad_runs", ["deleted_at", "delete_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ad_runs_delete_due", table_name="ad_runs")
+    op.drop_index("ix_ad_runs_ad_id", table_name="ad_runs")
+    op.drop_table("ad_runs")
@@ -0,0 +1,56 @@
+"""broadcast_deliveries: claimed status + lease columns
+
+Revision ID: 84d8203e8915
+Revises: 0dcc207988b8
+Create Date: 2026-10-19 02:57:47.500929
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '84d8203e8915'
+down_revision: Union[str, Sequence[str], None] = '0dcc207988b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+_OLD_STATUSES = ("pending", "sent", "failed", "skipped")
+_NEW_STATUSES = ("pending", "claimed", "sent", "failed", "skipped")
+
+
+def upgrade() -> None:
+    # claimed — строка выдана воркеру под аренду (lease_until), ещё не отчитана
+    op.alter_column(
+        "broadcast_deliveries",
+        "status",
+        existing_type=sa.Enum(*_OLD_STATUSES, name="delivery_status"),
+        type_=sa.Enum(*_NEW_STATUSES, name="delivery_status"),
+        existing_nullable=False,
+        existing_server_default="pending",
+    )
+    op.add_column("broadcast_deliveries", sa.Column("lease_until", sa.DateTime(timezone=False), nullable=True))
+    op.add_column("broadcast_deliveries", sa.Column("claimed_by", sa.String(64), nullable=True))
+
+    # для reaper'а: status='claimed' AND lease_until < now
+    op.create_index("ix_bdeliveries_status_lease", "broadcast_deliveries", ["status", "lease_until"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_bdeliveries_status_lease", table_name="broadcast_deliveries")
+    op.drop_column("broadcast_deliveries", "claimed_by")
+    op.drop_column("broadcast_deliveries", "lease_until")
+
+    # невыполненные аренды возвращаем в очередь, иначе ENUM не сузить
+    op.execute("UPDATE broadcast_deliveries SET status = 'pending' WHERE status = 'claimed'")
+    op.alter_column(
+        "broadcast_deliveries",
+        "status",
+        existing_type=sa.Enum(*_NEW_STATUSES, name="delivery_status"),
+        type_=sa.Enum(*_OLD_STATUSES, name="delivery_status"),
+        existing_nullable=False,
+        existing_server_default="pending",
+    )
@@ -0,0 +1,32 @@
+"""user_subscriptions: indexes on kind flags
+
+Revision ID: 8a90eb7b9089
+Revises: bf826c400739
+Create Date: 2026-10-19 03:01:31.234456
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a90eb7b9089'
+down_revision: Union[str, Sequence[str], None] = 'bf826c400739'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+_KINDS = ("news", "meetings", "important")
+
+
+def upgrade() -> None:
+    # выборка «все подписчики kind» по индексу (flag, user_id) в порядке user_id — keyset-чанки без filesort
+    for kind in _KINDS:
+        op.create_index(f"ix_usubs_{kind}", "user_subscriptions", [f"{kind}_enabled", "user_id"])
+
+
+def downgrade() -> None:
+    for kind in reversed(_KINDS):
+        op.drop_index(f"ix_usubs_{kind}", table_name="user_subscriptions")
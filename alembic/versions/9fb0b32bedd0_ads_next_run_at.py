@@ -0,0 +1,29 @@
+"""ads: next_run_at + due index
+
+Revision ID: 9fb0b32bedd0
+Revises: b3089e4105b4
+Create Date: 2026-10-19 03:07:59.498801
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9fb0b32bedd0'
+down_revision: Union[str, Sequence[str], None] = 'b3089e4105b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # следующее срабатывание объявления; NULL — выключено/расписание исчерпано
+    op.add_column("ads", sa.Column("next_run_at", sa.DateTime(timezone=False), nullable=True))
+    op.create_index("ix_ads_due", "ads", ["enabled", "next_run_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ads_due", table_name="ads")
+    op.drop_column("ads", "next_run_at")
@@ -0,0 +1,48 @@
+"""broadcasts: finished_at/archived_at + broadcast_deliveries_archive
+
+Revision ID: b3089e4105b4
+Revises: 7b6756e6a638
+Create Date: 2026-10-19 03:06:05.431605
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3089e4105b4'
+down_revision: Union[str, Sequence[str], None] = '7b6756e6a638'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # момент завершения (sent/failed) — от него отсчитывается срок архивации
+    op.add_column("broadcasts", sa.Column("finished_at", sa.DateTime(timezone=False), nullable=True))
+    op.add_column("broadcasts", sa.Column("archived_at", sa.DateTime(timezone=False), nullable=True))
+    op.create_index("ix_broadcasts_status_finished", "broadcasts", ["status", "finished_at"])
+    # уже завершённые рассылки: берём updated_at как приближение
+    op.execute("UPDATE broadcasts SET finished_at = updated_at WHERE status IN ('sent', 'failed')")
+
+    # компактный архив доставок: без суррогатного id, аренды и текста ошибки
+    op.create_table(
+        "broadcast_deliveries_archive",
+        sa.Column("broadcast_id", sa.Integer, nullable=False),
+        sa.Column("user_id", sa.BigInteger, nullable=False),
+        sa.Column("status", sa.Enum("pending", "claimed", "sent", "failed", "skipped", name="delivery_archive_status"), nullable=False),
+        sa.Column("attempts", sa.SmallInteger, nullable=False, server_default="0"),
+        sa.Column("error_code", sa.String(64), nullable=True),
+        sa.Column("message_id", sa.BigInteger, nullable=True),
+        sa.Column("sent_at", sa.DateTime(timezone=False), nullable=True),
+        sa.PrimaryKeyConstraint("broadcast_id", "user_id"),
+        mysql_row_format="COMPRESSED",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("broadcast_deliveries_archive")
+    op.drop_index("ix_broadcasts_status_finished", table_name="broadcasts")
+    op.drop_column("broadcasts", "archived_at")
+    op.drop_column("broadcasts", "finished_at")
@@ -0,0 +1,43 @@
+"""ads: ad_random_slots + ad_random_branches.last_rebuilt_on
+
+Revision ID: b3476368193d
+Revises: 9fb0b32bedd0
+Create Date: 2026-10-19 03:09:44.942812
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3476368193d'
+down_revision: Union[str, Sequence[str], None] = '9fb0b32bedd0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("ad_random_branches", sa.Column("last_rebuilt_on", sa.Date, nullable=True))
+
+    # суточное расписание random-объявлений (строит перестройка веток в rebuild_time)
+    op.create_table(
+        "ad_random_slots",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=True),
+        sa.Column("branch_id", sa.Integer, sa.ForeignKey("ad_random_branches.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("ad_id", sa.Integer, sa.ForeignKey("ads.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("slot_date", sa.Date, nullable=False),
+        sa.Column("run_at", sa.DateTime(timezone=False), nullable=False),
+    )
+    op.create_unique_constraint("uq_ad_slots_ad_date", "ad_random_slots", ["ad_id", "slot_date"])
+    op.create_index("ix_ad_slots_run_at", "ad_random_slots", ["run_at"])
+    op.create_index("ix_ad_slots_branch_date", "ad_random_slots", ["branch_id", "slot_date"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ad_slots_branch_date", table_name="ad_random_slots")
+    op.drop_index("ix_ad_slots_run_at", table_name="ad_random_slots")
+    op.drop_constraint("uq_ad_slots_ad_date", "ad_random_slots", type_="unique")
+    op.drop_table("ad_random_slots")
+    op.drop_column("ad_random_branches", "last_rebuilt_on")
@@ -0,0 +1,54 @@
+"""broadcasts: aggregate delivery counters
+
+Revision ID: bf826c400739
+Revises: 84d8203e8915
+Create Date: 2026-10-19 02:58:32.638050
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bf826c400739'
+down_revision: Union[str, Sequence[str], None] = '84d8203e8915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+_COUNTERS = ("total_count", "sent_count", "failed_count", "skipped_count")
+
+
+def upgrade() -> None:
+    for name in _COUNTERS:
+        op.add_column(
+            "broadcasts",
+            sa.Column(name, sa.Integer(), nullable=False, server_default=sa.text("0")),
+        )
+
+    # Бэкфилл по уже существующим доставкам (один проход по ix_bdeliveries_broadcast_status)
+    op.execute(
+        """
+        UPDATE broadcasts b
+        JOIN (
+            SELECT broadcast_id,
+                   COUNT(*)                AS total_count,
+                   SUM(status = 'sent')    AS sent_count,
+                   SUM(status = 'failed')  AS failed_count,
+                   SUM(status = 'skipped') AS skipped_count
+            FROM broadcast_deliveries
+            GROUP BY broadcast_id
+        ) d ON d.broadcast_id = b.id
+        SET b.total_count   = d.total_count,
+            b.sent_count    = d.sent_count,
+            b.failed_count  = d.failed_count,
+            b.skipped_count = d.skipped_count
+        """
+    )
+
+
+def downgrade() -> None:
+    for name in reversed(_COUNTERS):
+        op.drop_column("broadcasts", name)
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# commit: пакет микро/нагрузочных бенчмарков (запуск: python -m benchmarks.<name>)
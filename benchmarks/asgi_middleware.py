@@ -0,0 +1,151 @@
+# benchmarks/asgi_middleware.py
+# commit: бенчмарк стека middleware — прежние три BaseHTTPMiddleware против одного GatewayMiddleware
+
+"""
+Запросы/с и p50/p99 на тривиальном эндпоинте: прежний стек (SuppressRootAccessLog ×2,
+RequestLog, catch_all_exceptions — воспроизведён здесь как был) против GatewayMiddleware.
+Приложение вызывается в процессе через httpx.ASGITransport — сеть и uvicorn не участвуют,
+меряется только накладной расход слоёв.
+
+    python -m benchmarks.asgi_middleware [--requests 20000] [--concurrency 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.routing import Match
+
+from src.exceptions import handle_global_exception, handle_integrity_error
+from src.middleware import GatewayMiddleware, _should_drop_silently
+
+log = logging.getLogger("http.requests")
+
+
+# --- прежний стек (до перехода на GatewayMiddleware) ---
+
+def _is_known_route(app, scope) -> bool:
+    for route in getattr(app.router, "routes", []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return True
+    return False
+
+
+class _LegacySuppress(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path or "/"
+        if request.method.upper() == "GET" and path == "/":
+            return PlainTextResponse("OK", status_code=200)
+        ua = (request.headers.get("user-agent") or "").strip()
+        if _should_drop_silently(request.method.upper(), path, ua):
+            return PlainTextResponse("Not Found", status_code=404)
+        if not _is_known_route(request.app, request.scope):
+            return PlainTextResponse("Not Found", status_code=404)
+        return await call_next(request)
+
+
+class _LegacyRequestLog(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        resp = await call_next(request)
+        if resp.status_code >= 400:
+            log.info("%s %s -> %s", request.method, request.url.path, resp.status_code)
+        return resp
+
+
+async def _legacy_catch_all(request: Request, call_next):
+    try:
+        return await call_next(request)
+    except BaseExceptionGroup as eg:
+        sub = eg.exceptions[0]
+        if isinstance(sub, IntegrityError):
+            return await handle_integrity_error(request, sub)
+        return await handle_global_exception(request, sub)
+    except IntegrityError as exc:
+        return await handle_integrity_error(request, exc)
+    except Exception as exc:
+        return await handle_global_exception(request, exc)
+
+
+def _add_routes(app: FastAPI) -> FastAPI:
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(10):
+                yield f"data: {i}\n\n".encode()
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+def build_legacy_app() -> FastAPI:
+    app = _add_routes(FastAPI())
+    app.add_middleware(_LegacySuppress)
+    app.middleware("http")(_legacy_catch_all)
+    app.add_middleware(_LegacyRequestLog)
+    app.add_middleware(_LegacySuppress)
+    return app
+
+
+def build_gateway_app() -> FastAPI:
+    app = _add_routes(FastAPI())
+    app.add_middleware(GatewayMiddleware)
+    return app
+
+
+async def _run(app: FastAPI, path: str, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(min(200, total)):  # прогрев
+            await client.get(path)
+
+        queue = iter(range(total))
+
+        async def worker():
+            for _ in queue:
+                t0 = time.perf_counter()
+                resp = await client.get(path)
+                latencies.append(time.perf_counter() - t0)
+                assert resp.status_code in (200, 404), resp.status_code
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def main(total: int, concurrency: int) -> None:
+    logging.getLogger("http.requests").setLevel(logging.WARNING)
+    apps = {"before (3× BaseHTTPMiddleware)": build_legacy_app(), "after (GatewayMiddleware)": build_gateway_app()}
+    for path in ("/ping", "/unknown", "/stream"):
+        print(f"\nGET {path}  requests={total} concurrency={concurrency}")
+        for name, app in apps.items():
+            r = await _run(app, path, total, concurrency)
+            print(f"  {name:<32} {r['rps']:>9.0f} req/s   p50 {r['p50_ms']:6.2f} ms   p99 {r['p99_ms']:6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.asgi_middleware")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
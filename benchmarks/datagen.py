@@ -0,0 +1,428 @@
+# benchmarks/datagen.py
+# commit: различные пары (user_id, chat_id) в invite_links_chats, в итогах — реально загруженные строки (rowcount)
+
+"""
+Синтетические данные для нагрузочных прогонов и аудита индексов.
+
+    python -m benchmarks.datagen --scale 0.01 --workers 8            # 1% объёма, LOAD DATA
+    python -m benchmarks.datagen --tables users,user_memberships --method insert
+    python -m benchmarks.datagen --scale 0.001 --no-load --out-dir /tmp/dg   # только TSV-файлы
+
+Объёмы при --scale 1: 5M users, 50M user_memberships (размеры чатов по Zipf — несколько
+гигантских чатов и длинный хвост мелких), 3M invite_links_chats (просроченные и живые
+вперемешку, пары (user_id, chat_id) без повторов), 200k links с визитами по Zipf, 200 broadcasts и 20M broadcast_deliveries.
+
+Каждая таблица режется на шарды фиксированного размера (--shard-rows), шард генерируется
+своим random.Random(f"{seed}:{table}:{shard}") — данные одинаковы при любом --workers.
+Время отсчитывается от --now (по умолчанию — сегодняшняя полночь; для побайтно
+одинаковых данных в разные дни передавайте его явно).
+
+Запись — из процессов-воркеров, у каждого своё pymysql-соединение с
+foreign_key_checks=0 и unique_checks=0:
+- load-data (по умолчанию): шард пишется во временный TSV и грузится
+  LOAD DATA LOCAL INFILE (на сервере нужен local_infile=ON);
+- insert: INSERT IGNORE пачками по --batch строк (pymysql сворачивает executemany
+  в многострочный VALUES).
+В итогах — строки, которые сервер действительно записал (rowcount; дубликаты, срезанные
+IGNORE, не считаются), при --no-load — записанные в TSV.
+Идентификаторы — в отдельных диапазонах (пользователи от 100 000 000, чаты от
+-1 001 000 000 000, рассылки от --broadcast-id-base), --truncate очищает таблицы перед загрузкой.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+USER_BASE = 100_000_000
+CHAT_BASE = -1_001_000_000_000
+
+FULL_SCALE = {
+    "chats": 5_000,
+    "users": 5_000_000,
+    "user_memberships": 50_000_000,
+    "invite_links_chats": 3_000_000,
+    "links": 200_000,
+    "broadcasts": 200,
+    "broadcast_deliveries": 20_000_000,
+}
+
+COLUMNS = {
+    "chats": ("id", "title", "type", "added_at"),
+    "users": ("id", "username", "full_name", "terms_accepted"),
+    "user_memberships": ("user_id", "chat_id", "joined_at"),
+    "invite_links_chats": ("user_id", "chat_id", "invite_link", "created_at", "expires_at"),
+    "links": ("link_key", "resource", "visits", "created_at"),
+    "broadcasts": (
+        "id", "kind", "title", "content", "status", "enabled", "version", "finished_at",
+        "created_at", "updated_at", "total_count", "sent_count", "failed_count", "skipped_count",
+    ),
+    "broadcast_deliveries": (
+        "broadcast_id", "user_id", "status", "attempts", "error_code", "message_id", "sent_at", "created_at",
+    ),
+}
+
+# таблицы-справочники грузятся первыми, одним шардом
+PHASES = (("chats", "broadcasts"), ("users", "user_memberships", "invite_links_chats", "links", "broadcast_deliveries"))
+
+_CHAT_ZIPF_S = 1.1
+_LINK_ZIPF_S = 1.2
+_FIRST_NAMES = ("Анна", "Иван", "Мария", "Олег", "Дарья", "Никита", "Елена", "Пётр", "Alex", "Sam")
+_LAST_NAMES = ("Иванов", "Смирнова", "Кузнецов", "Попова", "Соколов", "Lee", "Brown", "Орлова")
+_EXPIRY_CHOICES = (timedelta(hours=1), timedelta(days=1), timedelta(days=7), timedelta(days=30))
+
+
+class Plan:
+    """Объёмы и параметры генерации (передаётся в воркеры)."""
+
+    def __init__(self, args) -> None:
+        self.seed = args.seed
+        self.now = args.now
+        self.counts = {t: max(1, int(n * args.scale)) for t, n in FULL_SCALE.items()}
+        self.broadcast_id_base = args.broadcast_id_base
+        self.counts["broadcast_deliveries"] = min(
+            self.counts["broadcast_deliveries"], self.counts["broadcasts"] * self.counts["users"]
+        )
+        # пары (user_id, chat_id) invite_links_chats — аффинная перестановка пространства
+        # users × chats: i → (i·step + offset) mod space, step взаимно прост с space,
+        # поэтому пары различны по всей таблице, а не только внутри шарда
+        space = self.counts["users"] * self.counts["chats"]
+        self.counts["invite_links_chats"] = min(self.counts["invite_links_chats"], space)
+        pair_rng = random.Random(f"{self.seed}:invite_links_chats:pairs")
+        step = pair_rng.randrange(space // 2, space) | 1 if space > 2 else 1
+        while math.gcd(step, space) != 1:
+            step += 2
+        self.pair_step = step
+        self.pair_offset = pair_rng.randrange(space)
+
+    def rng(self, table: str, shard: int) -> random.Random:
+        return random.Random(f"{self.seed}:{table}:{shard}")
+
+    def driver_rows(self, table: str) -> int:
+        """Число «ведущих» сущностей, по которым режется таблица на шарды."""
+        return self.counts["users"] if table == "user_memberships" else self.counts[table]
+
+
+# ── генераторы строк шарда [start, stop) ──
+
+def _chat_cdf(n: int) -> list[float]:
+    return list(accumulate(1 / (i + 1) ** _CHAT_ZIPF_S for i in range(n)))
+
+
+def gen_chats(plan: Plan, rng: random.Random, start: int, stop: int):
+    for i in range(start, stop):
+        kind = "channel" if i % 7 == 0 else "supergroup"
+        yield (CHAT_BASE - i, f"Чат {i}", kind, plan.now - timedelta(days=rng.randint(0, 1500)))
+
+
+def gen_users(plan: Plan, rng: random.Random, start: int, stop: int):
+    for i in range(start, stop):
+        username = f"user{i}" if rng.random() < 0.7 else None
+        full_name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+        yield (USER_BASE + i, username, full_name, rng.random() < 0.8)
+
+
+def gen_user_memberships(plan: Plan, rng: random.Random, start: int, stop: int):
+    chats = plan.counts["chats"]
+    cdf = _chat_cdf(chats)
+    total = cdf[-1]
+    mean = plan.counts["user_memberships"] / plan.counts["users"]
+    for i in range(start, stop):
+        # число чатов у пользователя ~ экспоненциальное со средним mean, размер чата ~ Zipf
+        k = min(chats, max(1, int(round(-math.log(1.0 - rng.random()) * mean))))
+        picked: set[int] = set()
+        while len(picked) < k:
+            picked.add(bisect_left(cdf, rng.random() * total))
+        for c in picked:
+            yield (USER_BASE + i, CHAT_BASE - c, plan.now - timedelta(minutes=rng.randint(0, 730 * 1440)))
+
+
+def gen_invite_links_chats(plan: Plan, rng: random.Random, start: int, stop: int):
+    chats = plan.counts["chats"]
+    space = plan.counts["users"] * chats
+    for i in range(start, stop):
+        user, chat = divmod((i * plan.pair_step + plan.pair_offset) % space, chats)
+        created = plan.now - timedelta(minutes=rng.randint(0, 60 * 1440))
+        yield (
+            USER_BASE + user,
+            CHAT_BASE - chat,
+            f"https://t.me/+dg{i:09d}{rng.getrandbits(32):08x}",
+            created,
+            created + rng.choice(_EXPIRY_CHOICES),
+        )
+
+
+def gen_links(plan: Plan, rng: random.Random, start: int, stop: int):
+    n = plan.counts["links"]
+    for i in range(start, stop):
+        rank = rng.randint(1, n)
+        visits = int(1_000_000 / rank ** _LINK_ZIPF_S)
+        yield (f"dg-{i:09d}", f"res-{i % 1000}", visits, plan.now - timedelta(days=rng.randint(0, 700)))
+
+
+def _broadcast_layout(plan: Plan, b: int) -> dict:
+    """Раскладка доставок рассылки b: сколько строк и как они делятся по статусам."""
+    per = plan.counts["broadcast_deliveries"] // plan.counts["broadcasts"]
+    extra = plan.counts["broadcast_deliveries"] % plan.counts["broadcasts"]
+    total = per + (1 if b < extra else 0)
+    sending = b >= plan.counts["broadcasts"] - max(1, plan.counts["broadcasts"] // 20)
+    sent = int(total * (0.6 if sending else 0.93))
+    failed = int(total * 0.04)
+    skipped = int(total * (0.0 if sending else 0.02))
+    return {"total": total, "sent": sent, "failed": failed, "skipped": skipped, "sending": sending}
+
+
+def _delivery_status(layout: dict, k: int) -> str:
+    if k < layout["sent"]:
+        return "sent"
+    if k < layout["sent"] + layout["failed"]:
+        return "failed"
+    if k < layout["sent"] + layout["failed"] + layout["skipped"]:
+        return "skipped"
+    return "pending" if layout["sending"] else "sent"
+
+
+def gen_broadcasts(plan: Plan, rng: random.Random, start: int, stop: int):
+    for b in range(start, stop):
+        layout = _broadcast_layout(plan, b)
+        created = plan.now - timedelta(days=(plan.counts["broadcasts"] - b) // 2 + 1)
+        sent = layout["sent"] + (0 if layout["sending"] else layout["total"] - layout["sent"] - layout["failed"]
+                                 - layout["skipped"])
+        yield (
+            plan.broadcast_id_base + b,
+            rng.choice(("news", "meetings", "important")),
+            f"Рассылка {b}",
+            '{"text": "Синтетическая рассылка", "files": []}',
+            "sending" if layout["sending"] else "sent",
+            True,
+            1,
+            None if layout["sending"] else created + timedelta(hours=2),
+            created,
+            created,
+            layout["total"],
+            sent,
+            layout["failed"],
+            layout["skipped"],
+        )
+
+
+def gen_broadcast_deliveries(plan: Plan, rng: random.Random, start: int, stop: int):
+    users = plan.counts["users"]
+    per = plan.counts["broadcast_deliveries"] // plan.counts["broadcasts"]
+    extra = plan.counts["broadcast_deliveries"] % plan.counts["broadcasts"]
+    # шаг, взаимно простой с числом пользователей: (offset + k·stride) mod users не повторяется
+    stride = 7_368_787
+    while math.gcd(stride, users) != 1:
+        stride += 2
+    layouts: dict[int, dict] = {}
+    for row in range(start, stop):
+        # строки идут подряд по рассылкам: первые extra рассылок на одну строку длиннее
+        if row < extra * (per + 1):
+            b, k = divmod(row, per + 1)
+        else:
+            b, k = extra + (row - extra * (per + 1)) // per, (row - extra * (per + 1)) % per
+        layout = layouts.get(b) or layouts.setdefault(b, _broadcast_layout(plan, b))
+        status = _delivery_status(layout, k)
+        created = plan.now - timedelta(days=(plan.counts["broadcasts"] - b) // 2 + 1)
+        sent_at = created + timedelta(seconds=k // 25) if status == "sent" else None
+        yield (
+            plan.broadcast_id_base + b,
+            USER_BASE + (b * 104_729 + k * stride) % users,
+            status,
+            0 if status == "pending" else (rng.randint(1, 5) if status == "failed" else 1),
+            rng.choice(("403", "400", "429")) if status == "failed" else None,
+            rng.getrandbits(31) if status == "sent" else None,
+            sent_at,
+            created,
+        )
+
+
+GENERATORS = {
+    "chats": gen_chats,
+    "users": gen_users,
+    "user_memberships": gen_user_memberships,
+    "invite_links_chats": gen_invite_links_chats,
+    "links": gen_links,
+    "broadcasts": gen_broadcasts,
+    "broadcast_deliveries": gen_broadcast_deliveries,
+}
+
+
+# ── запись ──
+
+def _tsv_value(value) -> str:
+    if value is None:
+        return "\\N"
+    if value is True:
+        return "1"
+    if value is False:
+        return "0"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, str):
+        return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+    return str(value)
+
+
+def _connect(local_infile: bool):
+    import pymysql
+
+    from src.config import settings
+
+    conn = pymysql.connect(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        database=settings.DB_NAME,
+        charset="utf8mb4",
+        local_infile=local_infile,
+        autocommit=False,
+    )
+    with conn.cursor() as cur:
+        cur.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+    return conn
+
+
+def _run_shard(job: dict) -> tuple[str, int, int, int, float]:
+    """(таблица, шард, сгенерировано, записано сервером или в TSV, секунды)."""
+    table, shard, start, stop = job["table"], job["shard"], job["start"], job["stop"]
+    plan: Plan = job["plan"]
+    started = time.perf_counter()
+    rows = GENERATORS[table](plan, plan.rng(table, shard), start, stop)
+    columns = COLUMNS[table]
+    count = loaded = 0
+
+    if job["method"] == "insert":
+        conn = _connect(local_infile=False)
+        sql = (
+            f"INSERT IGNORE INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})"
+        )
+        try:
+            batch = []
+            with conn.cursor() as cur:
+                for row in rows:
+                    batch.append(row)
+                    if len(batch) >= job["batch"]:
+                        cur.executemany(sql, batch)
+                        count += len(batch)
+                        loaded += max(cur.rowcount, 0)
+                        batch.clear()
+                if batch:
+                    cur.executemany(sql, batch)
+                    count += len(batch)
+                    loaded += max(cur.rowcount, 0)
+            conn.commit()
+        finally:
+            conn.close()
+        return table, shard, count, loaded, time.perf_counter() - started
+
+    path = os.path.join(job["out_dir"], f"{table}.{shard:05d}.tsv")
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for row in rows:
+            f.write("\t".join(_tsv_value(v) for v in row) + "\n")
+            count += 1
+    loaded = count
+
+    if job["load"]:
+        conn = _connect(local_infile=True)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    f"LOAD DATA LOCAL INFILE %s IGNORE INTO TABLE {table} CHARACTER SET utf8mb4 "
+                    "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                    f"({', '.join(columns)})",
+                    (path,),
+                )
+                loaded = max(cur.rowcount, 0)
+            conn.commit()
+        finally:
+            conn.close()
+        if not job["keep"]:
+            os.remove(path)
+    return table, shard, count, loaded, time.perf_counter() - started
+
+
+def _jobs(plan: Plan, tables: list[str], args, out_dir: str) -> list[dict]:
+    jobs = []
+    for table in tables:
+        total = plan.driver_rows(table)
+        shard_rows = total if table in PHASES[0] else args.shard_rows
+        for shard, start in enumerate(range(0, total, shard_rows)):
+            jobs.append({
+                "table": table, "shard": shard, "start": start, "stop": min(total, start + shard_rows),
+                "plan": plan, "method": args.method, "batch": args.batch,
+                "out_dir": out_dir, "load": not args.no_load, "keep": args.keep or args.no_load,
+            })
+    return jobs
+
+
+def main(argv: list[str] | None = None) -> None:
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.datagen")
+    parser.add_argument("--scale", type=float, default=1.0, help="доля от продакшн-объёма")
+    parser.add_argument("--tables", default=",".join(FULL_SCALE), help="через запятую")
+    parser.add_argument("--seed", type=int, default=20240601)
+    parser.add_argument("--now", type=datetime.fromisoformat, default=today, help="точка отсчёта времени, ISO")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--shard-rows", type=int, default=250_000)
+    parser.add_argument("--method", choices=("load-data", "insert"), default="load-data")
+    parser.add_argument("--batch", type=int, default=5000, help="строк в INSERT (для --method insert)")
+    parser.add_argument("--broadcast-id-base", type=int, default=1_000_000)
+    parser.add_argument("--out-dir", help="каталог для TSV (по умолчанию временный)")
+    parser.add_argument("--keep", action="store_true", help="не удалять TSV после загрузки")
+    parser.add_argument("--no-load", action="store_true", help="только сгенерировать TSV")
+    parser.add_argument("--truncate", action="store_true", help="очистить таблицы перед загрузкой")
+    args = parser.parse_args(argv)
+
+    tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+    unknown = set(tables) - set(FULL_SCALE)
+    if unknown:
+        parser.error(f"неизвестные таблицы: {', '.join(sorted(unknown))}")
+    if args.no_load and args.method == "insert":
+        parser.error("--no-load имеет смысл только для load-data")
+
+    plan = Plan(args)
+    out_dir = args.out_dir or tempfile.mkdtemp(prefix="datagen-")
+    os.makedirs(out_dir, exist_ok=True)
+    print(f"seed={args.seed} now={args.now.isoformat(sep=' ')} workers={args.workers} method={args.method} dir={out_dir}")
+    for t in tables:
+        print(f"  {t:22} ~{plan.counts[t]:>12,} строк")
+
+    if args.truncate and not args.no_load:
+        conn = _connect(local_infile=False)
+        try:
+            with conn.cursor() as cur:
+                for t in tables:
+                    cur.execute(f"TRUNCATE TABLE {t}")
+        finally:
+            conn.close()
+
+    started = time.perf_counter()
+    totals: dict[str, int] = {}
+    with mp.get_context("spawn").Pool(args.workers) as pool:
+        for phase in PHASES:
+            jobs = _jobs(plan, [t for t in phase if t in tables], args, out_dir)
+            for table, shard, count, loaded, seconds in pool.imap_unordered(_run_shard, jobs):
+                totals[table] = totals.get(table, 0) + loaded
+                skipped = f" (сгенерировано {count:,}, отброшено IGNORE {count - loaded:,})" if loaded != count else ""
+                print(f"  {table}[{shard}] {loaded:,} строк за {seconds:.1f} с{skipped}")
+
+    elapsed = time.perf_counter() - started
+    rows = sum(totals.values())
+    print(f"готово: {rows:,} строк за {elapsed:.1f} с ({rows / elapsed:,.0f} строк/с)")
+    for t, n in totals.items():
+        print(f"  {t:22} {n:>12,}")
+
+
+if __name__ == "__main__":
+    main()
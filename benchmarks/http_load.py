@@ -0,0 +1,428 @@
+# benchmarks/http_load.py
+# commit: --db для прогона в процессе на SQLite/aiomysql/asyncmy, --seed-data для :memory:
+
+"""
+Сквозная нагрузка на API: реалистичная смесь запросов по users, memberships, chats,
+invite_links, algo и links, отчёт в JSON (rps, p50/p95/p99, ошибки по эндпоинтам) и
+сравнение двух отчётов с подсветкой регрессий.
+
+Цель — запущенный сервис (--url, локальная MySQL/MariaDB с данными) или приложение
+в процессе (--app main:app через httpx.ASGITransport, БД — из настроек окружения
+или --db sqlite|aiomysql|asyncmy). SQLite без SQLITE_PATH живёт в памяти процесса,
+поэтому данные засеваются тем же запуском (--seed-data):
+
+    python -m benchmarks.http_load run --app main:app --db sqlite --seed-data --duration 20 --out sqlite.json
+    python -m benchmarks.http_load run --app main:app --db asyncmy --out asyncmy.json
+    python -m benchmarks.http_load compare aiomysql.json asyncmy.json
+
+    python -m benchmarks.http_load seed  --url http://127.0.0.1:8000 --users 2000 --chats 20
+    python -m benchmarks.http_load run   --url http://127.0.0.1:8000 --duration 30 --concurrency 50 --out base.json
+    python -m benchmarks.http_load compare base.json new.json [--threshold 0.1]
+
+seed создаёт чаты, пользователей, членства, прогресс и инвайт-ссылки через API, а строки
+links (у них нет эндпоинта создания) — напрямую через src.database. compare завершается
+с кодом 1, если хотя бы по одному эндпоинту p95/p99 выросли или rps упал больше порога,
+либо выросла доля ошибок.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import httpx
+
+USER_BASE = 7_000_000_000
+CHAT_BASE = -1_009_000_000_000
+LINK_PREFIX = "bench-link-"
+
+
+@dataclass
+class Universe:
+    users: int
+    chats: int
+    links: int
+
+    def user(self, rng: random.Random) -> int:
+        return USER_BASE + rng.randrange(self.users)
+
+    def chat(self, rng: random.Random) -> int:
+        return CHAT_BASE - rng.randrange(self.chats)
+
+    def link(self, rng: random.Random) -> str:
+        return f"{LINK_PREFIX}{rng.randrange(self.links)}"
+
+
+@dataclass
+class Op:
+    name: str
+    weight: int
+    build: Callable[[Universe, random.Random], tuple[str, str, dict]]
+    ok: frozenset = frozenset({200, 204})
+
+
+def _invite(u: Universe, rng: random.Random) -> dict:
+    now = datetime.now().replace(microsecond=0)
+    return {
+        "user_id": u.user(rng),
+        "chat_id": u.chat(rng),
+        "invite_link": f"https://t.me/+bench{rng.getrandbits(48):x}",
+        "created_at": now.isoformat(),
+        "expires_at": (now + timedelta(days=1)).isoformat(),
+    }
+
+
+# Смесь примерно как у ботов: чтения членств и прогресса доминируют, записи шага и визиты — следом.
+MIX: list[Op] = [
+    Op("GET /memberships/", 20, lambda u, r: (
+        "GET", "/memberships/", {"params": {"user_id": u.user(r), "chat_id": u.chat(r)}},
+    )),
+    Op("GET /users/{user_id}", 12, lambda u, r: ("GET", f"/users/{u.user(r)}", {}), frozenset({200, 404})),
+    Op("GET /algo/{user_id}", 12, lambda u, r: ("GET", f"/algo/{u.user(r)}", {}), frozenset({200, 404})),
+    Op("PUT /algo/{user_id}/step", 10, lambda u, r: (
+        "PUT", f"/algo/{u.user(r)}/step", {"params": {"step": r.randint(0, 12)}},
+    )),
+    Op("POST /links/visit", 8, lambda u, r: ("POST", "/links/visit", {"json": {"link_key": u.link(r)}})),
+    Op("PUT /users/{user_id}/upsert", 8, lambda u, r: (
+        "PUT", f"/users/{u.user(r)}/upsert",
+        {"json": {"username": f"bench{r.randrange(10**6)}", "full_name": "Bench User", "terms_accepted": True}},
+    )),
+    Op("PUT /users/{user_id}/upsert_with_membership", 5, lambda u, r: (
+        "PUT", f"/users/{u.user(r)}/upsert_with_membership",
+        {"json": {"user": {"username": f"bench{r.randrange(10**6)}", "full_name": "Bench User"}, "chat_id": u.chat(r)}},
+    )),
+    Op("POST /memberships/", 5, lambda u, r: (
+        "POST", "/memberships/", {"params": {"user_id": u.user(r), "chat_id": u.chat(r)}},
+    )),
+    Op("GET /memberships/by-chat", 3, lambda u, r: (
+        "GET", "/memberships/by-chat", {"params": {"chat_id": u.chat(r), "limit": 500}},
+    )),
+    Op("GET /invite_links/{user_id}", 5, lambda u, r: ("GET", f"/invite_links/{u.user(r)}", {})),
+    Op("POST /invite_links/", 3, lambda u, r: ("POST", "/invite_links/", {"json": _invite(u, r)})),
+    Op("PUT /algo/{user_id}/basic", 2, lambda u, r: (
+        "PUT", f"/algo/{u.user(r)}/basic", {"params": {"completed": True}},
+    )),
+    Op("GET /chats/", 2, lambda u, r: ("GET", "/chats/", {})),
+    Op("POST /chats/", 1, lambda u, r: (
+        "POST", "/chats/", {"json": {"id": u.chat(r), "title": "Bench chat", "type": "supergroup"}},
+    )),
+    Op("GET /algo/stats/funnel", 1, lambda u, r: ("GET", "/algo/stats/funnel", {})),
+]
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    exceptions: dict[str, int] = field(default_factory=dict)
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def _summary(stats: EndpointStats, seconds: float) -> dict:
+    values = sorted(stats.latencies)
+    count = len(values)
+    return {
+        "count": count,
+        "rps": round(count / seconds, 2) if seconds else 0.0,
+        "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(_percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if count else 0.0,
+        "errors": stats.errors,
+        "error_rate": round(stats.errors / count, 5) if count else 0.0,
+        "statuses": dict(sorted(stats.statuses.items())),
+        "exceptions": stats.exceptions,
+    }
+
+
+@asynccontextmanager
+async def _client(args):
+    headers = {"X-API-KEY": args.api_key} if args.api_key else {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.app:
+        module_name, _, attr = args.app.partition(":")
+        app = getattr(importlib.import_module(module_name), attr or "app")
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench", headers=headers, timeout=args.timeout
+            ) as client:
+                yield client
+        return
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, timeout=args.timeout, limits=limits) as client:
+        yield client
+
+
+def _use_db(db: str | None) -> None:
+    """Бэкенд БД для --app: переменные окружения до импорта src.config."""
+    if db == "sqlite":
+        os.environ["DB_BACKEND"] = "sqlite"
+    elif db:
+        os.environ["DB_BACKEND"] = "mysql"
+        os.environ["DB_DRIVER"] = db
+
+
+def _db_label(args) -> str | None:
+    if not args.app:
+        return args.db
+    from src.config import settings
+
+    if settings.DB_BACKEND == "sqlite":
+        return f"sqlite:{settings.SQLITE_PATH or ':memory:'}"
+    return f"mysql+{settings.DB_DRIVER}"
+
+
+async def _seed(args) -> None:
+    async with _client(args) as client:
+        failures = await _seed_with(client, args)
+        inserted = await _seed_links(args.links, dispose=not args.app)
+    print(f"seed: chats={args.chats}, users={args.users}, links={inserted}, ошибок API: {failures}")
+
+
+async def _seed_with(client: httpx.AsyncClient, args) -> int:
+    u = Universe(args.users, args.chats, args.links)
+    rng = random.Random(args.seed)
+    sem = asyncio.Semaphore(args.concurrency)
+    failures = 0
+
+    async def call(method, path, **kwargs):
+        nonlocal failures
+        async with sem:
+            resp = await client.request(method, path, **kwargs)
+            if resp.status_code >= 400:
+                failures += 1
+
+    await asyncio.gather(*(
+        call("POST", "/chats/", json={"id": CHAT_BASE - i, "title": f"Bench chat {i}", "type": "supergroup"})
+        for i in range(args.chats)
+    ))
+    await asyncio.gather(*(
+        call("PUT", f"/users/{USER_BASE + i}/upsert",
+             json={"username": f"bench{i}", "full_name": f"Bench User {i}", "terms_accepted": True})
+        for i in range(args.users)
+    ))
+    await asyncio.gather(*(
+        call("POST", "/memberships/", params={"user_id": USER_BASE + i, "chat_id": u.chat(rng)})
+        for i in range(args.users)
+    ))
+    await asyncio.gather(*(
+        call("PUT", f"/algo/{USER_BASE + i}/step", params={"step": rng.randint(0, 12)})
+        for i in range(args.users)
+    ))
+    await asyncio.gather(*(call("POST", "/invite_links/", json=_invite(u, rng)) for _ in range(args.users // 4)))
+    return failures
+
+
+async def _seed_links(count: int, *, dispose: bool) -> int:
+    """links без эндпоинта создания — пишем напрямую через движок приложения."""
+    from src.crud.base import insert_ignore
+    from src.database import AsyncSessionLocal, engine
+    from src.models import Link
+
+    rows = [{"link_key": f"{LINK_PREFIX}{i}", "resource": "bench", "visits": 0} for i in range(count)]
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            for start in range(0, len(rows), 1000):
+                await session.execute(insert_ignore(Link), rows[start:start + 1000])
+    if dispose:
+        await engine.dispose()
+    return count
+
+
+async def _run(args) -> dict:
+    u = Universe(args.users, args.chats, args.links)
+    ops = [op for op in MIX if not args.only or any(s in op.name for s in args.only)]
+    if not ops:
+        raise SystemExit("--only не совпал ни с одним эндпоинтом")
+    weights = [op.weight for op in ops]
+    stats = {op.name: EndpointStats() for op in ops}
+
+    async with _client(args) as client:
+        if args.seed_data:
+            failures = await _seed_with(client, args)
+            await _seed_links(args.links, dispose=False)
+            print(f"seed: chats={args.chats}, users={args.users}, ошибок API: {failures}", file=sys.stderr)
+
+        async def worker(worker_id: int, until: float, record: bool) -> None:
+            rng = random.Random(f"{args.seed}:{worker_id}:{record}")
+            while time.perf_counter() < until:
+                op = rng.choices(ops, weights)[0]
+                method, path, kwargs = op.build(u, rng)
+                started = time.perf_counter()
+                try:
+                    resp = await client.request(method, path, **kwargs)
+                    status = resp.status_code
+                except Exception as e:
+                    status = None
+                    error = type(e).__name__
+                elapsed = time.perf_counter() - started
+                if not record:
+                    continue
+                s = stats[op.name]
+                s.latencies.append(elapsed)
+                if status is None:
+                    s.errors += 1
+                    s.exceptions[error] = s.exceptions.get(error, 0) + 1
+                else:
+                    s.statuses[str(status)] = s.statuses.get(str(status), 0) + 1
+                    if status not in op.ok:
+                        s.errors += 1
+
+        if args.warmup > 0:
+            until = time.perf_counter() + args.warmup
+            await asyncio.gather(*(worker(i, until, False) for i in range(args.concurrency)))
+        started = time.perf_counter()
+        until = started + args.duration
+        await asyncio.gather(*(worker(i, until, True) for i in range(args.concurrency)))
+        seconds = time.perf_counter() - started
+
+    total = EndpointStats()
+    for s in stats.values():
+        total.latencies.extend(s.latencies)
+        total.errors += s.errors
+        for k, v in s.statuses.items():
+            total.statuses[k] = total.statuses.get(k, 0) + v
+        for k, v in s.exceptions.items():
+            total.exceptions[k] = total.exceptions.get(k, 0) + v
+
+    return {
+        "meta": {
+            "target": args.app or args.url,
+            "db": _db_label(args),
+            "label": args.label,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "duration_sec": round(seconds, 3),
+            "concurrency": args.concurrency,
+            "universe": {"users": args.users, "chats": args.chats, "links": args.links},
+            "python": platform.python_version(),
+            "git": os.popen("git rev-parse --short HEAD 2>/dev/null").read().strip() or None,
+        },
+        "total": _summary(total, seconds),
+        "endpoints": {name: _summary(s, seconds) for name, s in stats.items() if s.latencies},
+    }
+
+
+def compare(base: dict, new: dict, *, threshold: float, floor_ms: float) -> tuple[list[str], bool]:
+    """Строки отчёта и флаг «есть регрессии»."""
+    lines, regressed = [], False
+    for tag, report in (("base", base), ("new", new)):
+        meta = report.get("meta", {})
+        lines.append(f"{tag}: {meta.get('label') or '-'} | {meta.get('target')} | db={meta.get('db') or '?'}")
+    header = f"{'endpoint':48} {'rps':>22} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22} {'err %':>13}"
+    lines.append(header)
+    names = ["<total>"] + sorted(set(base["endpoints"]) | set(new["endpoints"]))
+    for name in names:
+        b = base["total"] if name == "<total>" else base["endpoints"].get(name)
+        n = new["total"] if name == "<total>" else new["endpoints"].get(name)
+        if b is None or n is None:
+            lines.append(f"{name:48} {'только в ' + ('новом' if b is None else 'базовом'):>22}")
+            continue
+
+        flags = []
+
+        def cell(key: str, higher_is_worse: bool) -> str:
+            old, cur = b[key], n[key]
+            delta = (cur - old) / old if old else 0.0
+            worse = delta > threshold if higher_is_worse else delta < -threshold
+            if worse and key.endswith("_ms") and abs(cur - old) < floor_ms:
+                worse = False  # шум на микросекундных эндпоинтах
+            if worse and key in ("rps", "p95_ms", "p99_ms"):
+                flags.append(key)
+            return f"{old:.1f}→{cur:.1f} {delta * 100:+.0f}%{'!' if worse else ' '}".rjust(22)
+
+        row = f"{name:48} {cell('rps', False)} {cell('p50_ms', True)} {cell('p95_ms', True)} {cell('p99_ms', True)}"
+        err_old, err_new = b["error_rate"] * 100, n["error_rate"] * 100
+        if err_new > err_old + 0.1:
+            flags.append("errors")
+        row += f" {err_old:>5.2f}→{err_new:<5.2f}"
+        if flags:
+            regressed = True
+            row += "  РЕГРЕССИЯ: " + ", ".join(flags)
+        lines.append(row)
+    return lines, regressed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.http_load")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def target(p):
+        g = p.add_mutually_exclusive_group()
+        g.add_argument("--url", default="http://127.0.0.1:8000")
+        g.add_argument("--app", help="ASGI-приложение в процессе, например main:app")
+        p.add_argument("--db", choices=("sqlite", "aiomysql", "asyncmy"), help="бэкенд БД для --app")
+        p.add_argument("--api-key", default=os.environ.get("API_KEY_VALUE"))
+        p.add_argument("--concurrency", type=int, default=50)
+        p.add_argument("--timeout", type=float, default=30.0)
+        p.add_argument("--users", type=int, default=2000)
+        p.add_argument("--chats", type=int, default=20)
+        p.add_argument("--links", type=int, default=200)
+        p.add_argument("--seed", type=int, default=42)
+
+    seed = sub.add_parser("seed", help="наполнить БД данными для прогона")
+    target(seed)
+
+    run = sub.add_parser("run", help="прогон смеси запросов, отчёт в JSON")
+    target(run)
+    run.add_argument("--duration", type=float, default=30.0)
+    run.add_argument("--warmup", type=float, default=3.0)
+    run.add_argument("--only", nargs="*", help="подстроки имён эндпоинтов, например /algo")
+    run.add_argument("--seed-data", action="store_true", help="засеять данные перед прогоном (для SQLite в памяти)")
+    run.add_argument("--label", default=None, help="метка прогона (ветка, фича)")
+    run.add_argument("--out", help="файл для JSON (по умолчанию stdout)")
+
+    cmp_ = sub.add_parser("compare", help="сравнить два JSON-отчёта")
+    cmp_.add_argument("base")
+    cmp_.add_argument("new")
+    cmp_.add_argument("--threshold", type=float, default=0.10, help="допустимое ухудшение, доля")
+    cmp_.add_argument("--floor-ms", type=float, default=1.0, help="меньшие абсолютные сдвиги латентности — шум")
+
+    args = parser.parse_args(argv)
+    if args.command != "compare":
+        _use_db(args.db)
+    if args.command == "seed":
+        asyncio.run(_seed(args))
+        return 0
+    if args.command == "run":
+        report = asyncio.run(_run(args))
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+            t = report["total"]
+            print(f"{t['count']} запросов, {t['rps']} rps, p50 {t['p50_ms']} / p95 {t['p95_ms']} / "
+                  f"p99 {t['p99_ms']} мс, ошибок {t['errors']} → {args.out}")
+        else:
+            print(text)
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    lines, regressed = compare(base, new, threshold=args.threshold, floor_ms=args.floor_ms)
+    print("\n".join(lines))
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+# benchmarks/response_serialization.py
+# commit: микробенчмарк сериализации ответов — response_model + json.dumps против serializer/ORJSONResponse
+
+"""
+CPU на запрос для GET /invite_links/all/{user_id} и GET /memberships/by-chat:
+прежний путь (ORM-объекты → валидация response_model → JSONResponse) против
+нового (Core-строки → serializer(Model) / ORJSONResponse).
+
+Два уровня:
+- serialize — только сериализация готового результата запроса (без БД и ASGI):
+  fastapi.routing.serialize_response + JSONResponse.render против serializer;
+- asgi — запросы через httpx.ASGITransport к маленькому приложению с обеими
+  версиями роутов поверх настоящих crud-функций и SQLite в памяти; CPU процесса
+  (time.process_time) делится на число запросов.
+
+    python -m benchmarks.response_serialization --links 50 --members 2000 --requests 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DB_BACKEND", "sqlite")
+for _name, _value in (
+    ("TELEGRAM_BOT_TOKEN", "bench"), ("LOG_CHANNEL_ID", "0"), ("JWT_SECRET_KEY", "bench"), ("API_KEY_VALUE", "bench"),
+):
+    os.environ.setdefault(_name, _value)
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, Query  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from src import crud  # noqa: E402
+from src.database import AsyncSessionLocal, engine, init_db  # noqa: E402
+from src.dependencies import get_session  # noqa: E402
+from src.models import Chat, InviteLink, User, UserMembership  # noqa: E402
+from src.schemas import InviteLinkModel  # noqa: E402
+from src.serialization import serializer  # noqa: E402
+
+USER_ID = 8_000_000_000
+CHAT_ID = -1_008_000_000_000
+
+
+async def _seed(links: int, members: int) -> None:
+    await init_db()
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await session.execute(insert(Chat), [{"id": CHAT_ID, "title": "bench", "type": "supergroup", "added_at": now}])
+            await session.execute(insert(User), [
+                {"id": USER_ID + i, "username": f"u{i}", "full_name": f"User {i}", "terms_accepted": True}
+                for i in range(members)
+            ])
+            await session.execute(insert(UserMembership), [
+                {"user_id": USER_ID + i, "chat_id": CHAT_ID, "joined_at": now} for i in range(members)
+            ])
+            await session.execute(insert(InviteLink), [
+                {
+                    "user_id": USER_ID,
+                    "chat_id": CHAT_ID - i,
+                    "invite_link": f"https://t.me/+bench{i:06d}",
+                    "created_at": now + timedelta(seconds=i),
+                    "expires_at": now + timedelta(days=1, microseconds=i),
+                }
+                for i in range(links)
+            ])
+
+
+def _bench_app() -> FastAPI:
+    """Обе версии роутов на одних и тех же crud-функциях."""
+    app = FastAPI(default_response_class=JSONResponse)
+
+    @app.get("/legacy/invite_links/all/{user_id}", response_model=list[InviteLinkModel])
+    async def legacy_invite_links(user_id: int, session=Depends(get_session)):
+        res = await session.execute(select(InviteLink).where(InviteLink.user_id == user_id))
+        return list(res.scalars().all())
+
+    @app.get("/fast/invite_links/all/{user_id}", response_model=list[InviteLinkModel])
+    async def fast_invite_links(user_id: int, session=Depends(get_session)):
+        rows = await crud.get_invite_links(session, user_id=user_id)
+        return serializer(InviteLinkModel).response_many(rows)
+
+    @app.get("/legacy/memberships/by-chat", response_model=list[int])
+    async def legacy_by_chat(chat_id: int = Query(...), session=Depends(get_session)):
+        return await crud.list_memberships_by_chat(session, chat_id=chat_id)
+
+    @app.get("/fast/memberships/by-chat", response_model=list[int])
+    async def fast_by_chat(chat_id: int = Query(...), session=Depends(get_session)):
+        return ORJSONResponse(await crud.list_memberships_by_chat(session, chat_id=chat_id))
+
+    return app
+
+
+def _per_call_us(fn, number: int) -> float:
+    best = float("inf")
+    for _ in range(5):
+        started = time.process_time()
+        for _ in range(number):
+            fn()
+        best = min(best, time.process_time() - started)
+    return best / number * 1e6
+
+
+async def _serialize_only(number: int) -> list[tuple[str, float, float, bool]]:
+    async with AsyncSessionLocal() as session:
+        orm_links = list((await session.execute(select(InviteLink).where(InviteLink.user_id == USER_ID))).scalars())
+        row_links = await crud.get_invite_links(session, user_id=USER_ID)
+        member_ids = await crud.list_memberships_by_chat(session, chat_id=CHAT_ID)
+
+    links_field = create_model_field(name="links", type_=list[InviteLinkModel], mode="serialization")
+    ids_field = create_model_field(name="ids", type_=list[int], mode="serialization")
+
+    # serialize_response — корутина; в цикле считаем её через send(None), без event loop
+    def legacy_sync(field, content):
+        coro = serialize_response(field=field, response_content=content, is_coroutine=True)
+        try:
+            coro.send(None)
+        except StopIteration as stop:
+            return JSONResponse(stop.value).body
+        raise RuntimeError("serialize_response неожиданно ушёл в await")
+
+    cases = [
+        (
+            f"invite_links/all ({len(orm_links)} строк)",
+            lambda: legacy_sync(links_field, orm_links),
+            lambda: serializer(InviteLinkModel).dump_many(row_links),
+        ),
+        (
+            f"memberships/by-chat ({len(member_ids)} id)",
+            lambda: legacy_sync(ids_field, member_ids),
+            lambda: ORJSONResponse(member_ids).body,
+        ),
+    ]
+    return [(name, _per_call_us(old, number), _per_call_us(new, number), old() == new()) for name, old, new in cases]
+
+
+async def _asgi(requests: int) -> list[tuple[str, float, float]]:
+    app = _bench_app()
+    transport = httpx.ASGITransport(app=app)
+    paths = {
+        "GET /invite_links/all/{user_id}": f"/invite_links/all/{USER_ID}",
+        "GET /memberships/by-chat": f"/memberships/by-chat?chat_id={CHAT_ID}",
+    }
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, path in paths.items():
+            cpu = {}
+            for variant in ("legacy", "fast"):
+                url = f"/{variant}{path}"
+                for _ in range(50):  # прогрев: кеши компиляции SQL, TypeAdapter
+                    (await client.get(url)).raise_for_status()
+                started = time.process_time()
+                for _ in range(requests):
+                    await client.get(url)
+                cpu[variant] = (time.process_time() - started) / requests * 1e6
+            legacy_body = (await client.get(f"/legacy{path}")).content
+            fast_body = (await client.get(f"/fast{path}")).content
+            if legacy_body != fast_body:
+                raise SystemExit(f"{name}: тела ответов отличаются")
+            results.append((name, cpu["legacy"], cpu["fast"]))
+    return results
+
+
+async def _main(args) -> None:
+    await _seed(args.links, args.members)
+    print(f"SQLite в памяти, ссылок у пользователя: {args.links}, участников чата: {args.members}\n")
+
+    print(f"{'serialize':44} {'было, мкс':>12} {'стало, мкс':>12} {'экономия':>9}  тело совпадает")
+    for name, old, new, same in await _serialize_only(args.number):
+        print(f"{name:44} {old:12.1f} {new:12.1f} {1 - new / old:9.0%}  {'да' if same else 'НЕТ'}")
+
+    print(f"\n{'asgi, CPU на запрос':44} {'было, мкс':>12} {'стало, мкс':>12} {'экономия':>9}")
+    for name, old, new in await _asgi(args.requests):
+        print(f"{name:44} {old:12.1f} {new:12.1f} {1 - new / old:9.0%}")
+    await engine.dispose()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.response_serialization")
+    parser.add_argument("--links", type=int, default=50, help="ссылок приглашений у пользователя")
+    parser.add_argument("--members", type=int, default=2000, help="участников чата")
+    parser.add_argument("--number", type=int, default=500, help="повторов на замер serialize")
+    parser.add_argument("--requests", type=int, default=1000, help="запросов на вариант в asgi")
+    asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/route_index.py
+# commit: микробенчмарк проверки известного роута — линейный route.matches против RouteIndex (холодный/LRU)
+
+"""
+Стоимость решения «известен ли (method, path)» на запрос: прежний проход по всем роутам
+с route.matches(scope) против RouteIndex — без LRU (каждый путь новый, как /users/<id>)
+и с попаданием в LRU. Таблица роутов повторяет таблицу сервиса; перед замером
+проверяется, что оба способа дают одинаковые ответы.
+
+    python -m benchmarks.route_index [--number 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import timeit
+
+from fastapi import APIRouter, FastAPI
+from starlette.routing import Match
+
+from src.route_index import RouteIndex
+
+# method path — как в src/routers (prefix + путь декоратора)
+SERVICE_ROUTES = """
+get / ; get /health ; get /health/blocklist ; get /health/admission ; get /health/db-retry ; get /metrics ; get /panic
+post /ads/ ; get /ads/due ; get /ads/random/slots ; post /ads/runs/report ; get /ads/deletions/due
+post /ads/deletions/done ; get /ads/{ad_id} ; put /ads/{ad_id} ; post /ads/{ad_id}/fired
+get /algo/stats/funnel ; get /algo/{user_id} ; put /algo/{user_id}/step ; put /algo/{user_id}/basic
+put /algo/{user_id}/advanced ; delete /algo/{user_id}
+post /broadcasts/ ; get /broadcasts/{broadcast_id} ; put /broadcasts/{broadcast_id}
+patch /broadcasts/{broadcast_id}/status ; get /broadcasts/{broadcast_id}/plan
+post /broadcasts/{broadcast_id}/targets ; post /broadcasts/{broadcast_id}/materialize
+post /broadcasts/{broadcast_id}/claim ; post /broadcasts/{broadcast_id}/deliveries/report
+get /broadcasts/{broadcast_id}/progress ; get /broadcasts/{broadcast_id}/progress/stream
+get /broadcasts/{broadcast_id}/audience
+post /chats/ ; get /chats/ ; delete /chats/{chat_id}
+post /invite_links/ ; get /invite_links/all/{user_id} ; get /invite_links/{user_id} ; delete /invite_links/{user_id}
+post /links/visit ; get /debug/queries/top ; post /debug/queries/reset
+post /memberships/ ; delete /memberships/ ; get /memberships/ ; get /memberships/by-chat
+get /subscriptions/{user_id} ; put /subscriptions/bulk ; put /subscriptions/{user_id}/{kind}
+put /users/{user_id}/upsert ; put /users/{user_id}/upsert_with_membership ; put /users/{user_id}
+get /users/{user_id} ; patch /users/{user_id} ; delete /users/{user_id}
+"""
+
+PROBES = [
+    ("GET", "/health"),
+    ("GET", "/memberships/by-chat"),
+    ("GET", "/users/{n}"),
+    ("PATCH", "/users/{n}"),
+    ("POST", "/broadcasts/{n}/deliveries/report"),
+    ("PUT", "/subscriptions/{n}/news"),
+    ("GET", "/ads/due"),
+    ("GET", "/nope/{n}"),
+    ("POST", "/users/{n}"),
+]
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    router = APIRouter()
+
+    async def endpoint():
+        return None
+
+    for line in SERVICE_ROUTES.split(";"):
+        for item in filter(None, (part.strip() for part in line.splitlines())):
+            method, path = item.split()
+            router.add_api_route(path, endpoint, methods=[method.upper()])
+    app.include_router(router)
+    return app
+
+
+def linear_is_known(app, scope) -> bool:
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return True
+    return False
+
+
+def _scope(method: str, path: str) -> dict:
+    return {"type": "http", "method": method, "path": path, "root_path": "", "headers": []}
+
+
+def main(number: int) -> None:
+    app = build_app()
+    index = RouteIndex()
+
+    for method, template in PROBES:
+        for n in range(50):
+            scope = _scope(method, template.format(n=n))
+            assert linear_is_known(app, scope) == (index.lookup(app, scope) is not None), scope
+
+    print(f"routes={len(app.router.routes)}  number={number}  (мкс на решение)")
+    for method, template in PROBES:
+        scopes = [_scope(method, template.format(n=n)) for n in range(number)]
+        it = iter(scopes)
+        linear = timeit.timeit(lambda: linear_is_known(app, next(it)), number=number) / number * 1e6
+
+        cold = RouteIndex(lru_size=0)
+        cold.lookup(app, scopes[0])
+        it = iter(scopes)
+        indexed = timeit.timeit(lambda: cold.lookup(app, next(it)), number=number) / number * 1e6
+
+        warm = RouteIndex()
+        warm.lookup(app, scopes[0])
+        cached = timeit.timeit(lambda: warm.lookup(app, scopes[0]), number=number) / number * 1e6
+
+        label = f"{method} {template}"
+        print(f"  {label:<42} linear {linear:6.2f}   index {indexed:5.2f}   lru {cached:5.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.route_index")
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.number)
@@ -1,43 +1,130 @@
 # src/main.py
-# commit: централизована защита API key на уровне include_router; health оставлен публичным
+# commit: сверка воронки — reconcile_funnel по таблице счётчиков
 
 import logging
-from builtins import BaseExceptionGroup
 from contextlib import asynccontextmanager
 
 import src.logger  # noqa: F401  (конфиг логгера и TelegramHandler)
 from fastapi import Depends, FastAPI, Request, Security
 from fastapi.exception_handlers import request_validation_exception_handler
 from fastapi.exceptions import RequestValidationError
-from sqlalchemy.exc import IntegrityError
+from fastapi.responses import ORJSONResponse
 from src.security import get_api_key
 
-from src.database import engine, init_db
-from src.exceptions import (
-    handle_global_exception,
-    handle_integrity_error,
-    register_exception_handlers,
-)
-from src.middleware import SuppressRootAccessLogMiddleware
-from src.middleware import RequestLogMiddleware
+from src.admission import admission
+from src.background import PeriodicTask
+from src.broadcast_archive import archive_finished_broadcasts
+from src.config import settings
+from src.db_retry import db_retry_policy
+from src.ip_blocklist import scanner_blocklist
+from src.metrics import LoopLag, cache_collector, pool_collector, register_collector, stats_collector
+from src.route_index import route_index
+from src.send_plan import send_plan_cache
+from src.sql_timing import query_stats
+from src.crud.algorithm_funnel import reconcile_funnel
+from src.crud.algorithm_progress import progress_coalescer
+from src.crud.ads import fill_missing_next_runs, rebuild_random_branches
+from src.crud.broadcasts import reap_expired_leases
+from src.database import AsyncSessionLocal, engine, init_db
+from src.time_msk import now_msk_naive
+from src.exceptions import register_exception_handlers
+from src.middleware import GatewayMiddleware
 from src.security import get_api_key
-from src.routers import algorithm, chats, health, invite_links, links, memberships, users
+from src.routers import (
+    ads, algorithm, broadcasts, chats, debug, health, invite_links, links, memberships, metrics, subscriptions, users,
+)
 
 
 logger = logging.getLogger("uvicorn.error")
 
 
+async def _reconcile_funnel() -> None:
+    async with AsyncSessionLocal() as session:
+        await reconcile_funnel(session)
+
+
+funnel_reconciler = PeriodicTask("algo-funnel-reconcile", settings.ALGO_FUNNEL_RECONCILE_SEC, _reconcile_funnel)
+
+
+async def _reap_delivery_leases() -> None:
+    async with AsyncSessionLocal() as session:
+        result = await reap_expired_leases(session, max_attempts=settings.BROADCAST_MAX_ATTEMPTS)
+    if result["requeued"] or result["failed"]:
+        logger.info(f"[delivery-reaper] просроченные аренды: requeued={result['requeued']}, failed={result['failed']}")
+
+
+delivery_reaper = PeriodicTask("delivery-lease-reaper", settings.BROADCAST_REAPER_SEC, _reap_delivery_leases)
+
+
+async def _archive_deliveries() -> None:
+    result = await archive_finished_broadcasts()
+    if result["broadcasts"]:
+        logger.info(f"[delivery-archiver] рассылок: {result['broadcasts']}, перенесено доставок: {result['moved']}")
+
+
+delivery_archiver = PeriodicTask("delivery-archiver", settings.BROADCAST_ARCHIVE_SEC, _archive_deliveries)
+
+
+async def _fill_ads_next_runs() -> None:
+    async with AsyncSessionLocal() as session:
+        filled = await fill_missing_next_runs(session)
+    if filled:
+        logger.info(f"[ads] досчитан next_run_at: {filled}")
+
+
+async def _rebuild_random_branches() -> None:
+    async with AsyncSessionLocal() as session:
+        result = await rebuild_random_branches(
+            session,
+            now=now_msk_naive(),
+            spacing_min=settings.AD_RANDOM_MIN_SPACING_MIN,
+            keep_days=settings.AD_RANDOM_KEEP_DAYS,
+        )
+    if result["branches"]:
+        logger.info(f"[ad-random] перестроено веток: {result['branches']}, слотов: {result['slots']}")
+
+
+ad_random_rebuilder = PeriodicTask("ad-random-rebuild", settings.AD_RANDOM_CHECK_SEC, _rebuild_random_branches)
+
+loop_lag = LoopLag(settings.METRICS_LOOP_LAG_SEC)
+loop_lag_probe = PeriodicTask("loop-lag-probe", settings.METRICS_LOOP_LAG_SEC, loop_lag.measure)
+
+register_collector(pool_collector(engine))
+register_collector(cache_collector({"send_plan": send_plan_cache, "route_index": route_index}))
+register_collector(stats_collector("admission", admission.stats))
+register_collector(stats_collector("blocklist", scanner_blocklist.stats))
+register_collector(stats_collector("db_retry", db_retry_policy.stats))
+register_collector(stats_collector("sql", query_stats.stats))
+register_collector(loop_lag.render)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # startup
     await init_db()
+    await _fill_ads_next_runs()
+    progress_coalescer.start()
+    funnel_reconciler.start()
+    delivery_reaper.start()
+    delivery_archiver.start()
+    ad_random_rebuilder.start()
+    loop_lag_probe.start()
     yield
-    # shutdown — освобождаем соединения пула
+    # shutdown — дописываем отложенный прогресс и освобождаем соединения пула
+    await loop_lag_probe.stop()
+    await ad_random_rebuilder.stop()
+    await delivery_archiver.stop()
+    await delivery_reaper.stop()
+    await funnel_reconciler.stop()
+    await progress_coalescer.stop()
     await engine.dispose()
 
 
-app = FastAPI(title="DB Service API", lifespan=lifespan)
-app.add_middleware(SuppressRootAccessLogMiddleware)
+app = FastAPI(title="DB Service API", lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(GatewayMiddleware)
+admission.watch_pool(engine)
+if settings.SQL_TIMING_ENABLED:
+    query_stats.install(engine)
 register_exception_handlers(app)
 
 
@@ -48,35 +135,20 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     return await request_validation_exception_handler(request, exc)
 
 
-@app.middleware("http")
-async def catch_all_exceptions(request: Request, call_next):
-    try:
-        return await call_next(request)
-
-    except BaseExceptionGroup as eg:
-        sub = eg.exceptions[0]
-        if isinstance(sub, IntegrityError):
-            return await handle_integrity_error(request, sub)
-        return await handle_global_exception(request, sub)
-
-    except IntegrityError as exc:
-        return await handle_integrity_error(request, exc)
-
-    except Exception as exc:
-        return await handle_global_exception(request, exc)
-
-
 # Публичные эндпоинты (без ключа)
 app.include_router(health.router)
+app.include_router(metrics.router)
 
 # Закрытые эндпоинты (требуют X-API-KEY)
 secured = [Security(get_api_key)]
 
-app.add_middleware(RequestLogMiddleware)
-app.add_middleware(SuppressRootAccessLogMiddleware)
 app.include_router(chats.router, dependencies=secured)
 app.include_router(users.router, dependencies=secured)
 app.include_router(memberships.router, dependencies=secured)
 app.include_router(invite_links.router, dependencies=secured)
 app.include_router(algorithm.router, dependencies=secured)
 app.include_router(links.router, dependencies=secured)
+app.include_router(broadcasts.router, dependencies=secured)
+app.include_router(subscriptions.router, dependencies=secured)
+app.include_router(ads.router, dependencies=secured)
+app.include_router(debug.router, dependencies=secured)
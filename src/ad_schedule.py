@@ -0,0 +1,136 @@
+# src/ad_schedule.py
+# commit: random_day_slots — объявления без dedupe_minute делят минуты между собой, но не с dedupe-слотами
+
+from __future__ import annotations
+
+import random
+from datetime import date, datetime, time, timedelta
+
+from apscheduler.triggers.cron import CronTrigger
+
+from src.time_msk import MSK
+
+
+def parse_cron(expr: str) -> CronTrigger:
+    """Crontab из 5 полей в МСК; битое выражение — ValueError."""
+    return CronTrigger.from_crontab((expr or "").strip(), timezone=MSK)
+
+
+def next_cron_time(expr: str, after: datetime) -> datetime | None:
+    """Первое срабатывание cron строго позже after (оба МСК-naive)."""
+    after_aware = after.replace(tzinfo=MSK)
+    # previous_fire_time=after → триггер ищет строго после него
+    fire = parse_cron(expr).get_next_fire_time(after_aware, after_aware)
+    return fire.astimezone(MSK).replace(tzinfo=None) if fire else None
+
+
+def next_n_days_time(start: date, at: time, interval: int, after: datetime) -> datetime:
+    """Срабатывание раз в interval дней начиная со start в at: первое строго позже after."""
+    first = datetime.combine(start, at)
+    if first > after:
+        return first
+    periods = (after - first) // timedelta(days=interval) + 1
+    return first + timedelta(days=interval * periods)
+
+
+def validate_schedule(fields: dict) -> None:
+    """Проверка согласованности полей расписания; ValueError с понятным текстом."""
+    schedule_type = fields.get("schedule_type")
+    if schedule_type == "cron":
+        if not fields.get("schedule_cron"):
+            raise ValueError("для schedule_type=cron нужен schedule_cron")
+        parse_cron(fields["schedule_cron"])
+    elif schedule_type == "n_days":
+        missing = [f for f in ("n_days_start_date", "n_days_time", "n_days_interval") if fields.get(f) is None]
+        if missing:
+            raise ValueError(f"для schedule_type=n_days не заданы: {', '.join(missing)}")
+        if int(fields["n_days_interval"]) < 1:
+            raise ValueError("n_days_interval должен быть ≥ 1")
+    if fields.get("auto_delete_cron"):
+        parse_cron(fields["auto_delete_cron"])
+
+
+def compute_next_run(ad, after: datetime) -> datetime | None:
+    """
+    Следующее срабатывание объявления строго позже after.
+    random-объявления здесь не считаются: их слоты раскладывает суточная перестройка
+    веток ad_random_branches.
+    """
+    if not ad.enabled:
+        return None
+    if ad.schedule_type == "cron" and ad.schedule_cron:
+        return next_cron_time(ad.schedule_cron, after)
+    if ad.schedule_type == "n_days" and ad.n_days_start_date and ad.n_days_time and ad.n_days_interval:
+        return next_n_days_time(ad.n_days_start_date, ad.n_days_time, int(ad.n_days_interval), after)
+    return None
+
+
+def compute_delete_at(ad, posted_at: datetime) -> datetime | None:
+    """Автоудаление публикации: раньшее из posted_at + ttl и следующего auto_delete_cron."""
+    candidates = []
+    if ad.auto_delete_ttl_hours:
+        candidates.append(posted_at + timedelta(hours=int(ad.auto_delete_ttl_hours)))
+    if ad.auto_delete_cron:
+        fire = next_cron_time(ad.auto_delete_cron, posted_at)
+        if fire is not None:
+            candidates.append(fire)
+    return min(candidates) if candidates else None
+
+
+def window_bounds(day: date, window_from: time, window_to: time) -> tuple[datetime, datetime]:
+    """Окно ветки на день; window_to ≤ window_from — окно через полночь."""
+    start = datetime.combine(day, window_from)
+    end = datetime.combine(day, window_to)
+    if end <= start:
+        end += timedelta(days=1)
+    return start, end
+
+
+def random_day_slots(
+    *,
+    branch_id: int,
+    day: date,
+    window_from: time,
+    window_to: time,
+    ad_ids: list[int],
+    spacing_min: int,
+    not_before: datetime | None = None,
+    shared_ad_ids: list[int] = (),
+) -> dict[int, datetime]:
+    """
+    Слоты random-объявлений ветки на день: по одному на объявление, с точностью до минуты.
+    ad_ids — объявления с dedupe_minute: своя минута, в которую не попадает никто другой,
+    соседние такие слоты не ближе spacing_min минут. shared_ad_ids — dedupe_minute=False:
+    случайная минута окна вне занятых ad_ids, такие объявления могут совпасть друг с другом
+    и интервал не расходуют.
+
+    RNG сидируется (branch_id, day): повторная перестройка того же дня даёт то же расписание.
+    Равномерная раскладка с интервалом: n точек в [0, free] (free = длина − (n−1)·spacing),
+    сортируются и сдвигаются на i·spacing. Если окно не вмещает интервал — он сжимается
+    до 1 минуты, а не поместившиеся объявления в этот день пропускаются.
+    """
+    start, end = window_bounds(day, window_from, window_to)
+    if not_before is not None and not_before > start:
+        # перестройка посреди окна — раскладываем только оставшуюся часть
+        start = (not_before + timedelta(minutes=1)).replace(second=0, microsecond=0)
+    length = int((end - start) // timedelta(minutes=1))
+    if length < 0 or not (ad_ids or shared_ad_ids):
+        return {}
+
+    rng = random.Random(f"{branch_id}:{day.isoformat()}")
+    ids = sorted(ad_ids)
+    rng.shuffle(ids)
+
+    n = min(len(ids), length + 1)
+    ids = ids[:n]
+    spacing = spacing_min if n <= 1 else max(1, min(spacing_min, length // (n - 1)))
+    free = length - (n - 1) * spacing
+    offsets = sorted(rng.randint(0, free) for _ in range(n))
+    minutes = {ad_id: off + i * spacing for i, (ad_id, off) in enumerate(zip(ids, offsets))}
+
+    taken = set(minutes.values())
+    open_minutes = [m for m in range(length + 1) if m not in taken] if shared_ad_ids else []
+    if open_minutes:
+        for ad_id in sorted(shared_ad_ids):
+            minutes[ad_id] = rng.choice(open_minutes)
+    return {ad_id: start + timedelta(minutes=m) for ad_id, m in minutes.items()}
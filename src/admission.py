@@ -0,0 +1,261 @@
+# src/admission.py
+# commit: /metrics без admission control
+
+"""
+Admission control перед обработчиками API.
+
+Без него при медленной MySQL запросы висят в ожидании соединения пула до POOL_TIMEOUT
+(30 с) и копятся в памяти, хотя боты к этому времени уже отвалились по своему таймауту.
+
+- Запрос допускается, если в работе меньше max_inflight, по его роуту (шаблону из
+  RouteIndex) меньше route_limit и в пуле БД есть свободное соединение (счётчик
+  checkout/checkin из событий пула — занятые фоновыми задачами соединения тоже видны).
+- Иначе запрос встаёт в ограниченную очередь: сначала чтения, потом записи;
+  освободившееся место отдаётся первому в самом приоритетном классе, чей роут не упёрся
+  в лимит. Пришедшее чтение при полной очереди вытесняет последнюю запись.
+- Быстрый отказ 503 + Retry-After: очередь полна; ожидаемое ожидание (глубина очереди ×
+  среднее время обработки / max_inflight) больше max_wait; дедлайн истёк в очереди.
+- Health-эндпоинты, /metrics и SSE-стримы admission не проходят.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+
+from src.config import settings
+
+PRIORITY_READ = 0
+PRIORITY_WRITE = 1
+_PRIORITIES = (PRIORITY_READ, PRIORITY_WRITE)
+_READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# роуты без admission: health и метрики отвечают без БД, стрим держит соединение минутами
+_EXEMPT_PREFIXES = ("/health",)
+_EXEMPT_ROUTES = frozenset({"/", "/panic", "/metrics", "/broadcasts/{broadcast_id}/progress/stream"})
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("route", "priority", "future")
+
+    def __init__(self, route: str, priority: int, future: asyncio.Future) -> None:
+        self.route = route
+        self.priority = priority
+        self.future = future
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        *,
+        max_inflight: int,
+        route_limit: int,
+        queue_size: int,
+        max_wait: float,
+        pool_capacity: int,
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.max_inflight = max(1, max_inflight)
+        self.route_limit = max(1, route_limit)
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.pool_capacity = pool_capacity
+
+        self.inflight = 0
+        self.pool_in_use = 0
+        self._route_inflight: dict[str, int] = {}
+        self._queues: tuple[deque[_Waiter], ...] = tuple(deque() for _ in _PRIORITIES)
+        self._service_time = 0.05  # EWMA времени обработки, с
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_deadline = 0
+        self.shed_timeout = 0
+
+    # ── пул БД ──
+
+    def watch_pool(self, engine) -> None:
+        """Подписка на checkout/checkin пула (AsyncEngine или Engine)."""
+        from sqlalchemy import event
+
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "checkin", self._on_checkin)
+
+    def _on_checkout(self, *args) -> None:
+        self.pool_in_use += 1
+
+    def _on_checkin(self, *args) -> None:
+        self.pool_in_use = max(0, self.pool_in_use - 1)
+        if self._loop is not None and self.queue_depth:
+            # checkin может прийти и не из потока цикла (сборщик мусора)
+            self._loop.call_soon_threadsafe(self._wake)
+
+    # ── допуск ──
+
+    @staticmethod
+    def is_exempt(route: str) -> bool:
+        return route in _EXEMPT_ROUTES or route.startswith(_EXEMPT_PREFIXES)
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self._queues)
+
+    def _has_room(self, route: str) -> bool:
+        return (
+            self.inflight < self.max_inflight
+            and self._route_inflight.get(route, 0) < self.route_limit
+            and self.pool_in_use < self.pool_capacity
+        )
+
+    def _take(self, route: str) -> None:
+        self.inflight += 1
+        self._route_inflight[route] = self._route_inflight.get(route, 0) + 1
+        self.admitted += 1
+
+    def _retry_after(self, depth: int) -> int:
+        return max(1, math.ceil((depth + 1) * self._service_time / self.max_inflight))
+
+    async def acquire(self, route: str, method: str) -> bool:
+        """
+        True — запрос допущен, после обработки обязателен release(route, started).
+        False — роут вне admission. Overloaded — отказ (503).
+        """
+        if not self.enabled or self.is_exempt(route):
+            return False
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+
+        priority = PRIORITY_READ if method in _READ_METHODS else PRIORITY_WRITE
+        # очередь не пуста — встаём за ней, иначе свежий запрос обгонял бы ждущих
+        ahead = sum(len(q) for q in self._queues[: priority + 1])
+        if not ahead and self._has_room(route):
+            self._take(route)
+            return True
+
+        depth = self.queue_depth
+        expected = (ahead + 1) * self._service_time / self.max_inflight
+        if expected > self.max_wait:
+            self.shed_deadline += 1
+            raise Overloaded("deadline", self._retry_after(depth))
+        if depth >= self.queue_size and not self._evict_below(priority):
+            self.shed_queue_full += 1
+            raise Overloaded("queue_full", self._retry_after(depth))
+
+        waiter = _Waiter(route, priority, self._loop.create_future())
+        self._queues[priority].append(waiter)
+        self.queued += 1
+        try:
+            # shield: по таймауту future не отменяется — место могли выдать в тот же момент
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if waiter.future.done():
+                return self._result(waiter)
+            self._drop(waiter)
+            self.shed_timeout += 1
+            raise Overloaded("timeout", self._retry_after(self.queue_depth))
+        except asyncio.CancelledError:
+            # клиент ушёл: если место уже выдали — возвращаем его
+            if waiter.future.done():
+                if waiter.future.exception() is None:
+                    self.release(route)
+            else:
+                self._drop(waiter)
+            raise
+        return self._result(waiter)
+
+    @staticmethod
+    def _result(waiter: _Waiter) -> bool:
+        exc = waiter.future.exception()
+        if exc is not None:
+            raise exc
+        return True
+
+    def _drop(self, waiter: _Waiter) -> None:
+        try:
+            self._queues[waiter.priority].remove(waiter)
+        except ValueError:
+            pass
+        if not waiter.future.done():
+            waiter.future.cancel()
+
+    def _evict_below(self, priority: int) -> bool:
+        """Освобождает место в очереди, вытесняя последнего ждущего с меньшим приоритетом."""
+        for lower in reversed(_PRIORITIES):
+            if lower <= priority:
+                break
+            if self._queues[lower]:
+                victim = self._queues[lower].pop()
+                self.shed_queue_full += 1
+                victim.future.set_exception(Overloaded("queue_full", self._retry_after(self.queue_depth)))
+                return True
+        return False
+
+    def release(self, route: str, started: float | None = None) -> None:
+        self.inflight = max(0, self.inflight - 1)
+        left = self._route_inflight.get(route, 1) - 1
+        if left > 0:
+            self._route_inflight[route] = left
+        else:
+            self._route_inflight.pop(route, None)
+        if started is not None:
+            self._service_time += 0.1 * ((time.monotonic() - started) - self._service_time)
+        if self.queue_depth:
+            self._wake()
+
+    def _wake(self) -> None:
+        for q in self._queues:
+            if not q:
+                continue
+            for waiter in list(q):
+                if self.inflight >= self.max_inflight or self.pool_in_use >= self.pool_capacity:
+                    return
+                if waiter.future.done():
+                    q.remove(waiter)
+                    continue
+                if self._route_inflight.get(waiter.route, 0) < self.route_limit:
+                    q.remove(waiter)
+                    self._take(waiter.route)
+                    waiter.future.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "pool_in_use": self.pool_in_use,
+            "pool_capacity": self.pool_capacity,
+            "queue_depth": self.queue_depth,
+            "queue_depth_read": len(self._queues[PRIORITY_READ]),
+            "queue_depth_write": len(self._queues[PRIORITY_WRITE]),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_deadline": self.shed_deadline,
+            "shed_timeout": self.shed_timeout,
+            "avg_service_ms": round(self._service_time * 1000, 1),
+        }
+
+
+_pool_capacity = settings.resolved_pool_size + settings.resolved_max_overflow
+
+admission = AdmissionController(
+    max_inflight=settings.ADMISSION_MAX_INFLIGHT or _pool_capacity,
+    route_limit=settings.ADMISSION_ROUTE_LIMIT,
+    queue_size=settings.ADMISSION_QUEUE_SIZE,
+    max_wait=settings.ADMISSION_MAX_WAIT_SEC,
+    pool_capacity=_pool_capacity,
+    enabled=settings.ADMISSION_ENABLED,
+)
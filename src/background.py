@@ -0,0 +1,69 @@
+# src/background.py
+# commit: общий помощник для фоновых периодических задач (старт/стоп из lifespan)
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Простой периодический таск для lifespan.
+
+    - func вызывается раз в interval секунд (ошибки логируются, цикл не падает);
+    - on_stop (если задан) вызывается один раз при остановке — например, финальный flush.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        interval: float,
+        func: Callable[[], Awaitable[None]],
+        *,
+        on_stop: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        self.name = name
+        self.interval = float(interval)
+        self.func = func
+        self.on_stop = on_stop
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._stopping.set()
+            try:
+                await self._task
+            finally:
+                self._task = None
+        if self.on_stop is not None:
+            try:
+                await self.on_stop()
+            except Exception as e:
+                logger.error(f"[{self.name}] ошибка при остановке: {e}", exc_info=True)
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+                break
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.func()
+            except Exception as e:
+                logger.error(f"[{self.name}] ошибка фоновой задачи: {e}", exc_info=True)
@@ -0,0 +1,146 @@
+# src/broadcast_archive.py
+# commit: архивация доставок завершённых рассылок (фоновая задача + CLI) и DDL перехода на RANGE-партиции
+
+"""
+Архивация broadcast_deliveries.
+
+Фоновая задача (main.py lifespan) раз в BROADCAST_ARCHIVE_SEC переносит доставки
+рассылок, завершённых больше BROADCAST_ARCHIVE_AFTER_DAYS дней назад, в компактную
+broadcast_deliveries_archive. В горячей таблице остаются только открытые рассылки,
+итоги — в счётчиках broadcasts.
+
+CLI:
+    python -m src.broadcast_archive run [--days N] [--chunk N]
+    python -m src.broadcast_archive partition-ddl [--step N] [--ahead N] [--apply]
+
+partition-ddl печатает (или с --apply выполняет) DDL перевода broadcast_deliveries
+на PARTITION BY RANGE (broadcast_id), а для уже партиционированной таблицы — нарезку
+следующих диапазонов из pmax. Ключ — broadcast_id, а не created_at: MySQL требует,
+чтобы ключ партиционирования входил в каждый уникальный индекс, а
+uq_bdeliveries_broadcast_user (broadcast_id, user_id) без created_at терять нельзя.
+Партиционированные InnoDB-таблицы не поддерживают внешние ключи, поэтому FK на
+broadcasts снимается (каскадное удаление доставок при удалении рассылки пропадает).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from src import crud
+from src.config import settings
+from src.database import AsyncSessionLocal, engine
+from src.time_msk import now_msk_naive
+
+logger = logging.getLogger(__name__)
+
+_TABLE = "broadcast_deliveries"
+
+
+async def archive_finished_broadcasts(*, days: int | None = None, chunk_size: int | None = None) -> dict:
+    days = settings.BROADCAST_ARCHIVE_AFTER_DAYS if days is None else days
+    chunk_size = chunk_size or settings.BROADCAST_ARCHIVE_CHUNK
+    cutoff = now_msk_naive() - timedelta(days=days)
+
+    broadcasts = moved = 0
+    while True:
+        async with AsyncSessionLocal() as session:
+            ids = await crud.list_archivable_broadcasts(session, finished_before=cutoff)
+        if not ids:
+            break
+        for broadcast_id in ids:
+            # своя сессия на рассылку: перенос сам управляет транзакциями чанков
+            async with AsyncSessionLocal() as session:
+                rows = await crud.archive_broadcast_deliveries(
+                    session, broadcast_id=broadcast_id, chunk_size=chunk_size
+                )
+            logger.info(f"[{broadcast_id}] [broadcast-archive] перенесено доставок: {rows}")
+            broadcasts += 1
+            moved += rows
+    return {"broadcasts": broadcasts, "moved": moved}
+
+
+def _range_partitions(start: int, stop: int, step: int) -> list[str]:
+    return [f"PARTITION p{bound} VALUES LESS THAN ({bound})" for bound in range(start, stop + 1, step)]
+
+
+async def build_partition_ddl(*, step: int, ahead: int) -> list[str]:
+    """DDL на текущий момент: перевод на партиции или добавление диапазонов перед pmax."""
+    async with engine.connect() as conn:
+        max_id = (await conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM broadcasts"))).scalar_one()
+        upto = (int(max_id) // step + 1 + ahead) * step
+
+        bounds = (
+            await conn.execute(
+                text(
+                    "SELECT PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL"
+                ),
+                {"t": _TABLE},
+            )
+        ).scalars().all()
+
+        if not bounds:
+            fk_names = (
+                await conn.execute(
+                    text(
+                        "SELECT CONSTRAINT_NAME FROM information_schema.KEY_COLUMN_USAGE "
+                        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND REFERENCED_TABLE_NAME = 'broadcasts'"
+                    ),
+                    {"t": _TABLE},
+                )
+            ).scalars().all()
+            parts = _range_partitions(step, upto, step) + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]
+            ddl = [f"ALTER TABLE {_TABLE} DROP FOREIGN KEY `{name}`" for name in fk_names]
+            ddl.append(
+                f"ALTER TABLE {_TABLE} DROP PRIMARY KEY, ADD PRIMARY KEY (id, broadcast_id) "
+                f"PARTITION BY RANGE (broadcast_id) (\n    " + ",\n    ".join(parts) + "\n)"
+            )
+            return ddl
+
+    last = max((int(b) for b in bounds if b.isdigit()), default=0)
+    if last >= upto:
+        return []
+    parts = _range_partitions(last + step, upto, step) + ["PARTITION pmax VALUES LESS THAN MAXVALUE"]
+    return [f"ALTER TABLE {_TABLE} REORGANIZE PARTITION pmax INTO (\n    " + ",\n    ".join(parts) + "\n)"]
+
+
+async def _main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.broadcast_archive")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="перенести доставки завершённых рассылок в архив")
+    run.add_argument("--days", type=int, default=None)
+    run.add_argument("--chunk", type=int, default=None)
+
+    ddl = sub.add_parser("partition-ddl", help="DDL RANGE-партиционирования broadcast_deliveries по broadcast_id")
+    ddl.add_argument("--step", type=int, default=1000, help="рассылок на партицию")
+    ddl.add_argument("--ahead", type=int, default=2, help="сколько пустых партиций держать впереди")
+    ddl.add_argument("--apply", action="store_true", help="выполнить, а не только напечатать")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "run":
+            result = await archive_finished_broadcasts(days=args.days, chunk_size=args.chunk)
+            print(f"рассылок: {result['broadcasts']}, перенесено доставок: {result['moved']}")
+            return
+
+        statements = await build_partition_ddl(step=args.step, ahead=args.ahead)
+        if not statements:
+            print("-- партиций достаточно, изменений нет")
+        for stmt in statements:
+            print(stmt + ";")
+            if args.apply:
+                async with engine.begin() as conn:
+                    await conn.execute(text(stmt))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -0,0 +1,147 @@
+# src/broadcast_progress.py
+# commit: хаб прогресса рассылок — один опрос БД на рассылку за интервал для всех GET/SSE-наблюдателей
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncIterator
+
+from src.config import settings
+from src.crud.broadcasts import load_broadcast_progress
+from src.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+_COUNTERS = ("total", "pending", "claimed", "sent", "failed", "skipped")
+_HEARTBEAT_SEC = 15.0
+_QUEUE_SIZE = 8
+_MAX_IDLE_ENTRIES = 1024
+
+
+class _Entry:
+    __slots__ = ("snapshot", "fetched_at", "lock", "subscribers", "poller")
+
+    def __init__(self) -> None:
+        self.snapshot: dict | None = None
+        self.fetched_at = 0.0
+        self.lock = asyncio.Lock()
+        self.subscribers: set[asyncio.Queue] = set()
+        self.poller: asyncio.Task | None = None
+
+
+class BroadcastProgressHub:
+    """
+    Прогресс рассылок для операторов.
+
+    - снимок на рассылку кешируется на interval: сколько бы GET ни пришло, в БД уходит
+      не больше одного чтения за интервал (конкурентные промахи ждут один запрос);
+    - для SSE на рассылку работает один поллер, который раз в interval читает снимок
+      и рассылает дельту всем подписчикам (50 операторов = одна нагрузка на БД);
+    - claim/report вызывают apply_delta — кеш сразу сдвигается без чтения БД.
+    """
+
+    def __init__(self, *, interval_ms: int) -> None:
+        self.interval = max(interval_ms, 50) / 1000
+        self._entries: dict[int, _Entry] = {}
+
+    def _entry(self, broadcast_id: int) -> _Entry:
+        entry = self._entries.get(broadcast_id)
+        if entry is None:
+            if len(self._entries) >= _MAX_IDLE_ENTRIES:
+                for bid in [b for b, e in self._entries.items() if not e.subscribers]:
+                    del self._entries[bid]
+            entry = self._entries[broadcast_id] = _Entry()
+        return entry
+
+    async def _fetch(self, broadcast_id: int) -> dict | None:
+        async with AsyncSessionLocal() as session:
+            return await load_broadcast_progress(session, broadcast_id=broadcast_id)
+
+    async def get(self, broadcast_id: int) -> dict | None:
+        entry = self._entry(broadcast_id)
+        if entry.snapshot is not None and time.monotonic() - entry.fetched_at < self.interval:
+            return dict(entry.snapshot)
+
+        async with entry.lock:
+            # пока ждали lock, снимок мог обновить соседний запрос
+            if entry.snapshot is None or time.monotonic() - entry.fetched_at >= self.interval:
+                entry.snapshot = await self._fetch(broadcast_id)
+                entry.fetched_at = time.monotonic()
+            snapshot = entry.snapshot
+
+        if snapshot is None and not entry.subscribers:
+            self._entries.pop(broadcast_id, None)
+        return dict(snapshot) if snapshot is not None else None
+
+    def apply_delta(self, broadcast_id: int, **deltas: int) -> None:
+        entry = self._entries.get(broadcast_id)
+        if entry is None or entry.snapshot is None:
+            return
+        for name, delta in deltas.items():
+            if name in _COUNTERS and delta:
+                entry.snapshot[name] = max(entry.snapshot.get(name, 0) + delta, 0)
+
+    async def stream(self, broadcast_id: int) -> AsyncIterator[str]:
+        """SSE: сначала полный снимок (event: snapshot), дальше только изменившиеся поля (event: delta)."""
+        entry = self._entry(broadcast_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=_QUEUE_SIZE)
+        entry.subscribers.add(queue)
+        if entry.poller is None or entry.poller.done():
+            entry.poller = asyncio.create_task(self._poll(broadcast_id), name=f"broadcast-progress-{broadcast_id}")
+
+        try:
+            snapshot = await self.get(broadcast_id)
+            yield _sse("snapshot", snapshot)
+            while True:
+                try:
+                    event, payload = await asyncio.wait_for(queue.get(), timeout=_HEARTBEAT_SEC)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event, payload)
+        finally:
+            entry.subscribers.discard(queue)
+            if not entry.subscribers and entry.poller is not None:
+                entry.poller.cancel()
+                entry.poller = None
+
+    async def _poll(self, broadcast_id: int) -> None:
+        entry = self._entry(broadcast_id)
+        previous = dict(entry.snapshot) if entry.snapshot else None
+        while entry.subscribers:
+            await asyncio.sleep(self.interval)
+            try:
+                current = await self.get(broadcast_id)
+            except Exception as e:
+                logger.error(f"[{broadcast_id}] [progress-hub] ошибка опроса: {e}", exc_info=True)
+                continue
+
+            if current == previous:
+                continue
+            if previous is None or current is None:
+                event, payload = "snapshot", current
+            else:
+                event = "delta"
+                payload = {k: v for k, v in current.items() if previous.get(k) != v}
+                payload["broadcast_id"] = broadcast_id
+            previous = current
+
+            for queue in list(entry.subscribers):
+                if queue.full():
+                    # медленный клиент: выкидываем накопленное и шлём полный снимок
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(("snapshot", current))
+                else:
+                    queue.put_nowait((event, payload))
+
+
+def _sse(event: str, payload: dict | None) -> str:
+    data = json.dumps(payload, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+progress_hub = BroadcastProgressHub(interval_ms=settings.BROADCAST_PROGRESS_INTERVAL_MS)
@@ -1,17 +1,21 @@
 # src/config.py
-# commit: нормализация настроек пула + стабилизация imports для pydantic_settings
+# commit: убран SUBSCRIBERS_RELOAD_SEC вместе с резолвером подписчиков в памяти
 
-from pydantic import Field
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
-    # Database
-    DB_HOST: str = Field(..., validation_alias="DB_HOST")
+    # Database: mysql (продакшн) | sqlite (локальные прогоны и бенчмарки без сервера БД)
+    DB_BACKEND: str = Field("mysql", validation_alias="DB_BACKEND")
+    DB_DRIVER: str = Field("aiomysql", validation_alias="DB_DRIVER")  # для mysql: aiomysql | asyncmy
+    # для sqlite: путь к файлу (WAL) или :memory: — одно соединение на процесс
+    SQLITE_PATH: str = Field(":memory:", validation_alias="SQLITE_PATH")
+    DB_HOST: str = Field("", validation_alias="DB_HOST")
     DB_PORT: int = Field(3306, validation_alias="DB_PORT")
-    DB_USER: str = Field(..., validation_alias="DB_USER")
-    DB_PASSWORD: str = Field(..., validation_alias="DB_PASSWORD")
-    DB_NAME: str = Field(..., validation_alias="DB_NAME")
+    DB_USER: str = Field("", validation_alias="DB_USER")
+    DB_PASSWORD: str = Field("", validation_alias="DB_PASSWORD")
+    DB_NAME: str = Field("", validation_alias="DB_NAME")
 
     # Pool (предпочтительные имена)
     POOL_SIZE: int = Field(10, validation_alias="POOL_SIZE")
@@ -26,17 +30,123 @@ class Settings(BaseSettings):
     # Logging / Telegram
     TELEGRAM_BOT_TOKEN: str = Field(..., validation_alias="TELEGRAM_BOT_TOKEN")
     LOG_CHANNEL_ID: int = Field(..., validation_alias="LOG_CHANNEL_ID")
+    LOG_TG_QUEUE_SIZE: int = Field(1000, validation_alias="LOG_TG_QUEUE_SIZE")
+    LOG_TG_FLUSH_SEC: float = Field(2.0, validation_alias="LOG_TG_FLUSH_SEC")
+    LOG_TG_RATE_PER_MIN: int = Field(20, validation_alias="LOG_TG_RATE_PER_MIN")  # лимит Bot API на группу/канал
 
     # Auth
     JWT_SECRET_KEY: str = Field(..., validation_alias="JWT_SECRET_KEY")
     API_KEY_VALUE: str = Field(..., validation_alias="API_KEY_VALUE")
 
+    # Блоклист сканеров (GatewayMiddleware)
+    BLOCKLIST_ENABLED: bool = Field(True, validation_alias="BLOCKLIST_ENABLED")
+    BLOCKLIST_THRESHOLD: int = Field(30, validation_alias="BLOCKLIST_THRESHOLD")  # мусорных запросов за окно
+    BLOCKLIST_WINDOW_SEC: int = Field(60, validation_alias="BLOCKLIST_WINDOW_SEC")
+    BLOCKLIST_BAN_SEC: int = Field(900, validation_alias="BLOCKLIST_BAN_SEC")
+    BLOCKLIST_MAX_BANS: int = Field(10000, validation_alias="BLOCKLIST_MAX_BANS")
+    # x-real-ip / x-forwarded-for учитываются только от этих адресов (через запятую, можно CIDR)
+    TRUSTED_PROXIES: str = Field("127.0.0.1,::1", validation_alias="TRUSTED_PROXIES")
+    # эти адреса (и TRUSTED_PROXIES) блоклист не считает и не банит: свой прокси, балансер, внутренние сервисы
+    BLOCKLIST_ALLOWLIST: str = Field(
+        "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7",
+        validation_alias="BLOCKLIST_ALLOWLIST",
+    )
+
+    # Метрики (/metrics)
+    METRICS_LOOP_LAG_SEC: float = Field(0.5, validation_alias="METRICS_LOOP_LAG_SEC")
+
+    # Тайминг SQL (src/sql_timing.py)
+    SQL_TIMING_ENABLED: bool = Field(True, validation_alias="SQL_TIMING_ENABLED")
+    SQL_SLOW_MS: float = Field(200.0, validation_alias="SQL_SLOW_MS")
+    SQL_FINGERPRINTS_MAX: int = Field(2000, validation_alias="SQL_FINGERPRINTS_MAX")
+
+    # Ретраи БД (src/db_retry.py)
+    REQUEST_DEADLINE_SEC: float = Field(10.0, validation_alias="REQUEST_DEADLINE_SEC")
+    DB_RETRY_MAX_ATTEMPTS: int = Field(4, validation_alias="DB_RETRY_MAX_ATTEMPTS")
+    DB_RETRY_BASE_MS: int = Field(50, validation_alias="DB_RETRY_BASE_MS")
+    DB_RETRY_MAX_BACKOFF_SEC: float = Field(2.0, validation_alias="DB_RETRY_MAX_BACKOFF_SEC")
+    DB_RETRY_DEFAULT_DEADLINE_SEC: float = Field(30.0, validation_alias="DB_RETRY_DEFAULT_DEADLINE_SEC")  # вне запроса
+    DB_RETRY_BUDGET_PER_SEC: float = Field(2.0, validation_alias="DB_RETRY_BUDGET_PER_SEC")
+    DB_RETRY_BUDGET_BURST: int = Field(20, validation_alias="DB_RETRY_BUDGET_BURST")
+    DB_BREAKER_THRESHOLD: int = Field(5, validation_alias="DB_BREAKER_THRESHOLD")
+    DB_BREAKER_OPEN_SEC: float = Field(10.0, validation_alias="DB_BREAKER_OPEN_SEC")
+
+    # Admission control (GatewayMiddleware): 0 — по ёмкости пула (POOL_SIZE + MAX_OVERFLOW)
+    ADMISSION_ENABLED: bool = Field(True, validation_alias="ADMISSION_ENABLED")
+    ADMISSION_MAX_INFLIGHT: int = Field(0, validation_alias="ADMISSION_MAX_INFLIGHT")
+    ADMISSION_ROUTE_LIMIT: int = Field(20, validation_alias="ADMISSION_ROUTE_LIMIT")
+    ADMISSION_QUEUE_SIZE: int = Field(200, validation_alias="ADMISSION_QUEUE_SIZE")
+    ADMISSION_MAX_WAIT_SEC: float = Field(5.0, validation_alias="ADMISSION_MAX_WAIT_SEC")
+
+    # Algorithm progress: коалесинг частых записей шага
+    ALGO_COALESCE_ENABLED: bool = Field(False, validation_alias="ALGO_COALESCE_ENABLED")
+    ALGO_COALESCE_WINDOW_MS: int = Field(300, validation_alias="ALGO_COALESCE_WINDOW_MS")
+    ALGO_FUNNEL_RECONCILE_SEC: int = Field(900, validation_alias="ALGO_FUNNEL_RECONCILE_SEC")
+
+    # Broadcasts
+    BROADCAST_MATERIALIZE_CHUNK: int = Field(10000, validation_alias="BROADCAST_MATERIALIZE_CHUNK")
+    # sql-таргеты: имя → SELECT ... AS user_id (JSON в env); по API передаётся только имя
+    BROADCAST_SQL_AUDIENCES: dict[str, str] = Field(default_factory=dict, validation_alias="BROADCAST_SQL_AUDIENCES")
+    BROADCAST_CLAIM_MAX: int = Field(1000, validation_alias="BROADCAST_CLAIM_MAX")
+    BROADCAST_LEASE_SEC: int = Field(120, validation_alias="BROADCAST_LEASE_SEC")
+    BROADCAST_MAX_ATTEMPTS: int = Field(5, validation_alias="BROADCAST_MAX_ATTEMPTS")
+    BROADCAST_REAPER_SEC: int = Field(30, validation_alias="BROADCAST_REAPER_SEC")
+    BROADCAST_REPORT_CHUNK: int = Field(500, validation_alias="BROADCAST_REPORT_CHUNK")
+    BROADCAST_PROGRESS_INTERVAL_MS: int = Field(1000, validation_alias="BROADCAST_PROGRESS_INTERVAL_MS")
+    BROADCAST_ARCHIVE_AFTER_DAYS: int = Field(30, validation_alias="BROADCAST_ARCHIVE_AFTER_DAYS")
+    BROADCAST_ARCHIVE_CHUNK: int = Field(5000, validation_alias="BROADCAST_ARCHIVE_CHUNK")
+    BROADCAST_ARCHIVE_SEC: int = Field(3600, validation_alias="BROADCAST_ARCHIVE_SEC")
+    # флаги подписки пользователя без строки в user_subscriptions (JSON в env, все три ключа)
+    SUBSCRIPTION_DEFAULTS: dict[str, bool] = Field(
+        default_factory=lambda: {"news_enabled": False, "meetings_enabled": True, "important_enabled": True},
+        validation_alias="SUBSCRIPTION_DEFAULTS",
+    )
+
+    # Ads: random-ветки
+    AD_RANDOM_MIN_SPACING_MIN: int = Field(10, validation_alias="AD_RANDOM_MIN_SPACING_MIN")
+    AD_RANDOM_KEEP_DAYS: int = Field(7, validation_alias="AD_RANDOM_KEEP_DAYS")
+    AD_RANDOM_CHECK_SEC: int = Field(60, validation_alias="AD_RANDOM_CHECK_SEC")
+
+    # Dispatcher (worker.py): отправка рассылок
+    BROADCAST_BOT_TOKEN: str | None = Field(None, validation_alias="BROADCAST_BOT_TOKEN")
+    TELEGRAM_API_BASE: str = Field("https://api.telegram.org", validation_alias="TELEGRAM_API_BASE")
+    DISPATCH_TRANSPORT: str = Field("telegram", validation_alias="DISPATCH_TRANSPORT")  # telegram | fake
+    DISPATCH_GLOBAL_RATE: float = Field(30.0, validation_alias="DISPATCH_GLOBAL_RATE")
+    DISPATCH_PER_CHAT_RATE: float = Field(1.0, validation_alias="DISPATCH_PER_CHAT_RATE")
+    DISPATCH_CLAIM_BATCH: int = Field(100, validation_alias="DISPATCH_CLAIM_BATCH")
+    DISPATCH_CONCURRENCY: int = Field(30, validation_alias="DISPATCH_CONCURRENCY")
+    DISPATCH_IDLE_SEC: float = Field(2.0, validation_alias="DISPATCH_IDLE_SEC")
+    DISPATCH_MAX_429_RETRIES: int = Field(3, validation_alias="DISPATCH_MAX_429_RETRIES")
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
         extra="ignore",
     )
 
+    @model_validator(mode="after")
+    def _check_db_backend(self) -> "Settings":
+        if self.DB_BACKEND not in ("mysql", "sqlite"):
+            raise ValueError(f"DB_BACKEND должен быть mysql или sqlite, получено {self.DB_BACKEND!r}")
+        if self.DB_BACKEND == "mysql":
+            if self.DB_DRIVER not in ("aiomysql", "asyncmy"):
+                raise ValueError(f"DB_DRIVER должен быть aiomysql или asyncmy, получено {self.DB_DRIVER!r}")
+            missing = [name for name in ("DB_HOST", "DB_USER", "DB_NAME") if not getattr(self, name)]
+            if missing:
+                raise ValueError(f"для DB_BACKEND=mysql не заданы: {', '.join(missing)}")
+        return self
+
+    @model_validator(mode="after")
+    def _check_subscription_defaults(self) -> "Settings":
+        expected = {"news_enabled", "meetings_enabled", "important_enabled"}
+        if set(self.SUBSCRIPTION_DEFAULTS) != expected:
+            raise ValueError(f"SUBSCRIPTION_DEFAULTS должен содержать ровно ключи {sorted(expected)}")
+        return self
+
+    @property
+    def sqlite_in_memory(self) -> bool:
+        return self.DB_BACKEND == "sqlite" and self.SQLITE_PATH in ("", ":memory:")
+
     @staticmethod
     def _safe_int(value: int | None, fallback: int) -> int:
         if value is None:
@@ -45,11 +155,15 @@ class Settings(BaseSettings):
 
     @property
     def resolved_pool_size(self) -> int:
+        if self.sqlite_in_memory:
+            return 1  # база живёт в единственном соединении
         v = self._safe_int(self.POOL_MIN_SIZE, self.POOL_SIZE)
         return max(0, v)
 
     @property
     def resolved_max_overflow(self) -> int:
+        if self.sqlite_in_memory:
+            return 0
         v = self._safe_int(self.POOL_MAX_SIZE, self.MAX_OVERFLOW)
         return max(0, v)
 
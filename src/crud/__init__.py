@@ -1,5 +1,5 @@
 # src/crud/__init__.py
-# commit: восстановлен верхнеуровневый API пакета crud (экспорт функций), добавлен links.increment_link_visit
+# commit: экспорт учёта публикаций объявлений и выборки удалений
 
 from .base import retry_db
 
@@ -36,10 +36,55 @@ from .algorithm_progress import (
     clear_user_data,
 )
 
+from .algorithm_funnel import (
+    load_funnel_snapshot,
+    reconcile_funnel,
+)
+
 from .links import (
     increment_link_visit,
 )
 
+from .broadcasts import (
+    BroadcastStateError,
+    create_broadcast,
+    get_broadcast,
+    get_broadcast_version,
+    update_broadcast,
+    set_broadcast_status,
+    add_broadcast_target,
+    list_broadcast_targets,
+    materialize_broadcast,
+    claim_deliveries,
+    reap_expired_leases,
+    report_deliveries,
+    load_broadcast_progress,
+    list_sending_broadcasts,
+    finish_broadcast_if_done,
+    list_archivable_broadcasts,
+    archive_broadcast_deliveries,
+)
+
+from .subscriptions import (
+    get_subscription,
+    upsert_subscriptions,
+    count_kind_subscribers,
+)
+
+from .ads import (
+    create_ad,
+    get_ad,
+    update_ad,
+    list_due_ads,
+    mark_ad_fired,
+    fill_missing_next_runs,
+    rebuild_random_branches,
+    list_random_slots,
+    report_ad_runs,
+    list_due_deletions,
+    mark_runs_deleted,
+)
+
 __all__ = [
     "retry_db",
     # users
@@ -67,6 +112,42 @@ __all__ = [
     "set_basic_completed",
     "set_advanced_completed",
     "clear_user_data",
+    "load_funnel_snapshot",
+    "reconcile_funnel",
     # links
     "increment_link_visit",
+    # broadcasts
+    "BroadcastStateError",
+    "create_broadcast",
+    "get_broadcast",
+    "get_broadcast_version",
+    "update_broadcast",
+    "set_broadcast_status",
+    "add_broadcast_target",
+    "list_broadcast_targets",
+    "materialize_broadcast",
+    "claim_deliveries",
+    "reap_expired_leases",
+    "report_deliveries",
+    "load_broadcast_progress",
+    "list_sending_broadcasts",
+    "finish_broadcast_if_done",
+    "list_archivable_broadcasts",
+    "archive_broadcast_deliveries",
+    # subscriptions
+    "get_subscription",
+    "upsert_subscriptions",
+    "count_kind_subscribers",
+    # ads
+    "create_ad",
+    "get_ad",
+    "update_ad",
+    "list_due_ads",
+    "mark_ad_fired",
+    "fill_missing_next_runs",
+    "rebuild_random_branches",
+    "list_random_slots",
+    "report_ad_runs",
+    "list_due_deletions",
+    "mark_runs_deleted",
 ]
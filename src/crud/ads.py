@@ -0,0 +1,382 @@
+# src/crud/ads.py
+# commit: выключенное/перенесённое random-объявление теряет будущие слоты; расписание слотов — только активные random
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, insert
+
+from .base import AsyncSession, delete, func, insert_ignore, retry_db, select, update, write_tx
+from src.ad_schedule import compute_delete_at, compute_next_run, random_day_slots, validate_schedule
+from src.models import Ad, AdRandomBranch, AdRandomSlot, AdRun
+from src.time_msk import now_msk_naive
+
+logger = logging.getLogger(__name__)
+
+# поля, от которых зависит next_run_at
+_SCHEDULE_FIELDS = (
+    "schedule_type",
+    "schedule_cron",
+    "n_days_start_date",
+    "n_days_time",
+    "n_days_interval",
+    "enabled",
+)
+_AD_FIELDS = (
+    "title",
+    "chat_id",
+    "thread_id",
+    "content_json",
+    *_SCHEDULE_FIELDS,
+    "delete_previous",
+    "dedupe_minute",
+    "auto_delete_ttl_hours",
+    "auto_delete_cron",
+    "created_by",
+)
+# после правки этих полей построенные слоты объявления больше не его: не та ветка или не random
+_SLOT_FIELDS = ("enabled", "schedule_type", "chat_id", "thread_id")
+
+
+def _schedule_snapshot(obj: Ad) -> dict:
+    return {f: getattr(obj, f) for f in (*_SCHEDULE_FIELDS, "auto_delete_cron")}
+
+
+async def _next_run(session: AsyncSession, obj: Ad, after: datetime) -> datetime | None:
+    """Следующее срабатывание: cron/n_days — расчётом, random — ближайший построенный слот."""
+    if obj.schedule_type != "random":
+        return compute_next_run(obj, after)
+    if not obj.enabled:
+        return None
+    res = await session.execute(
+        select(func.min(AdRandomSlot.run_at)).where(AdRandomSlot.ad_id == obj.id, AdRandomSlot.run_at > after)
+    )
+    return res.scalar_one_or_none()
+
+
+@retry_db
+async def create_ad(session: AsyncSession, **fields) -> Ad:
+    validate_schedule(fields)
+    obj = Ad(**{f: v for f, v in fields.items() if f in _AD_FIELDS})
+    if obj.enabled is None:
+        obj.enabled = True
+    obj.next_run_at = compute_next_run(obj, now_msk_naive())
+    async with write_tx(session):
+        session.add(obj)
+    return obj
+
+
+@retry_db
+async def get_ad(session: AsyncSession, *, ad_id: int) -> Ad | None:
+    return await session.get(Ad, ad_id)
+
+
+@retry_db
+async def update_ad(session: AsyncSession, *, ad_id: int, fields: dict) -> Ad | None:
+    """
+    Частичная правка; next_run_at пересчитывается, только если тронуто расписание.
+    Выключение, смена типа расписания, чата или треда снимает будущие random-слоты
+    объявления: иначе постер публиковал бы его по ним до следующей перестройки.
+    """
+    async with write_tx(session):
+        obj = await session.get(Ad, ad_id, with_for_update=True)
+        if obj is None:
+            return None
+        merged = {**_schedule_snapshot(obj), **{f: v for f, v in fields.items() if f in _AD_FIELDS}}
+        validate_schedule(merged)
+
+        changed: set[str] = set()
+        for name, value in fields.items():
+            if name not in _AD_FIELDS or getattr(obj, name) == value:
+                continue
+            setattr(obj, name, value)
+            changed.add(name)
+
+        now = now_msk_naive()
+        slots_dropped = bool(changed.intersection(_SLOT_FIELDS))
+        if slots_dropped:
+            await session.execute(delete(AdRandomSlot).where(AdRandomSlot.ad_id == ad_id, AdRandomSlot.run_at > now))
+        if slots_dropped or changed.intersection(_SCHEDULE_FIELDS):
+            obj.next_run_at = await _next_run(session, obj, now)
+    return obj
+
+
+@retry_db
+async def list_due_ads(session: AsyncSession, *, until: datetime, limit: int) -> list[Ad]:
+    """Объявления с next_run_at ≤ until — диапазон по ix_ads_due (enabled, next_run_at)."""
+    res = await session.execute(
+        select(Ad)
+        .where(Ad.enabled == True, Ad.next_run_at <= until)  # noqa: E712
+        .order_by(Ad.next_run_at, Ad.id)
+        .limit(limit)
+    )
+    return list(res.scalars().all())
+
+
+@retry_db
+async def mark_ad_fired(session: AsyncSession, *, ad_id: int, fired_at: datetime) -> Ad | None:
+    """
+    Постер отправил объявление за слот fired_at — сдвигаем next_run_at.
+    Повторный отчёт за тот же слот ничего не меняет; пропущенные за простой
+    слоты не догоняются (следующий — после max(fired_at, now)).
+    """
+    async with write_tx(session):
+        obj = await session.get(Ad, ad_id, with_for_update=True)
+        if obj is None:
+            return None
+        if obj.next_run_at is not None and obj.next_run_at > fired_at:
+            return obj
+        obj.next_run_at = await _next_run(session, obj, max(fired_at, now_msk_naive()))
+    return obj
+
+
+@retry_db
+async def fill_missing_next_runs(session: AsyncSession) -> int:
+    """Досчитать next_run_at у включённых cron/n_days объявлений, где его нет (после миграции)."""
+    now = now_msk_naive()
+    async with write_tx(session):
+        res = await session.execute(
+            select(Ad)
+            .where(
+                Ad.enabled == True,  # noqa: E712
+                Ad.schedule_type.in_(("cron", "n_days")),
+                Ad.next_run_at.is_(None),
+            )
+            .with_for_update()
+        )
+        updated = 0
+        for obj in res.scalars().all():
+            try:
+                obj.next_run_at = compute_next_run(obj, now)
+            except ValueError as e:
+                logger.warning(f"[{obj.id}] [ads] некорректное расписание: {e}")
+                continue
+            updated += obj.next_run_at is not None
+    return updated
+
+
+@retry_db
+async def rebuild_random_branches(
+    session: AsyncSession,
+    *,
+    now: datetime,
+    spacing_min: int,
+    keep_days: int,
+) -> dict:
+    """
+    Суточная перестройка слотов random-веток одним проходом в одной транзакции:
+    - ветки, у которых наступило rebuild_time и сегодня ещё не строились
+      (FOR UPDATE SKIP LOCKED — параллельные реплики не строят одну ветку дважды);
+    - одна выборка random-объявлений всех этих веток, раскладка в памяти;
+    - DELETE слотов дня, батч-INSERT новых, next_run_at одним UPDATE ... CASE,
+      last_rebuilt_on; заодно чистятся слоты старше keep_days.
+    """
+    day = now.date()
+    async with write_tx(session):
+        res = await session.execute(
+            select(AdRandomBranch)
+            .where(
+                AdRandomBranch.enabled == True,  # noqa: E712
+                AdRandomBranch.rebuild_time <= now.time(),
+                (AdRandomBranch.last_rebuilt_on.is_(None)) | (AdRandomBranch.last_rebuilt_on < day),
+            )
+            .with_for_update(skip_locked=True)
+        )
+        branches = list(res.scalars().all())
+        if not branches:
+            return {"branches": 0, "slots": 0}
+        by_target = {(b.chat_id, b.thread_id): b for b in branches}
+
+        ads_res = await session.execute(
+            select(Ad.id, Ad.chat_id, Ad.thread_id, Ad.dedupe_minute).where(
+                Ad.enabled == True,  # noqa: E712
+                Ad.schedule_type == "random",
+                Ad.chat_id.in_({b.chat_id for b in branches}),
+            )
+        )
+        ads_by_branch: dict[int, list[int]] = {b.id: [] for b in branches}
+        shared_by_branch: dict[int, list[int]] = {b.id: [] for b in branches}
+        for ad_id, chat_id, thread_id, dedupe_minute in ads_res.all():
+            branch = by_target.get((chat_id, thread_id))
+            if branch is not None:
+                (ads_by_branch if dedupe_minute else shared_by_branch)[branch.id].append(int(ad_id))
+
+        rows: list[dict] = []
+        next_runs: dict[int, datetime] = {}
+        for branch in branches:
+            slots = random_day_slots(
+                branch_id=branch.id,
+                day=day,
+                window_from=branch.window_from,
+                window_to=branch.window_to,
+                ad_ids=ads_by_branch[branch.id],
+                spacing_min=spacing_min,
+                not_before=now,
+                shared_ad_ids=shared_by_branch[branch.id],
+            )
+            skipped = len(ads_by_branch[branch.id]) + len(shared_by_branch[branch.id]) - len(slots)
+            if skipped:
+                logger.warning(f"[{branch.id}] [ad-random] окно не вмещает все объявления, пропущено: {skipped}")
+            for ad_id, run_at in slots.items():
+                rows.append({"branch_id": branch.id, "ad_id": ad_id, "slot_date": day, "run_at": run_at})
+                next_runs[ad_id] = run_at
+
+        branch_ids = [b.id for b in branches]
+        branch_ad_ids = [ad_id for ids in (*ads_by_branch.values(), *shared_by_branch.values()) for ad_id in ids]
+        # слот дня уникален по (ad_id, slot_date): объявление, переехавшее из уже построенной
+        # сегодня ветки, уносит свой прежний слот, иначе INSERT упадёт на uq_ad_slots_ad_date
+        await session.execute(
+            delete(AdRandomSlot).where(
+                AdRandomSlot.slot_date == day,
+                AdRandomSlot.branch_id.in_(branch_ids) | AdRandomSlot.ad_id.in_(branch_ad_ids),
+            )
+        )
+        await session.execute(delete(AdRandomSlot).where(AdRandomSlot.slot_date < day - timedelta(days=keep_days)))
+        if rows:
+            await session.execute(insert(AdRandomSlot), rows)
+        if branch_ad_ids:
+            # не получившие слот сегодня — снимаются с выборки due до следующей перестройки
+            next_run = case(next_runs, value=Ad.id, else_=None) if next_runs else None
+            await session.execute(
+                update(Ad)
+                .where(Ad.id.in_(branch_ad_ids))
+                .values(next_run_at=next_run)
+                .execution_options(synchronize_session=False)
+            )
+        await session.execute(
+            update(AdRandomBranch)
+            .where(AdRandomBranch.id.in_(branch_ids))
+            .values(last_rebuilt_on=day)
+            .execution_options(synchronize_session=False)
+        )
+    return {"branches": len(branches), "slots": len(rows)}
+
+
+@retry_db
+async def list_random_slots(
+    session: AsyncSession,
+    *,
+    since: datetime,
+    until: datetime,
+    chat_id: int | None = None,
+    limit: int = 1000,
+) -> list[dict]:
+    """Построенное расписание random-объявлений в [since, until] — диапазон по ix_ad_slots_run_at."""
+    stmt = (
+        select(AdRandomSlot.ad_id, AdRandomSlot.branch_id, AdRandomSlot.run_at, Ad.chat_id, Ad.thread_id)
+        .join(Ad, Ad.id == AdRandomSlot.ad_id)
+        .where(
+            AdRandomSlot.run_at >= since,
+            AdRandomSlot.run_at <= until,
+            # слоты, построенные до выключения или смены типа, не публикуются
+            Ad.enabled == True,  # noqa: E712
+            Ad.schedule_type == "random",
+        )
+        .order_by(AdRandomSlot.run_at, AdRandomSlot.ad_id)
+        .limit(limit)
+    )
+    if chat_id is not None:
+        stmt = stmt.where(Ad.chat_id == chat_id)
+    res = await session.execute(stmt)
+    return [dict(r._mapping) for r in res.all()]
+
+
+@retry_db
+async def report_ad_runs(session: AsyncSession, *, items: list[dict]) -> dict:
+    """
+    Батч-отчёт постера о публикациях: items = [{ad_id, message_id, posted_at?, slot_at?}].
+
+    Одна транзакция на батч: объявления блокируются одним SELECT ... FOR UPDATE,
+    прежние неудалённые публикации delete_previous-объявлений получают delete_at=now
+    одним UPDATE, новые строки ad_runs пишутся одним INSERT (delete_at считается сразу),
+    last_message_id и next_run_at обновляются по последней публикации каждого объявления.
+
+    Идемпотентно: повтор того же батча (ретрай постера после таймаута) не пишет
+    дубликатов — uq_ad_runs_ad_message + INSERT IGNORE, — а superseding UPDATE не трогает
+    сообщения из самого отчёта. recorded — число реально вставленных строк.
+    """
+    now = now_msk_naive()
+    by_ad: dict[int, list[dict]] = {}
+    seen: set[tuple[int, int]] = set()
+    for item in sorted(items, key=lambda it: (it["ad_id"], it.get("posted_at") or now)):
+        key = (int(item["ad_id"]), int(item["message_id"]))
+        if key in seen:
+            continue
+        seen.add(key)
+        by_ad.setdefault(key[0], []).append(item)
+    reported_ids = sorted({message_id for _, message_id in seen})
+
+    rows: list[dict] = []
+    async with write_tx(session):
+        res = await session.execute(select(Ad).where(Ad.id.in_(list(by_ad))).with_for_update())
+        ads = {obj.id: obj for obj in res.scalars().all()}
+        unknown = sorted(set(by_ad) - set(ads))
+
+        replace_ids = [ad_id for ad_id in by_ad if ad_id in ads and ads[ad_id].delete_previous]
+        if replace_ids:
+            await session.execute(
+                update(AdRun)
+                .where(
+                    AdRun.ad_id.in_(replace_ids),
+                    AdRun.message_id.notin_(reported_ids),
+                    AdRun.deleted_at.is_(None),
+                    (AdRun.delete_at.is_(None)) | (AdRun.delete_at > now),
+                )
+                .values(delete_at=now)
+                .execution_options(synchronize_session=False)
+            )
+
+        for ad_id, runs in by_ad.items():
+            ad = ads.get(ad_id)
+            if ad is None:
+                continue
+            for i, run in enumerate(runs):
+                posted_at = run.get("posted_at") or now
+                superseded = ad.delete_previous and i < len(runs) - 1
+                rows.append({
+                    "ad_id": ad_id,
+                    "chat_id": ad.chat_id,
+                    "thread_id": ad.thread_id,
+                    "message_id": run["message_id"],
+                    "slot_at": run.get("slot_at"),
+                    "posted_at": posted_at,
+                    "delete_at": now if superseded else compute_delete_at(ad, posted_at),
+                })
+            ad.last_message_id = runs[-1]["message_id"]
+
+            slots = [run["slot_at"] for run in runs if run.get("slot_at") is not None]
+            if slots and (ad.next_run_at is None or ad.next_run_at <= max(slots)):
+                ad.next_run_at = await _next_run(session, ad, max(max(slots), now))
+
+        recorded = 0
+        if rows:
+            # по таблице, а не ORM-классу: ORM bulk insert не отдаёт rowcount
+            res = await session.execute(insert_ignore(AdRun.__table__), rows)
+            recorded = max(res.rowcount or 0, 0)
+    return {"received": len(items), "recorded": recorded, "unknown_ads": unknown}
+
+
+@retry_db
+async def list_due_deletions(session: AsyncSession, *, until: datetime, limit: int) -> list[AdRun]:
+    """Неудалённые публикации с delete_at ≤ until — диапазон по ix_ad_runs_delete_due."""
+    res = await session.execute(
+        select(AdRun)
+        .where(AdRun.deleted_at.is_(None), AdRun.delete_at <= until)
+        .order_by(AdRun.delete_at, AdRun.id)
+        .limit(limit)
+    )
+    return list(res.scalars().all())
+
+
+@retry_db
+async def mark_runs_deleted(session: AsyncSession, *, run_ids: list[int]) -> int:
+    async with write_tx(session):
+        res = await session.execute(
+            update(AdRun)
+            .where(AdRun.id.in_(run_ids), AdRun.deleted_at.is_(None))
+            .values(deleted_at=now_msk_naive())
+            .execution_options(synchronize_session=False)
+        )
+    return int(res.rowcount or 0)
@@ -0,0 +1,159 @@
+# src/crud/algorithm_funnel.py
+# commit: счётчики воронки в таблице algorithm_funnel_counters — дельты в транзакции set_*, сверка дрейфа
+
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from collections.abc import Iterable, Mapping
+
+from sqlalchemy import Integer, cast
+
+from .base import AsyncSession, func, retry_db, select, update, upsert_increment, write_tx
+from src.models import AlgorithmFunnelCounter, UserAlgorithmProgress
+from src.time_msk import now_msk_naive
+
+logger = logging.getLogger(__name__)
+
+# (current_step, basic_completed, advanced_completed); None — строки нет
+ProgressState = tuple[int, bool, bool]
+
+_RECONCILE = "reconcile"
+
+
+def progress_state(obj) -> ProgressState:
+    """Состояние ORM-объекта/словаря прогресса в виде кортежа для дельт."""
+    if isinstance(obj, Mapping):
+        get = obj.get
+    else:
+        def get(name, default=None):
+            return getattr(obj, name, default)
+    return (
+        int(get("current_step") or 0),
+        bool(get("basic_completed") or False),
+        bool(get("advanced_completed") or False),
+    )
+
+
+def _state_counters(state: ProgressState) -> dict[str, int]:
+    step, basic, advanced = state
+    counters = {"total": 1, f"step:{step}": 1}
+    if basic:
+        counters["basic"] = 1
+    if advanced:
+        counters["advanced"] = 1
+    return counters
+
+
+def funnel_deltas(transitions: Iterable[tuple[ProgressState | None, ProgressState | None]]) -> dict[str, int]:
+    """Суммарные дельты счётчиков по переходам (old, new); нулевые отбрасываются."""
+    deltas: Counter[str] = Counter()
+    for old, new in transitions:
+        if old == new:
+            continue
+        if old is not None:
+            deltas.subtract(_state_counters(old))
+        if new is not None:
+            deltas.update(_state_counters(new))
+    return {name: d for name, d in deltas.items() if d}
+
+
+async def _increment(session: AsyncSession, deltas: Mapping[str, int]) -> None:
+    # имена по порядку: две транзакции берут блокировки строк счётчиков в одной очерёдности
+    rows = [{"name": name, "cnt": deltas[name]} for name in sorted(deltas)]
+    await session.execute(upsert_increment(AlgorithmFunnelCounter, rows, increment_cols=("cnt",)))
+
+
+async def apply_funnel_transitions(
+    session: AsyncSession,
+    transitions: Iterable[tuple[ProgressState | None, ProgressState | None]],
+) -> None:
+    """
+    Дельты воронки в текущей транзакции записи прогресса: UPDATE cnt = cnt + :d.
+    Коммитятся и откатываются вместе с самой записью — все воркеры видят одни числа.
+    """
+    deltas = funnel_deltas(transitions)
+    if deltas:
+        await _increment(session, deltas)
+
+
+@retry_db
+async def reconcile_funnel(session: AsyncSession) -> dict[str, int]:
+    """
+    Сверка с GROUP BY (редко, в фоне): исправляет дрейф от каскадных удалений
+    и ручных правок. Возвращает применённые поправки.
+
+    Строка reconcile блокируется первой (upsert берёт X-блокировку сразу, без
+    разделяемой): параллельные сверки с разных воркеров идут по очереди. Счётчики и
+    GROUP BY читаются одним снимком REPEATABLE READ, поправка пишется инкрементом —
+    дельты set_*, закоммиченные после снимка, не затираются.
+    """
+    async with write_tx(session):
+        await _increment(session, {_RECONCILE: 0})
+        res = await session.execute(select(AlgorithmFunnelCounter.name, AlgorithmFunnelCounter.cnt))
+        stored = {name: int(cnt) for name, cnt in res.all() if name != _RECONCILE}
+
+        truth: Counter[str] = Counter()
+        for step, cnt, basic_cnt, advanced_cnt in await _load_funnel_rows(session):
+            truth[f"step:{int(step)}"] = int(cnt)
+            truth["total"] += int(cnt)
+            truth["basic"] += int(basic_cnt or 0)
+            truth["advanced"] += int(advanced_cnt or 0)
+
+        drift = {
+            name: truth.get(name, 0) - stored.get(name, 0)
+            for name in set(truth) | set(stored)
+            if truth.get(name, 0) != stored.get(name, 0)
+        }
+        if drift:
+            await _increment(session, drift)
+            logger.info(f"[algo-funnel] сверка: дрейф {dict(sorted(drift.items()))}")
+        await session.execute(
+            update(AlgorithmFunnelCounter)
+            .where(AlgorithmFunnelCounter.name == _RECONCILE)
+            .values(reconciled_at=now_msk_naive())
+        )
+    return drift
+
+
+@retry_db
+async def load_funnel_snapshot(session: AsyncSession) -> dict:
+    """Воронка из таблицы счётчиков — O(число шагов), без сканирования прогресса."""
+    res = await session.execute(
+        select(AlgorithmFunnelCounter.name, AlgorithmFunnelCounter.cnt, AlgorithmFunnelCounter.reconciled_at)
+    )
+    counters: dict[str, int] = {}
+    steps: dict[int, int] = {}
+    reconciled_at = None
+    for name, cnt, marked_at in res.all():
+        if name == _RECONCILE:
+            reconciled_at = marked_at
+        elif name.startswith("step:"):
+            if cnt > 0:
+                steps[int(name[5:])] = int(cnt)
+        else:
+            counters[name] = int(cnt)
+
+    total = counters.get("total", 0)
+    basic = counters.get("basic", 0)
+    advanced = counters.get("advanced", 0)
+    return {
+        "total": total,
+        "steps": dict(sorted(steps.items())),
+        "basic_completed": basic,
+        "advanced_completed": advanced,
+        "basic_rate": round(basic / total, 4) if total else 0.0,
+        "advanced_rate": round(advanced / total, 4) if total else 0.0,
+        "reconciled_at": reconciled_at,
+    }
+
+
+async def _load_funnel_rows(session: AsyncSession):
+    stmt = select(
+        UserAlgorithmProgress.current_step,
+        func.count(),
+        func.sum(cast(UserAlgorithmProgress.basic_completed, Integer)),
+        func.sum(cast(UserAlgorithmProgress.advanced_completed, Integer)),
+    ).group_by(UserAlgorithmProgress.current_step)
+    res = await session.execute(stmt)
+    return res.all()
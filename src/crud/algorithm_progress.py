@@ -1,54 +1,267 @@
 # src/crud/algorithm_progress.py
-# commit: единый стиль get/set через ORM + транзакции; возврат ORM объекта для response_model
+# commit: дельты воронки пишутся в транзакции set_*; строка создаётся до FOR UPDATE (без gap-lock)
 
 from __future__ import annotations
 
-from .base import AsyncSession, delete, retry_db, select
+import asyncio
+import logging
+
+from sqlalchemy.exc import IntegrityError
+
+from .algorithm_funnel import ProgressState, apply_funnel_transitions, progress_state
+from .base import AsyncSession, delete, insert_ignore, retry_db, select, upsert, write_tx
+from src.background import PeriodicTask
+from src.config import settings
+from src.database import AsyncSessionLocal
 from src.models import UserAlgorithmProgress
+from src.time_msk import now_msk_naive
+
+logger = logging.getLogger(__name__)
+
+_PROGRESS_FIELDS = ("current_step", "basic_completed", "advanced_completed")
+_PROGRESS_DEFAULTS = {"current_step": 0, "basic_completed": False, "advanced_completed": False}
+
+
+class ProgressWriteCoalescer:
+    """
+    Коалесинг записей user_algorithm_progress.
+
+    - set_* кладут в pending только последнее значение каждого поля на user_id;
+    - раз в window секунд всё накопленное пишется батч-upsert'ом (одна транзакция);
+    - get_progress накладывает pending/inflight поверх БД (read-your-writes);
+    - при остановке (lifespan shutdown) pending сбрасывается в БД.
+    """
+
+    def __init__(self, *, enabled: bool, window_ms: int) -> None:
+        self.enabled = enabled
+        self._pending: dict[int, dict] = {}
+        self._inflight: dict[int, dict] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task = PeriodicTask(
+            "algo-progress-coalescer",
+            max(window_ms, 10) / 1000,
+            self.flush,
+            on_stop=self.flush,
+        )
+
+    def start(self) -> None:
+        if self.enabled:
+            self._task.start()
+
+    async def stop(self) -> None:
+        if self.enabled:
+            await self._task.stop()
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def submit(self, user_id: int, **fields) -> None:
+        state = self._pending.setdefault(user_id, {})
+        state.update(fields)
+        state["updated_at"] = now_msk_naive()
+
+    async def discard(self, user_id: int) -> None:
+        # ждём текущий flush, иначе он может закоммитить строку уже после удаления
+        async with self._flush_lock:
+            self._pending.pop(user_id, None)
+
+    def peek(self, user_id: int) -> dict | None:
+        inflight = self._inflight.get(user_id)
+        pending = self._pending.get(user_id)
+        if inflight is None and pending is None:
+            return None
+        merged: dict = {}
+        if inflight:
+            merged.update(inflight)
+        if pending:
+            merged.update(pending)
+        return merged
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            await self._flush_locked()
+
+    async def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        self._inflight = batch
+        try:
+            async with AsyncSessionLocal() as session:
+                await _upsert_progress_batch(session, batch)
+        except Exception as e:
+            # возвращаем в pending, не затирая более свежие значения
+            for user_id, state in batch.items():
+                newer = self._pending.get(user_id)
+                self._pending[user_id] = {**state, **newer} if newer else state
+            logger.error(f"[algo-coalescer] не удалось записать батч ({len(batch)}): {e}", exc_info=True)
+        finally:
+            self._inflight = {}
+
+
+progress_coalescer = ProgressWriteCoalescer(
+    enabled=settings.ALGO_COALESCE_ENABLED,
+    window_ms=settings.ALGO_COALESCE_WINDOW_MS,
+)
+
+
+def _detached_progress(obj: UserAlgorithmProgress | None, user_id: int, overlay: dict) -> UserAlgorithmProgress:
+    """Собрать неприкреплённый к сессии объект: БД-состояние + отложенные поля."""
+    values = {"user_id": user_id, **_PROGRESS_DEFAULTS, "updated_at": None}
+    if obj is not None:
+        values.update({f: getattr(obj, f) for f in (*_PROGRESS_FIELDS, "updated_at")})
+    values.update(overlay)
+    return UserAlgorithmProgress(**values)
+
+
+async def _upsert_progress_batch(session: AsyncSession, batch: dict[int, dict]) -> int:
+    """
+    Батч-upsert: строки группируются по набору изменённых полей,
+    чтобы ON DUPLICATE KEY UPDATE не затирал поля, которые пользователь не трогал.
+    Дельты воронки пишутся в той же транзакции. Возвращает число записанных строк.
+    """
+    groups: dict[tuple[str, ...], list[dict]] = {}
+    for user_id, state in batch.items():
+        changed = tuple(f for f in _PROGRESS_FIELDS if f in state)
+        row = {"user_id": user_id, **_PROGRESS_DEFAULTS, **state}
+        groups.setdefault(changed, []).append(row)
+
+    try:
+        async with write_tx(session):
+            await _write_groups(session, groups)
+        return len(batch)
+    except IntegrityError:
+        pass
+
+    # FK (нет пользователя) валит весь батч — дописываем построчно, отбрасывая битые
+    written = 0
+    for changed, rows in groups.items():
+        for row in rows:
+            try:
+                async with write_tx(session):
+                    await _write_groups(session, {changed: [row]})
+                written += 1
+            except IntegrityError as e:
+                logger.warning(f"[{row['user_id']}] [algo-coalescer] строка отброшена: {e.orig}")
+    return written
+
+
+async def _write_groups(session: AsyncSession, groups: dict[tuple[str, ...], list[dict]]) -> None:
+    user_ids = [row["user_id"] for rows in groups.values() for row in rows]
+    created = await _ensure_rows(session, user_ids)
+    old_states = await _lock_states(session, user_ids)
+    for changed, rows in groups.items():
+        await session.execute(_progress_upsert_stmt(changed, rows))
+    await apply_funnel_transitions(session, [
+        _transition(None if row["user_id"] in created else old_states.get(row["user_id"]), changed, row)
+        for changed, rows in groups.items()
+        for row in rows
+    ])
+
+
+async def _ensure_rows(session: AsyncSession, user_ids: list[int]) -> set[int]:
+    """
+    Создаёт недостающие строки прогресса с дефолтами; возвращает user_id созданных здесь.
+
+    Нужна до SELECT ... FOR UPDATE: блокирующее чтение отсутствующего ключа в InnoDB
+    ставит gap-lock, и два первых set_* соседних user_id взаимно ждут друг друга на INSERT.
+    По существующей строке FOR UPDATE берёт только блокировку записи.
+    """
+    res = await session.execute(
+        select(UserAlgorithmProgress.user_id).where(UserAlgorithmProgress.user_id.in_(user_ids))
+    )
+    missing = set(user_ids) - {int(r[0]) for r in res.all()}
+    created = set()
+    now = now_msk_naive()
+    for user_id in sorted(missing):
+        # по одной строке: rowcount показывает, кто вставил строку — мы или параллельная запись
+        res = await session.execute(
+            insert_ignore(UserAlgorithmProgress.__table__).values(user_id=user_id, **_PROGRESS_DEFAULTS, updated_at=now)
+        )
+        if res.rowcount:
+            created.add(user_id)
+    return created
+
+
+async def _lock_states(session: AsyncSession, user_ids: list[int]) -> dict[int, ProgressState]:
+    res = await session.execute(
+        select(
+            UserAlgorithmProgress.user_id,
+            UserAlgorithmProgress.current_step,
+            UserAlgorithmProgress.basic_completed,
+            UserAlgorithmProgress.advanced_completed,
+        )
+        .where(UserAlgorithmProgress.user_id.in_(user_ids))
+        .with_for_update()
+    )
+    return {int(r.user_id): progress_state(r._mapping) for r in res.all()}
+
+
+def _transition(old: ProgressState | None, changed: tuple[str, ...], row: dict):
+    base = dict(zip(_PROGRESS_FIELDS, old)) if old is not None else dict(_PROGRESS_DEFAULTS)
+    base.update({f: row[f] for f in changed})
+    return old, progress_state(base)
+
+
+def _progress_upsert_stmt(changed: tuple[str, ...], rows: list[dict]):
+    return upsert(UserAlgorithmProgress, rows, update_cols=(*changed, "updated_at"))
 
 
 @retry_db
 async def get_progress(session: AsyncSession, *, user_id: int) -> UserAlgorithmProgress | None:
-    return await session.get(UserAlgorithmProgress, user_id)
+    obj = await session.get(UserAlgorithmProgress, user_id)
+    overlay = progress_coalescer.peek(user_id) if progress_coalescer.enabled else None
+    if overlay is None:
+        return obj
+    return _detached_progress(obj, user_id, overlay)
 
 
-@retry_db
-async def set_user_step(session: AsyncSession, *, user_id: int, step: int) -> UserAlgorithmProgress:
-    async with session.begin():
-        obj = await session.get(UserAlgorithmProgress, user_id)
+async def _set_fields(session: AsyncSession, user_id: int, **fields) -> UserAlgorithmProgress:
+    async with write_tx(session):
+        created = await _ensure_rows(session, [user_id])
+        # строка уже есть: FOR UPDATE — блокировка записи, прежнее состояние для дельты воронки
+        obj = await session.get(UserAlgorithmProgress, user_id, with_for_update=True, populate_existing=True)
         if obj is None:
-            obj = UserAlgorithmProgress(user_id=user_id, current_step=step)
-            session.add(obj)
-        else:
-            obj.current_step = step
+            raise ValueError(f"прогресс не создан: пользователь {user_id} не найден")
+        old = None if user_id in created else progress_state(obj)
+        for name, value in fields.items():
+            setattr(obj, name, value)
+        await apply_funnel_transitions(session, [(old, progress_state(obj))])
     return obj
 
 
+@retry_db
+async def set_user_step(session: AsyncSession, *, user_id: int, step: int) -> UserAlgorithmProgress:
+    if progress_coalescer.enabled:
+        progress_coalescer.submit(user_id, current_step=step)
+        return await get_progress(session, user_id=user_id)
+    return await _set_fields(session, user_id, current_step=step)
+
+
 @retry_db
 async def set_basic_completed(session: AsyncSession, *, user_id: int, completed: bool) -> UserAlgorithmProgress:
-    async with session.begin():
-        obj = await session.get(UserAlgorithmProgress, user_id)
-        if obj is None:
-            obj = UserAlgorithmProgress(user_id=user_id, basic_completed=completed)
-            session.add(obj)
-        else:
-            obj.basic_completed = completed
-    return obj
+    if progress_coalescer.enabled:
+        progress_coalescer.submit(user_id, basic_completed=completed)
+        return await get_progress(session, user_id=user_id)
+    return await _set_fields(session, user_id, basic_completed=completed)
 
 
 @retry_db
 async def set_advanced_completed(session: AsyncSession, *, user_id: int, completed: bool) -> UserAlgorithmProgress:
-    async with session.begin():
-        obj = await session.get(UserAlgorithmProgress, user_id)
-        if obj is None:
-            obj = UserAlgorithmProgress(user_id=user_id, advanced_completed=completed)
-            session.add(obj)
-        else:
-            obj.advanced_completed = completed
-    return obj
+    if progress_coalescer.enabled:
+        progress_coalescer.submit(user_id, advanced_completed=completed)
+        return await get_progress(session, user_id=user_id)
+    return await _set_fields(session, user_id, advanced_completed=completed)
 
 
 @retry_db
 async def clear_user_data(session: AsyncSession, *, user_id: int) -> None:
-    async with session.begin():
+    # отложенная запись не должна «воскресить» удалённый прогресс
+    if progress_coalescer.enabled:
+        await progress_coalescer.discard(user_id)
+    async with write_tx(session):
+        old_states = await _lock_states(session, [user_id])
         await session.execute(delete(UserAlgorithmProgress).where(UserAlgorithmProgress.user_id == user_id))
+        await apply_funnel_transitions(session, [(old_states.get(user_id), None)])
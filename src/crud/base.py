@@ -1,23 +1,92 @@
 # src/crud/base.py
+# commit: write_tx — пишущая транзакция (BEGIN IMMEDIATE на SQLite), db_tx поверх неё
 
 from __future__ import annotations
 
+from collections.abc import Iterable, Sequence
 from contextlib import asynccontextmanager
 
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from sqlalchemy.exc import OperationalError, IntegrityError, SQLAlchemyError
-from sqlalchemy import select, delete, func, update
+from sqlalchemy import select, delete, func, insert, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects import mysql, sqlite
 
+from src.database import engine
+from src.db_retry import retry_db  # noqa: F401  (ретраи обрывов соединения и дедлоков, см. src/db_retry.py)
 
-# Ретрай только на сетевые/коннектовые проблемы с БД
-retry_db = retry(
-    reraise=True,
-    retry=retry_if_exception_type(OperationalError),
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=1, min=1, max=10),
-)
+
+def upsert(model, values, *, update_cols: Iterable[str], conflict: Sequence[str] | None = None):
+    """
+    INSERT одной или многих строк с обновлением колонок update_cols при конфликте ключа.
+
+    MySQL — ON DUPLICATE KEY UPDATE (срабатывает на любой уникальный ключ),
+    SQLite — ON CONFLICT (conflict) DO UPDATE; conflict по умолчанию — первичный ключ.
+    Новые значения берутся из вставляемой строки (inserted / excluded).
+    """
+    if engine.dialect.name == "sqlite":
+        stmt = sqlite.insert(model).values(values)
+        target = list(conflict) if conflict else [c.name for c in model.__table__.primary_key]
+        return stmt.on_conflict_do_update(index_elements=target, set_={c: stmt.excluded[c] for c in update_cols})
+    stmt = mysql.insert(model).values(values)
+    return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in update_cols})
+
+
+def upsert_increment(model, values, *, increment_cols: Iterable[str], conflict: Sequence[str] | None = None):
+    """
+    Как upsert, но при конфликте ключа колонки increment_cols прибавляются: col = col + новое.
+    Строки стоит передавать в одном порядке ключей — блокировки берутся по порядку.
+    """
+    if engine.dialect.name == "sqlite":
+        stmt = sqlite.insert(model).values(values)
+        target = list(conflict) if conflict else [c.name for c in model.__table__.primary_key]
+        return stmt.on_conflict_do_update(
+            index_elements=target,
+            set_={c: model.__table__.c[c] + stmt.excluded[c] for c in increment_cols},
+        )
+    stmt = mysql.insert(model).values(values)
+    return stmt.on_duplicate_key_update({c: model.__table__.c[c] + stmt.inserted[c] for c in increment_cols})
+
+
+def insert_ignore(model):
+    """INSERT IGNORE (MySQL) / INSERT OR IGNORE (SQLite): дубликаты ключей молча пропускаются."""
+    return insert(model).prefix_with("IGNORE", dialect="mysql").prefix_with("OR IGNORE", dialect="sqlite")
+
+
+def integrity_code(err: IntegrityError) -> int | None:
+    """
+    MySQL errno из IntegrityError (1062 — дубликат ключа, 1452 — FK).
+    Ошибки SQLite (без кодов) сводятся к тем же номерам по тексту.
+    """
+    orig = getattr(err, "orig", None)
+    if orig is None:
+        return None
+    args = getattr(orig, "args", None)
+    if not args:
+        return None
+    try:
+        return int(args[0])
+    except Exception:
+        pass
+    message = str(args[0])
+    if message.startswith("UNIQUE constraint failed") or message.startswith("PRIMARY KEY"):
+        return 1062
+    if message.startswith("FOREIGN KEY constraint failed"):
+        return 1452
+    return None
+
+
+@asynccontextmanager
+async def write_tx(session: AsyncSession):
+    """
+    session.begin() для транзакции, которая будет писать.
+
+    На SQLite соединение получает execution option sqlite_immediate, и транзакция
+    открывается BEGIN IMMEDIATE (см. src/database.py); чтения через autobegin остаются
+    DEFERRED. На MySQL — обычный BEGIN.
+    """
+    async with session.begin():
+        await session.connection(execution_options={"sqlite_immediate": True})
+        yield
 
 
 @asynccontextmanager
@@ -33,5 +102,5 @@ async def db_tx(session: AsyncSession):
         async with session.begin_nested():
             yield
     else:
-        async with session.begin():
+        async with write_tx(session):
             yield
@@ -0,0 +1,673 @@
+# src/crud/broadcasts.py
+# commit: claimed_count в той же транзакции, что claim/report/reaper — прогресс без COUNT по доставкам
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+from datetime import timedelta
+
+from sqlalchemy import BigInteger, Integer, SmallInteger, String, case, exists, literal, text
+
+from .base import AsyncSession, delete, func, insert_ignore, retry_db, select, update, write_tx
+from .subscriptions import kind_subscribers_select
+from src.config import settings
+from src.database import engine
+from src.models import Broadcast, BroadcastDelivery, BroadcastDeliveryArchive, BroadcastTarget
+from src.send_plan import compile_send_plan, send_plan_cache
+from src.time_msk import now_msk_naive
+
+logger = logging.getLogger(__name__)
+
+_OPEN_DELIVERY_STATUSES = ("pending", "claimed")
+_FINISHED_STATUSES = ("sent", "failed")
+_COUNTER_BY_STATUS = {
+    "sent": Broadcast.sent_count,
+    "failed": Broadcast.failed_count,
+    "skipped": Broadcast.skipped_count,
+}
+
+_SQL_TARGET_RE = re.compile(r"(?is)^\s*select\b")
+
+# контент можно править только до начала отправки
+_EDITABLE_STATUSES = ("draft", "scheduled")
+_STATUS_TRANSITIONS = {
+    "draft": ("scheduled",),
+    "scheduled": ("draft", "sending"),
+    "sending": ("sent", "failed"),
+    "sent": (),
+    "failed": ("scheduled",),
+}
+
+
+class BroadcastStateError(Exception):
+    """Операция недопустима в текущем статусе рассылки (→ 409)."""
+
+
+def validate_sql_target(name: str) -> str:
+    """
+    sql-таргет — имя аудитории из BROADCAST_SQL_AUDIENCES, а не произвольный текст:
+    API-ключ не даёт выполнять свои SELECT по любым таблицам. Сам запрос задаёт
+    админ в настройках — один SELECT с колонкой user_id, подставляется как
+    derived table в INSERT ... SELECT. Возвращает текст запроса.
+    """
+    name = (name or "").strip()
+    sql = settings.BROADCAST_SQL_AUDIENCES.get(name)
+    if sql is None:
+        allowed = ", ".join(sorted(settings.BROADCAST_SQL_AUDIENCES)) or "не настроены"
+        raise ValueError(f"неизвестная sql-аудитория {name!r}; доступные: {allowed}")
+    sql = sql.strip().rstrip(";").strip()
+    if not _SQL_TARGET_RE.match(sql) or ";" in sql:
+        raise ValueError(f"sql-аудитория {name!r} в настройках должна быть одним SELECT с колонкой user_id")
+    return sql
+
+
+@retry_db
+async def create_broadcast(
+    session: AsyncSession,
+    *,
+    kind: str,
+    title: str,
+    content: dict,
+    schedule: str | None = None,
+    enabled: bool = True,
+    created_by: int | None = None,
+) -> Broadcast:
+    obj = Broadcast(
+        kind=kind,
+        title=title,
+        content=json.dumps(content, ensure_ascii=False),
+        schedule=schedule,
+        enabled=enabled,
+        created_by=created_by,
+    )
+    async with write_tx(session):
+        session.add(obj)
+    return obj
+
+
+@retry_db
+async def get_broadcast(session: AsyncSession, *, broadcast_id: int) -> Broadcast | None:
+    return await session.get(Broadcast, broadcast_id)
+
+
+@retry_db
+async def get_broadcast_version(session: AsyncSession, *, broadcast_id: int) -> int | None:
+    res = await session.execute(select(Broadcast.version).where(Broadcast.id == broadcast_id))
+    return res.scalar_one_or_none()
+
+
+@retry_db
+async def update_broadcast(
+    session: AsyncSession,
+    *,
+    broadcast_id: int,
+    fields: dict,
+) -> Broadcast | None:
+    """
+    Частичная правка рассылки. Любое изменение title/content/kind бампает version —
+    закешированный план старой версии больше не отдаётся. Если рассылка уже
+    scheduled, новый контент компилируется сразу (битый — ValueError, без записи).
+    """
+    plan = None
+    async with write_tx(session):
+        obj = await session.get(Broadcast, broadcast_id, with_for_update=True)
+        if obj is None:
+            return None
+        if obj.status not in _EDITABLE_STATUSES:
+            raise BroadcastStateError(f"рассылку в статусе {obj.status!r} нельзя редактировать")
+
+        content_changed = False
+        for name, value in fields.items():
+            if name == "content":
+                value = json.dumps(value, ensure_ascii=False)
+            if getattr(obj, name) != value:
+                setattr(obj, name, value)
+                content_changed = content_changed or name in ("kind", "title", "content")
+        if content_changed:
+            obj.version = (obj.version or 1) + 1
+            if obj.status == "scheduled":
+                plan = compile_send_plan(obj)
+    if plan is not None:
+        send_plan_cache.put(plan)
+    return obj
+
+
+@retry_db
+async def set_broadcast_status(session: AsyncSession, *, broadcast_id: int, status: str) -> Broadcast | None:
+    """
+    Переход по статусам рассылки. При переходе в scheduled контент компилируется
+    в план отправки (битый контент — ValueError, статус не меняется) и кладётся в кеш.
+    """
+    plan = None
+    async with write_tx(session):
+        obj = await session.get(Broadcast, broadcast_id, with_for_update=True)
+        if obj is None:
+            return None
+        if status == obj.status:
+            return obj
+        if status not in _STATUS_TRANSITIONS.get(obj.status, ()):
+            raise BroadcastStateError(f"переход {obj.status!r} → {status!r} недопустим")
+        if status in ("scheduled", "sending"):
+            plan = compile_send_plan(obj)
+        obj.status = status
+        obj.finished_at = now_msk_naive() if status in _FINISHED_STATUSES else None
+    if plan is not None:
+        send_plan_cache.put(plan)
+    return obj
+
+
+@retry_db
+async def add_broadcast_target(
+    session: AsyncSession,
+    *,
+    broadcast_id: int,
+    type_: str,
+    user_ids: list[int] | None = None,
+    sql_text: str | None = None,
+    kind: str | None = None,
+) -> BroadcastTarget | None:
+    if type_ == "sql":
+        validate_sql_target(sql_text or "")
+        sql_text = sql_text.strip()
+
+    obj = BroadcastTarget(
+        broadcast_id=broadcast_id,
+        type=type_,
+        user_ids_json=user_ids if type_ == "ids" else None,
+        sql_text=sql_text if type_ == "sql" else None,
+        kind=kind if type_ == "kind" else None,
+    )
+    async with write_tx(session):
+        if await session.get(Broadcast, broadcast_id) is None:
+            return None
+        session.add(obj)
+    return obj
+
+
+@retry_db
+async def list_broadcast_targets(session: AsyncSession, *, broadcast_id: int) -> list[BroadcastTarget]:
+    res = await session.execute(
+        select(BroadcastTarget).where(BroadcastTarget.broadcast_id == broadcast_id).order_by(BroadcastTarget.id)
+    )
+    return list(res.scalars().all())
+
+
+def _target_source(target: BroadcastTarget):
+    """Подзапрос с единственной колонкой user_id — источник аудитории таргета."""
+    if target.type == "kind":
+        return kind_subscribers_select(target.kind).subquery("src")
+
+    if target.type == "ids":
+        # список разворачивается на стороне БД, в Python не грузится
+        if engine.dialect.name == "sqlite":
+            sql = (
+                "SELECT CAST(jt.value AS INTEGER) AS user_id FROM broadcast_targets t, "
+                "json_each(t.user_ids_json) AS jt "
+                "WHERE t.id = :target_id AND jt.value IS NOT NULL"
+            )
+        else:
+            sql = (
+                "SELECT jt.user_id FROM broadcast_targets t, "
+                "JSON_TABLE(t.user_ids_json, '$[*]' COLUMNS (user_id BIGINT PATH '$')) AS jt "
+                "WHERE t.id = :target_id AND jt.user_id IS NOT NULL"
+            )
+        return (
+            text(sql)
+            .bindparams(target_id=target.id)
+            .columns(user_id=BigInteger)
+            .subquery("src")
+        )
+
+    if target.type == "sql":
+        return text(validate_sql_target(target.sql_text)).columns(user_id=BigInteger).subquery("src")
+
+    raise ValueError(f"Неизвестный тип таргета: {target.type!r}")
+
+
+async def _materialize_source(
+    session: AsyncSession, *, broadcast_id: int, src, chunk_size: int | None
+) -> tuple[int, int]:
+    """
+    INSERT IGNORE ... SELECT из источника; дубликаты отсекает uq_bdeliveries_broadcast_user.
+
+    chunk_size задан (источник по индексу — подписки kind): keyset-чанки по user_id,
+    граница — MAX(user_id) из WHERE user_id > :last ORDER BY user_id LIMIT n, каждый
+    чанк в своей короткой транзакции. chunk_size=None (ids, sql — derived table без
+    индекса): один оператор, иначе каждый чанк заново разбирал бы и сортировал всю аудиторию.
+    """
+    inserted = chunks = 0
+    after: int | None = None
+    created_at = now_msk_naive()
+
+    while True:
+        async with write_tx(session):
+            conds = []
+            bound = None
+            if after is not None:
+                conds.append(src.c.user_id > after)
+            if chunk_size is not None:
+                window = select(src.c.user_id).where(*conds).order_by(src.c.user_id).limit(chunk_size).subquery("w")
+                bound = (await session.execute(select(func.max(window.c.user_id)))).scalar_one_or_none()
+                if bound is None:
+                    return inserted, chunks
+                conds.append(src.c.user_id <= bound)
+
+            rows = select(
+                literal(broadcast_id, Integer),
+                src.c.user_id,
+                literal("pending", String),
+                literal(0, SmallInteger),
+                literal(created_at),
+            ).where(*conds)
+            stmt = (
+                insert_ignore(BroadcastDelivery)
+                .from_select(["broadcast_id", "user_id", "status", "attempts", "created_at"], rows)
+            )
+            res = await session.execute(stmt)
+            chunk_inserted = max(res.rowcount or 0, 0)
+            if chunk_inserted:
+                await _bump_counters(session, broadcast_id, total=chunk_inserted)
+
+        inserted += chunk_inserted
+        chunks += 1
+        if bound is None:
+            return inserted, chunks
+        after = bound
+
+
+@retry_db
+async def materialize_broadcast(session: AsyncSession, *, broadcast_id: int, chunk_size: int) -> dict | None:
+    """
+    Разворачивает все таргеты рассылки в строки broadcast_deliveries (status=pending).
+    Идемпотентно: повторный вызов добавляет только новых получателей.
+    """
+    broadcast = await session.get(Broadcast, broadcast_id)
+    if broadcast is None:
+        return None
+
+    targets = await list_broadcast_targets(session, broadcast_id=broadcast_id)
+    # чтение выше открыло autobegin-транзакцию — закрываем, дальше чанки в своих транзакциях
+    await session.commit()
+
+    inserted = chunks = 0
+    for target in targets:
+        t_inserted, t_chunks = await _materialize_source(
+            session,
+            broadcast_id=broadcast_id,
+            src=_target_source(target),
+            chunk_size=chunk_size if target.type == "kind" else None,
+        )
+        logger.info(
+            f"[{broadcast_id}] материализация таргета id={target.id} type={target.type}: "
+            f"inserted={t_inserted}, chunks={t_chunks}"
+        )
+        inserted += t_inserted
+        chunks += t_chunks
+
+    total = (
+        await session.execute(
+            select(func.count()).select_from(BroadcastDelivery).where(BroadcastDelivery.broadcast_id == broadcast_id)
+        )
+    ).scalar_one()
+
+    return {
+        "broadcast_id": broadcast_id,
+        "targets": len(targets),
+        "inserted": inserted,
+        "chunks": chunks,
+        "total": int(total),
+    }
+
+
+@retry_db
+async def claim_deliveries(
+    session: AsyncSession,
+    *,
+    broadcast_id: int,
+    n: int,
+    lease_seconds: int,
+    worker: str | None = None,
+) -> dict:
+    """
+    Атомарно забирает до n pending-доставок под аренду.
+
+    SELECT ... FOR UPDATE SKIP LOCKED по ix_bdeliveries_broadcast_status: параллельные
+    воркеры пропускают строки, уже заблокированные соседом, вместо ожидания,
+    поэтому не мешают друг другу и не получают одни и те же строки.
+    """
+    lease_until = now_msk_naive() + timedelta(seconds=lease_seconds)
+
+    async with write_tx(session):
+        res = await session.execute(
+            select(BroadcastDelivery.id, BroadcastDelivery.user_id, BroadcastDelivery.attempts)
+            .where(
+                BroadcastDelivery.broadcast_id == broadcast_id,
+                BroadcastDelivery.status == "pending",
+            )
+            .order_by(BroadcastDelivery.id)
+            .limit(n)
+            .with_for_update(skip_locked=True)
+        )
+        items = [
+            {"id": int(r.id), "user_id": int(r.user_id), "attempts": int(r.attempts)}
+            for r in res.all()
+        ]
+        if items:
+            res = await session.execute(
+                update(BroadcastDelivery)
+                .where(BroadcastDelivery.id.in_([i["id"] for i in items]))
+                .values(status="claimed", lease_until=lease_until, claimed_by=worker)
+                .execution_options(synchronize_session=False)
+            )
+            await _bump_counters(session, broadcast_id, claimed=max(res.rowcount or 0, 0))
+
+    return {"broadcast_id": broadcast_id, "lease_until": lease_until, "items": items}
+
+
+@retry_db
+async def reap_expired_leases(session: AsyncSession, *, max_attempts: int) -> dict:
+    """
+    Возвращает просроченные аренды в pending (attempts + 1).
+    Если попытки исчерпаны — failed с error_code=lease_expired.
+    claimed_count (и failed_count) рассылок правятся в той же транзакции.
+    """
+    now = now_msk_naive()
+    expired = (
+        BroadcastDelivery.status == "claimed",
+        BroadcastDelivery.lease_until < now,
+    )
+
+    async with write_tx(session):
+        res = await session.execute(
+            select(BroadcastDelivery.id, BroadcastDelivery.broadcast_id, BroadcastDelivery.attempts)
+            .where(*expired)
+            .with_for_update(skip_locked=True)
+        )
+        exhausted: dict[int, list[int]] = {}
+        requeue: dict[int, list[int]] = {}
+        for r in res.all():
+            bucket = exhausted if r.attempts + 1 >= max_attempts else requeue
+            bucket.setdefault(int(r.broadcast_id), []).append(int(r.id))
+
+        failed = requeued = 0
+        for bid, ids in exhausted.items():
+            upd = await session.execute(
+                update(BroadcastDelivery)
+                .where(BroadcastDelivery.id.in_(ids), *expired)
+                .values(
+                    status="failed",
+                    attempts=BroadcastDelivery.attempts + 1,
+                    error_code="lease_expired",
+                    lease_until=None,
+                    claimed_by=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            changed = max(upd.rowcount or 0, 0)
+            failed += changed
+            await _bump_counters(session, bid, failed=changed, claimed=-changed)
+
+        for bid, ids in requeue.items():
+            upd = await session.execute(
+                update(BroadcastDelivery)
+                .where(BroadcastDelivery.id.in_(ids), *expired)
+                .values(
+                    status="pending",
+                    attempts=BroadcastDelivery.attempts + 1,
+                    lease_until=None,
+                    claimed_by=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            changed = max(upd.rowcount or 0, 0)
+            requeued += changed
+            await _bump_counters(session, bid, claimed=-changed)
+
+    return {"requeued": requeued, "failed": failed}
+
+
+async def _bump_counters(session: AsyncSession, broadcast_id: int, **deltas: int) -> None:
+    """Инкремент агрегатов broadcasts.<name>_count внутри текущей транзакции."""
+    values = {}
+    for name, delta in deltas.items():
+        if delta:
+            col = getattr(Broadcast, f"{name}_count")
+            values[col.key] = col + delta
+    if values:
+        await session.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _case_by_id(rows: list[dict], field: str, default):
+    """CASE id WHEN ... THEN ... ELSE <default> END только по строкам, где поле передано."""
+    whens = {r["id"]: r[field] for r in rows if r.get(field) is not None}
+    if not whens:
+        return None
+    return case(whens, value=BroadcastDelivery.id, else_=default)
+
+
+@retry_db
+async def report_deliveries(
+    session: AsyncSession,
+    *,
+    broadcast_id: int,
+    results: list[dict],
+    chunk_size: int,
+) -> dict:
+    """
+    Применяет результаты отправки пачкой: на чанк — по одному UPDATE на итоговый статус
+    (значения полей через CASE id) + один UPDATE счётчиков broadcasts, всё в одной транзакции.
+
+    Идемпотентно: обновляются только открытые строки (pending/claimed), поэтому
+    повторная доставка того же отчёта ничего не меняет и не двигает счётчики.
+
+    released — сколько применённых строк были именно в аренде (claimed_count уменьшен
+    на это число); остальные применённые строки пришли из pending.
+    """
+    # последний результат по id побеждает
+    latest: dict[int, dict] = {}
+    for r in results:
+        latest[int(r["id"])] = r
+    rows = list(latest.values())
+
+    now = now_msk_naive()
+    applied = {"sent": 0, "failed": 0, "skipped": 0, "pending": 0}
+    released = 0
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        by_status: dict[str, list[dict]] = {}
+        for r in chunk:
+            if r["status"] == "sent" and r.get("sent_at") is None:
+                r = {**r, "sent_at": now}
+            by_status.setdefault(r["status"], []).append(r)
+
+        async with write_tx(session):
+            # строки в аренде блокируются до UPDATE: все они ниже перейдут в итоговый статус
+            res = await session.execute(
+                select(BroadcastDelivery.id)
+                .where(
+                    BroadcastDelivery.broadcast_id == broadcast_id,
+                    BroadcastDelivery.id.in_([r["id"] for r in chunk]),
+                    BroadcastDelivery.status == "claimed",
+                )
+                .with_for_update()
+            )
+            claimed_rows = len(res.all())
+            deltas: dict[str, int] = {"claimed": -claimed_rows}
+            for status, group in by_status.items():
+                # без явного attempts итоговый статус засчитывает ещё одну попытку
+                default_attempts = BroadcastDelivery.attempts if status == "pending" else BroadcastDelivery.attempts + 1
+                attempts_expr = _case_by_id(group, "attempts", default_attempts)
+                values = {
+                    "status": status,
+                    "lease_until": None,
+                    "claimed_by": None,
+                    "attempts": default_attempts if attempts_expr is None else attempts_expr,
+                }
+                for field in ("message_id", "error_code", "error_message", "sent_at"):
+                    expr = _case_by_id(group, field, getattr(BroadcastDelivery, field))
+                    if expr is not None:
+                        values[field] = expr
+
+                res = await session.execute(
+                    update(BroadcastDelivery)
+                    .where(
+                        BroadcastDelivery.broadcast_id == broadcast_id,
+                        BroadcastDelivery.id.in_([r["id"] for r in group]),
+                        BroadcastDelivery.status.in_(_OPEN_DELIVERY_STATUSES),
+                    )
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                changed = max(res.rowcount or 0, 0)
+                applied[status] += changed
+                if status in _COUNTER_BY_STATUS:
+                    deltas[status] = deltas.get(status, 0) + changed
+
+            await _bump_counters(session, broadcast_id, **deltas)
+        released += claimed_rows
+
+    applied_total = sum(applied.values())
+    return {
+        "broadcast_id": broadcast_id,
+        "received": len(results),
+        "applied": applied,
+        "released": released,
+        "ignored": len(rows) - applied_total,
+    }
+
+
+@retry_db
+async def load_broadcast_progress(session: AsyncSession, *, broadcast_id: int) -> dict | None:
+    """Снимок прогресса: одно PK-чтение агрегатов broadcasts, без обращения к доставкам."""
+    res = await session.execute(
+        select(
+            Broadcast.status,
+            Broadcast.total_count,
+            Broadcast.sent_count,
+            Broadcast.failed_count,
+            Broadcast.skipped_count,
+            Broadcast.claimed_count,
+        ).where(Broadcast.id == broadcast_id)
+    )
+    row = res.one_or_none()
+    if row is None:
+        return None
+
+    total, sent, failed, skipped, claimed = (int(v or 0) for v in row[1:])
+    return {
+        "broadcast_id": broadcast_id,
+        "status": row.status,
+        "total": total,
+        "pending": max(total - sent - failed - skipped - claimed, 0),
+        "claimed": claimed,
+        "sent": sent,
+        "failed": failed,
+        "skipped": skipped,
+    }
+
+
+@retry_db
+async def list_sending_broadcasts(session: AsyncSession) -> list[Broadcast]:
+    res = await session.execute(
+        select(Broadcast)
+        .where(Broadcast.status == "sending", Broadcast.enabled == True)  # noqa: E712
+        .order_by(Broadcast.id)
+    )
+    return list(res.scalars().all())
+
+
+@retry_db
+async def finish_broadcast_if_done(session: AsyncSession, *, broadcast_id: int) -> bool:
+    """sending → sent, если не осталось pending/claimed доставок. True — рассылка завершена."""
+    open_deliveries = exists().where(
+        BroadcastDelivery.broadcast_id == broadcast_id,
+        BroadcastDelivery.status.in_(_OPEN_DELIVERY_STATUSES),
+    )
+    async with write_tx(session):
+        res = await session.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id, Broadcast.status == "sending", ~open_deliveries)
+            .values(status="sent", finished_at=now_msk_naive())
+            .execution_options(synchronize_session=False)
+        )
+    return bool(res.rowcount)
+
+
+@retry_db
+async def list_archivable_broadcasts(session: AsyncSession, *, finished_before, limit: int = 100) -> list[int]:
+    """Рассылки, завершённые раньше finished_before, чьи доставки ещё в горячей таблице."""
+    res = await session.execute(
+        select(Broadcast.id)
+        .where(
+            Broadcast.status.in_(_FINISHED_STATUSES),
+            Broadcast.finished_at < finished_before,
+            Broadcast.archived_at.is_(None),
+        )
+        .order_by(Broadcast.finished_at)
+        .limit(limit)
+    )
+    return [int(bid) for bid in res.scalars().all()]
+
+
+@retry_db
+async def archive_broadcast_deliveries(session: AsyncSession, *, broadcast_id: int, chunk_size: int) -> int:
+    """
+    Перенос доставок рассылки в broadcast_deliveries_archive keyset-чанками по id:
+    INSERT IGNORE ... SELECT + DELETE того же диапазона в одной короткой транзакции,
+    так что прерванный перенос безопасно продолжается с места остановки.
+    Агрегаты остаются в broadcasts (total/sent/failed/skipped_count).
+    Возвращает число перенесённых строк.
+    """
+    moved = 0
+    in_broadcast = BroadcastDelivery.broadcast_id == broadcast_id
+
+    while True:
+        async with write_tx(session):
+            bound = (
+                await session.execute(
+                    select(BroadcastDelivery.id)
+                    .where(in_broadcast)
+                    .order_by(BroadcastDelivery.id)
+                    .offset(chunk_size - 1)
+                    .limit(1)
+                )
+            ).scalar_one_or_none()
+            in_chunk = (in_broadcast,) if bound is None else (in_broadcast, BroadcastDelivery.id <= bound)
+
+            rows = select(
+                BroadcastDelivery.broadcast_id,
+                BroadcastDelivery.user_id,
+                BroadcastDelivery.status,
+                BroadcastDelivery.attempts,
+                BroadcastDelivery.error_code,
+                BroadcastDelivery.message_id,
+                BroadcastDelivery.sent_at,
+            ).where(*in_chunk)
+            await session.execute(
+                insert_ignore(BroadcastDeliveryArchive)
+                .from_select(
+                    ["broadcast_id", "user_id", "status", "attempts", "error_code", "message_id", "sent_at"],
+                    rows,
+                )
+            )
+            res = await session.execute(
+                delete(BroadcastDelivery).where(*in_chunk).execution_options(synchronize_session=False)
+            )
+            moved += max(res.rowcount or 0, 0)
+
+            if bound is None:
+                await session.execute(
+                    update(Broadcast)
+                    .where(Broadcast.id == broadcast_id)
+                    .values(archived_at=now_msk_naive())
+                    .execution_options(synchronize_session=False)
+                )
+                return moved
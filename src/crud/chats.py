@@ -5,7 +5,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from .base import AsyncSession, delete, retry_db, select
+from .base import AsyncSession, delete, retry_db, select, write_tx
 from src.models import Chat
 
 
@@ -18,7 +18,7 @@ async def upsert_chat(
     type_: str,
     added_at: datetime,
 ) -> Chat:
-    async with session.begin():
+    async with write_tx(session):
         stmt = select(Chat).where(Chat.id == chat_id)
         res = await session.execute(stmt)
         chat = res.scalar_one_or_none()
@@ -36,7 +36,7 @@ async def upsert_chat(
 
 @retry_db
 async def delete_chat(session: AsyncSession, *, chat_id: int) -> None:
-    async with session.begin():
+    async with write_tx(session):
         await session.execute(delete(Chat).where(Chat.id == chat_id))
 
 
@@ -1,11 +1,13 @@
 # src/crud/invite_links.py
-# commit: унифицированы транзакции (session.begin), сохранён upsert через mysql_insert, убран ручной commit/rollback
+# commit: выборки ссылок — Core-строки без ORM identity map (сериализуются напрямую)
 
 from __future__ import annotations
 
 from datetime import datetime
 
-from .base import AsyncSession, SQLAlchemyError, delete, func, mysql_insert, retry_db, select
+from sqlalchemy.engine import Row
+
+from .base import AsyncSession, SQLAlchemyError, delete, func, retry_db, select, upsert, write_tx
 from src.models import InviteLink
 
 
@@ -19,20 +21,21 @@ async def save_invite_link(
     created_at: datetime,
     expires_at: datetime,
 ) -> InviteLink:
-    stmt = mysql_insert(InviteLink).values(
-        user_id=user_id,
-        chat_id=chat_id,
-        invite_link=invite_link,
-        created_at=created_at,
-        expires_at=expires_at,
-    ).on_duplicate_key_update(
-        invite_link=mysql_insert(InviteLink).inserted.invite_link,
-        created_at=mysql_insert(InviteLink).inserted.created_at,
-        expires_at=mysql_insert(InviteLink).inserted.expires_at,
+    stmt = upsert(
+        InviteLink,
+        {
+            "user_id": user_id,
+            "chat_id": chat_id,
+            "invite_link": invite_link,
+            "created_at": created_at,
+            "expires_at": expires_at,
+        },
+        update_cols=("invite_link", "created_at", "expires_at"),
+        conflict=("user_id", "chat_id"),  # uq_invite_user_chat
     )
 
     try:
-        async with session.begin():
+        async with write_tx(session):
             await session.execute(stmt)
     except SQLAlchemyError:
         raise
@@ -47,24 +50,24 @@ async def save_invite_link(
 
 
 @retry_db
-async def get_valid_invite_links(session: AsyncSession, *, user_id: int) -> list[InviteLink]:
+async def get_valid_invite_links(session: AsyncSession, *, user_id: int) -> list[Row]:
     now = func.now()
-    stmt = select(InviteLink).where(
+    stmt = select(InviteLink.__table__).where(
         InviteLink.user_id == user_id,
         InviteLink.expires_at > now,
     )
     res = await session.execute(stmt)
-    return list(res.scalars().all())
+    return list(res.all())
 
 
 @retry_db
-async def get_invite_links(session: AsyncSession, *, user_id: int) -> list[InviteLink]:
-    stmt = select(InviteLink).where(InviteLink.user_id == user_id)
+async def get_invite_links(session: AsyncSession, *, user_id: int) -> list[Row]:
+    stmt = select(InviteLink.__table__).where(InviteLink.user_id == user_id)
     res = await session.execute(stmt)
-    return list(res.scalars().all())
+    return list(res.all())
 
 
 @retry_db
 async def delete_invite_links(session: AsyncSession, *, user_id: int) -> None:
-    async with session.begin():
+    async with write_tx(session):
         await session.execute(delete(InviteLink).where(InviteLink.user_id == user_id))
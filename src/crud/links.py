@@ -5,13 +5,13 @@ from __future__ import annotations
 
 from fastapi import HTTPException
 
-from .base import AsyncSession, retry_db, update
+from .base import AsyncSession, retry_db, update, write_tx
 from src.models import Link
 
 
 @retry_db
 async def increment_link_visit(session: AsyncSession, *, link_key: str) -> None:
-    async with session.begin():
+    async with write_tx(session):
         stmt = (
             update(Link)
             .where(Link.link_key == link_key)
@@ -0,0 +1,90 @@
+# src/crud/subscriptions.py
+# commit: count_kind_subscribers вместо выгрузки id для резолвера в памяти
+
+from __future__ import annotations
+
+from sqlalchemy import or_
+
+from .base import AsyncSession, func, retry_db, select, upsert, write_tx
+from src.config import settings
+from src.models import BROADCAST_KINDS, User, UserSubscription
+from src.time_msk import now_msk_naive
+
+SUBSCRIPTION_FLAGS = tuple(f"{kind}_enabled" for kind in BROADCAST_KINDS)
+
+
+def subscription_flags(obj) -> dict[str, bool]:
+    """Флаги подписки строки/ORM-объекта; для отсутствующей строки — settings.SUBSCRIPTION_DEFAULTS."""
+    if obj is None:
+        return dict(settings.SUBSCRIPTION_DEFAULTS)
+    return {flag: bool(getattr(obj, flag)) for flag in SUBSCRIPTION_FLAGS}
+
+
+@retry_db
+async def get_subscription(session: AsyncSession, *, user_id: int) -> UserSubscription | None:
+    return await session.get(UserSubscription, user_id)
+
+
+@retry_db
+async def upsert_subscriptions(session: AsyncSession, *, items: list[dict]) -> dict[int, dict[str, bool]]:
+    """
+    Батч-upsert настроек: items = [{"user_id": ..., "<kind>_enabled": bool, ...}].
+    Строки группируются по набору переданных флагов, чтобы не затирать непереданные.
+    Возвращает итоговые флаги по каждому user_id (для инкрементального обновления резолвера).
+    """
+    latest: dict[int, dict] = {}
+    for item in items:
+        latest.setdefault(int(item["user_id"]), {}).update(
+            {k: bool(v) for k, v in item.items() if k in SUBSCRIPTION_FLAGS and v is not None}
+        )
+
+    groups: dict[tuple[str, ...], list[dict]] = {}
+    now = now_msk_naive()
+    for user_id, flags in latest.items():
+        changed = tuple(f for f in SUBSCRIPTION_FLAGS if f in flags)
+        if not changed:
+            continue
+        row = {"user_id": user_id, **settings.SUBSCRIPTION_DEFAULTS, **flags, "created_at": now, "updated_at": now}
+        groups.setdefault(changed, []).append(row)
+
+    async with write_tx(session):
+        for changed, rows in groups.items():
+            await session.execute(upsert(UserSubscription, rows, update_cols=(*changed, "updated_at")))
+
+        res = await session.execute(
+            select(UserSubscription).where(UserSubscription.user_id.in_(list(latest)))
+            .execution_options(populate_existing=True)
+        )
+        current = {int(obj.user_id): subscription_flags(obj) for obj in res.scalars().all()}
+
+    return current
+
+
+def kind_subscribers_select(kind: str):
+    """
+    SELECT user_id подписчиков kind — одно правило для таргетинга, оценок и API:
+    users LEFT JOIN user_subscriptions, флаг = COALESCE(<kind>_enabled, дефолт).
+    Пользователь, ни разу не открывавший настройки (строки нет), подписан по
+    settings.SUBSCRIPTION_DEFAULTS — ровно то, что отдаёт subscription_flags(None).
+
+    COALESCE раскрыт в OR по известному дефолту: при дефолте False условие сводится
+    к flag = 1 и остаётся по индексу ix_usubs_<kind>.
+    """
+    flag = getattr(UserSubscription, f"{kind}_enabled")
+    if settings.SUBSCRIPTION_DEFAULTS[f"{kind}_enabled"]:
+        cond = or_(UserSubscription.user_id.is_(None), flag == True)  # noqa: E712
+    else:
+        cond = flag == True  # noqa: E712
+    return (
+        select(User.id.label("user_id"))
+        .outerjoin(UserSubscription, UserSubscription.user_id == User.id)
+        .where(cond)
+    )
+
+
+@retry_db
+async def count_kind_subscribers(session: AsyncSession, *, kind: str) -> int:
+    """Сколько пользователей получит kind-таргет (оценка аудитории, по тому же правилу)."""
+    src = kind_subscribers_select(kind).subquery("src")
+    res = await session.execute(select(func.count()).select_from(src))
+    return int(res.scalar_one())
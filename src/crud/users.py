@@ -6,24 +6,10 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete, update
 
-from .base import retry_db, mysql_insert, db_tx
+from .base import retry_db, upsert, db_tx, integrity_code
 from src.models import User, UserMembership
 
 
-def _mysql_err_code(err: IntegrityError) -> int | None:
-    """Достаём MySQL errno (1062, 1452 и т.д.) из IntegrityError."""
-    orig = getattr(err, "orig", None)
-    if orig is None:
-        return None
-    args = getattr(orig, "args", None)
-    if not args:
-        return None
-    try:
-        return int(args[0])
-    except Exception:
-        return None
-
-
 @retry_db
 async def upsert_user(
     session: AsyncSession,
@@ -39,18 +25,10 @@ async def upsert_user(
     """
     terms_val = False if terms_accepted is None else terms_accepted
 
-    insert_stmt = mysql_insert(User).values(
-        id=id,
-        username=username,
-        full_name=full_name,
-        terms_accepted=terms_val,
-    )
-
-    # ВАЖНО: используем insert_stmt.inserted.<col> ОТ ТОГО ЖЕ insert_stmt
-    stmt = insert_stmt.on_duplicate_key_update(
-        username=insert_stmt.inserted.username,
-        full_name=insert_stmt.inserted.full_name,
-        terms_accepted=insert_stmt.inserted.terms_accepted,
+    stmt = upsert(
+        User,
+        {"id": id, "username": username, "full_name": full_name, "terms_accepted": terms_val},
+        update_cols=("username", "full_name", "terms_accepted"),
     )
 
     async with db_tx(session):
@@ -124,7 +102,7 @@ async def upsert_user_to_chat(session: AsyncSession, *, user_id: int, chat_id: i
         return obj
 
     except IntegrityError as e:
-        code = _mysql_err_code(e)
+        code = integrity_code(e)
 
         # Дубликат: кто-то успел вставить параллельно
         if code == 1062:
@@ -1,34 +1,90 @@
 # src/database.py
-# commit: безопасная сборка DATABASE_URL (urlencode пароля) + неизменная async SQLAlchemy база
+# commit: BEGIN IMMEDIATE на SQLite только для пишущих транзакций (write_tx), чтения — DEFERRED
 
+import time
 from urllib.parse import quote_plus
 
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
 
 
 def _build_database_url() -> str:
+    if settings.DB_BACKEND == "sqlite":
+        path = ":memory:" if settings.sqlite_in_memory else settings.SQLITE_PATH
+        return f"sqlite+aiosqlite:///{path}"
     user = settings.DB_USER
     password = quote_plus(settings.DB_PASSWORD)
     host = settings.DB_HOST
     port = settings.DB_PORT
     name = settings.DB_NAME
-    return f"mysql+aiomysql://{user}:{password}@{host}:{port}/{name}"
+    return f"mysql+{settings.DB_DRIVER}://{user}:{password}@{host}:{port}/{name}"
 
 
 DATABASE_URL = _build_database_url()
 
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Очередь пула с учётом времени получения соединения (ожидание + новый коннект) для /metrics."""
+
+    wait_seconds_total = 0.0
+    wait_seconds_max = 0.0
+    checkouts_total = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - started
+            self.wait_seconds_total += elapsed
+            self.checkouts_total += 1
+            if elapsed > self.wait_seconds_max:
+                self.wait_seconds_max = elapsed
+
+
+def _sqlite_pragmas(dbapi_conn, connection_record) -> None:
+    # транзакциями управляет SQLAlchemy (BEGIN в _sqlite_begin), иначе драйвер
+    # сам открывает их только перед DML и ломает SAVEPOINT из db_tx
+    dbapi_conn.isolation_level = None
+    cursor = dbapi_conn.cursor()
+    if not settings.sqlite_in_memory:
+        # WAL: читатели не ждут писателя; synchronous=NORMAL — fsync только на checkpoint
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute(f"PRAGMA busy_timeout={settings.POOL_TIMEOUT * 1000}")
+    cursor.close()
+
+
+def _sqlite_begin(conn) -> None:
+    # пишущие транзакции (crud.base.write_tx) — IMMEDIATE: блокировка записи берётся сразу
+    # и ждёт busy_timeout; у DEFERRED повышение чтения до записи при занятой базе падает
+    # сразу с «database is locked». Остальные (autobegin чтений) — DEFERRED: в WAL они
+    # не встают в очередь за единственной блокировкой записи
+    if conn.get_execution_options().get("sqlite_immediate"):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        conn.exec_driver_sql("BEGIN")
+
+
 engine = create_async_engine(
     DATABASE_URL,
+    poolclass=TimedAsyncQueuePool,
     pool_size=settings.resolved_pool_size,
     max_overflow=settings.resolved_max_overflow,
     pool_timeout=settings.POOL_TIMEOUT,
-    pool_recycle=settings.POOL_RECYCLE,
-    pool_pre_ping=True,
+    # :memory: живёт, пока живо соединение — его нельзя пересоздавать
+    pool_recycle=-1 if settings.sqlite_in_memory else settings.POOL_RECYCLE,
+    pool_pre_ping=not settings.sqlite_in_memory,
     echo=False,
 )
+if settings.DB_BACKEND == "sqlite":
+    event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+    event.listen(engine.sync_engine, "begin", _sqlite_begin)
 
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -40,6 +96,6 @@ Base = declarative_base()
 
 
 async def init_db() -> None:
-    """Создать таблицы по текущим моделям (опционально)."""
+    """Создать таблицы по текущим моделям (для SQLite — единственный способ, миграции alembic только под MySQL)."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
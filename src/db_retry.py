@@ -0,0 +1,278 @@
+# src/db_retry.py
+# commit: «database is locked» SQLite — блокировка, а не обрыв соединения
+
+"""
+Политика ретраев обращений к БД (декоратор crud.retry_db).
+
+Прежний tenacity-вариант ретраил OperationalError 5 раз с ожиданием до 10 с в каждой
+вложенной функции отдельно: upsert_user_and_membership (две ретраящиеся функции внутри
+ретраящейся) мог держать запрос минуту и умножать нагрузку на лежащую БД.
+
+- Ретраит только самый внешний вызов: вложенные retry_db выполняются один раз, ошибка
+  уходит наверх, и повторяется вся операция целиком (транзакция, а не оператор).
+  Если на входе у сессии уже открыта чужая транзакция — не ретраим вовсе: после
+  дедлока MySQL откатывает её целиком, повторять может только её владелец.
+- Повторяются обрывы соединения (OperationalError и коды клиента 2002/2003/2006/2013/...)
+  и блокировки 1213 (deadlock) / 1205 (lock wait timeout), на SQLite — «database is locked».
+- Пауза — full jitter: random(0, min(cap, base·2^n)); ретрай не начинается, если
+  пауза не укладывается в дедлайн запроса (GatewayMiddleware ставит его на вход,
+  фоновые задачи получают DB_RETRY_DEFAULT_DEADLINE_SEC).
+- Общий бюджет ретраев — token bucket на процесс: при массовых ошибках повторов
+  не больше DB_RETRY_BUDGET_PER_SEC в секунду (с запасом DB_RETRY_BUDGET_BURST).
+- Circuit breaker: после DB_BREAKER_THRESHOLD подряд обрывов соединения вызовы
+  DB_BREAKER_OPEN_SEC секунд сразу падают с DatabaseUnavailable, затем пропускается
+  один пробный вызов — успех закрывает breaker, ошибка снова открывает.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import math
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+LOCK_ERROR_CODES = frozenset({1205, 1213})
+# CR_CONNECTION_ERROR, CR_CONN_HOST_ERROR, CR_SERVER_GONE_ERROR, CR_SERVER_LOST, CR_SERVER_LOST_EXTENDED,
+# ER_CON_COUNT_ERROR, ER_SERVER_SHUTDOWN
+CONNECTION_ERROR_CODES = frozenset({2002, 2003, 2006, 2013, 2055, 1040, 1053})
+
+_deadline: ContextVar[float | None] = ContextVar("db_request_deadline", default=None)
+_in_retry_scope: ContextVar[bool] = ContextVar("db_in_retry_scope", default=False)
+
+
+class DatabaseUnavailable(Exception):
+    """БД признана недоступной (открыт circuit breaker) — вызов не выполнялся."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"БД недоступна, повторите через {retry_after:.0f} с")
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    """Дедлайн для всех retry_db внутри блока (per-request)."""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def mysql_error_code(exc: BaseException) -> int | None:
+    orig = getattr(exc, "orig", None)
+    args = getattr(orig, "args", None)
+    if not args:
+        return None
+    try:
+        return int(args[0])
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(exc: BaseException) -> str | None:
+    """"lock" / "connection" — ошибку можно повторить; None — нельзя."""
+    if isinstance(exc, PoolTimeoutError):
+        return "connection"
+    if not isinstance(exc, DBAPIError):
+        return None
+    code = mysql_error_code(exc)
+    if code in LOCK_ERROR_CODES or "database is locked" in str(exc.orig):
+        return "lock"
+    if exc.connection_invalidated or code in CONNECTION_ERROR_CODES:
+        return "connection"
+    if isinstance(exc, OperationalError):
+        return "connection"
+    return None
+
+
+class RetryBudget:
+    """Token bucket: ретрай тратит токен, токены восполняются со скоростью rate в секунду."""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold: int, open_sec: float) -> None:
+        self.threshold = threshold
+        self.open_sec = open_sec
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_total = 0
+        self.rejected = 0
+        self._open_until = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self) -> bool:
+        """Пропускает вызов или кидает DatabaseUnavailable; True — это пробный вызов."""
+        if self.state == self.CLOSED:
+            return False
+        now = time.monotonic()
+        if self.state == self.OPEN and now >= self._open_until:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        raise DatabaseUnavailable(max(self._open_until - now, 1.0))
+
+    def end_probe(self) -> None:
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info("[db-retry] circuit breaker закрыт — БД отвечает")
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.threshold):
+            self.state = self.OPEN
+            self._open_until = time.monotonic() + self.open_sec
+            self.opened_total += 1
+            logger.error(
+                f"[db-retry] circuit breaker открыт на {self.open_sec:.0f} с: "
+                f"{self.failures} ошибок соединения подряд"
+            )
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        *,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        default_deadline: float,
+        budget: RetryBudget,
+        breaker: CircuitBreaker,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.default_deadline = default_deadline
+        self.budget = budget
+        self.breaker = breaker
+        self.retries = 0
+        self.budget_exhausted = 0
+        self.deadline_exceeded = 0
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def run(self, func, args, kwargs, *, session, retriable: bool):
+        probe = self.breaker.before_call()
+        deadline = _deadline.get() or time.monotonic() + self.default_deadline
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as exc:
+                    kind = classify(exc)
+                    if kind == "connection":
+                        self.breaker.record_failure()
+                    elif isinstance(exc, DBAPIError):
+                        self.breaker.record_success()
+                    if not self._should_retry(kind, retriable, attempt):
+                        raise
+                    delay = self.backoff(attempt)
+                    if time.monotonic() + delay >= deadline:
+                        self.deadline_exceeded += 1
+                        raise
+                    if not self.budget.take():
+                        self.budget_exhausted += 1
+                        raise
+                    if session is not None and session.in_transaction():
+                        await session.rollback()
+                    self.retries += 1
+                    logger.warning(
+                        f"[db-retry] {func.__qualname__}: {kind} (код {mysql_error_code(exc)}), "
+                        f"попытка {attempt + 1} через {delay * 1000:.0f} мс"
+                    )
+                    await asyncio.sleep(delay)
+                    continue
+                self.breaker.record_success()
+                return result
+        finally:
+            if probe:
+                self.breaker.end_probe()
+
+    def _should_retry(self, kind: str | None, retriable: bool, attempt: int) -> bool:
+        if kind is None or not retriable or attempt >= self.max_attempts:
+            return False
+        return self.breaker.state == CircuitBreaker.CLOSED
+
+    def stats(self) -> dict:
+        return {
+            "breaker_state": self.breaker.state,
+            "breaker_opened_total": self.breaker.opened_total,
+            "breaker_rejected": self.breaker.rejected,
+            "retries": self.retries,
+            "budget_tokens": round(self.budget.tokens, 1),
+            "budget_exhausted": self.budget_exhausted,
+            "deadline_exceeded": self.deadline_exceeded,
+        }
+
+
+db_retry_policy = RetryPolicy(
+    max_attempts=settings.DB_RETRY_MAX_ATTEMPTS,
+    base_delay=settings.DB_RETRY_BASE_MS / 1000,
+    max_delay=settings.DB_RETRY_MAX_BACKOFF_SEC,
+    default_deadline=settings.DB_RETRY_DEFAULT_DEADLINE_SEC,
+    budget=RetryBudget(settings.DB_RETRY_BUDGET_PER_SEC, settings.DB_RETRY_BUDGET_BURST),
+    breaker=CircuitBreaker(settings.DB_BREAKER_THRESHOLD, settings.DB_BREAKER_OPEN_SEC),
+)
+
+
+def _session_arg(args, kwargs):
+    session = kwargs.get("session")
+    if session is None and args:
+        session = args[0]
+    return session if hasattr(session, "in_transaction") else None
+
+
+def retry_db(func):
+    """Декоратор CRUD-функций: повтор всей операции по политике db_retry_policy."""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if _in_retry_scope.get():
+            # вложенный вызов — повторяет самый внешний retry_db
+            return await func(*args, **kwargs)
+        session = _session_arg(args, kwargs)
+        retriable = session is None or not session.in_transaction()
+        token = _in_retry_scope.set(True)
+        try:
+            return await db_retry_policy.run(func, args, kwargs, session=session, retriable=retriable)
+        finally:
+            _in_retry_scope.reset(token)
+
+    return wrapper
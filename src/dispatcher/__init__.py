@@ -0,0 +1,19 @@
+# src/dispatcher/__init__.py
+# commit: рендер контента вынесен в src.send_plan (общий скомпилированный план отправки)
+
+from .ratelimit import RateLimiter, RecipientLimiter, TokenBucket
+from .transport import FakeTransport, TelegramError, TelegramTransport, Transport
+from .worker import Dispatcher, build_transport, run_dispatcher
+
+__all__ = [
+    "RateLimiter",
+    "RecipientLimiter",
+    "TokenBucket",
+    "FakeTransport",
+    "TelegramError",
+    "TelegramTransport",
+    "Transport",
+    "Dispatcher",
+    "build_transport",
+    "run_dispatcher",
+]
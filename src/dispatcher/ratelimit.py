@@ -0,0 +1,81 @@
+# src/dispatcher/ratelimit.py
+# commit: глобальный bucket без всплеска — ёмкость 1 и старт пустым, не больше rate сообщений в первую секунду
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Асинхронный token bucket: rate токенов/сек, burst до capacity; pause() — общий стоп по 429.
+    tokens — начальный запас (по умолчанию полный bucket).
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None, *, tokens: float | None = None) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = min(self.capacity, float(tokens)) if tokens is not None else self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+class RecipientLimiter:
+    """
+    Не чаще rate сообщений/сек в один чат.
+    Память ограничена: записи, чьё окно уже прошло, вычищаются при росте словаря.
+    """
+
+    def __init__(self, rate: float, *, max_entries: int = 50_000) -> None:
+        self.interval = 1.0 / float(rate)
+        self.max_entries = max_entries
+        self._next_at: dict[int, float] = {}
+
+    async def acquire(self, chat_id: int) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next_at.get(chat_id, 0.0))
+        self._next_at[chat_id] = slot + self.interval
+        if len(self._next_at) > self.max_entries:
+            self._prune(now)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def _prune(self, now: float) -> None:
+        for chat_id in [c for c, t in self._next_at.items() if t <= now]:
+            del self._next_at[chat_id]
+
+
+class RateLimiter:
+    """Глобальный лимит бота + лимит на получателя: acquire(chat_id) ждёт оба."""
+
+    def __init__(self, *, global_rate: float, per_chat_rate: float) -> None:
+        # ёмкость 1 и пустой старт: полный bucket на rate токенов пропустил бы сразу
+        # ~rate сообщений и ещё rate за ту же секунду — Telegram ответил бы 429
+        self.global_bucket = TokenBucket(global_rate, capacity=1, tokens=0)
+        self.recipients = RecipientLimiter(per_chat_rate)
+
+    async def acquire(self, chat_id: int) -> None:
+        await self.recipients.acquire(chat_id)
+        await self.global_bucket.acquire()
+
+    def backoff(self, retry_after: float) -> None:
+        self.global_bucket.pause(retry_after)
@@ -0,0 +1,148 @@
+# src/dispatcher/transport.py
+# commit: таймаут чтения после отправки запроса — исход неизвестен (delivery_unknown), повторять нельзя
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from typing import Protocol
+
+import httpx
+
+
+class TelegramError(Exception):
+    """
+    Ошибка Bot API (ok=false) или сети; retry_after заполнен для 429.
+    delivery_unknown — запрос ушёл, а ответа нет: сообщение могло быть доставлено.
+    """
+
+    def __init__(
+        self,
+        error_code: int,
+        description: str,
+        *,
+        retry_after: float | None = None,
+        delivery_unknown: bool = False,
+    ) -> None:
+        super().__init__(f"{error_code}: {description}")
+        self.error_code = error_code
+        self.description = description
+        self.retry_after = retry_after
+        self.delivery_unknown = delivery_unknown
+
+
+# запрос до Telegram не дошёл: соединение не установлено или не получено из пула
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def transport_error(e: httpx.HTTPError) -> TelegramError:
+    """Сетевая ошибка httpx → TelegramError(0); всё, что случилось после отправки, — delivery_unknown."""
+    return TelegramError(0, f"transport: {e!r}", delivery_unknown=not isinstance(e, _NOT_SENT_ERRORS))
+
+
+class Transport(Protocol):
+    async def call(self, method: str, payload: dict) -> dict:
+        """Вызвать метод Bot API и вернуть result; при ошибке — TelegramError."""
+        ...
+
+    async def call_raw(self, method: str, body: bytes) -> dict:
+        """То же, но с уже сериализованным JSON-телом (из SendPlan)."""
+        ...
+
+    async def close(self) -> None:
+        ...
+
+
+class TelegramTransport:
+    """Bot API через httpx.AsyncClient (keep-alive пул); base_url можно направить на фейковый сервер."""
+
+    def __init__(
+        self,
+        token: str,
+        *,
+        base_url: str = "https://api.telegram.org",
+        timeout: float = 10.0,
+        http_transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self._client = httpx.AsyncClient(
+            base_url=f"{base_url.rstrip('/')}/bot{token}/",
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=64),
+            transport=http_transport,
+        )
+
+    async def call(self, method: str, payload: dict) -> dict:
+        return await self.call_raw(method, json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+    async def call_raw(self, method: str, body: bytes) -> dict:
+        try:
+            resp = await self._client.post(method, content=body, headers={"Content-Type": "application/json"})
+        except httpx.HTTPError as e:
+            raise transport_error(e) from e
+        try:
+            data = resp.json()
+        except ValueError as e:
+            # не-JSON ответ (502 от прокси и т.п.): Telegram запрос не обработал
+            raise TelegramError(0, f"transport: {resp.status_code} {e}") from e
+
+        if data.get("ok"):
+            return data.get("result") or {}
+        params = data.get("parameters") or {}
+        raise TelegramError(
+            int(data.get("error_code") or resp.status_code),
+            str(data.get("description") or ""),
+            retry_after=params.get("retry_after"),
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+class FakeTransport:
+    """
+    Локальная имитация Bot API для бенчмарков диспетчера.
+
+    Держит лимиты Telegram (global_rps в секунду на бота, per_chat_rps на чат)
+    и отвечает 429 с retry_after при превышении, добавляя latency_ms на вызов.
+    """
+
+    def __init__(self, *, latency_ms: float = 30.0, global_rps: float = 30.0, per_chat_rps: float = 1.0) -> None:
+        self.latency = latency_ms / 1000
+        self.global_rps = global_rps
+        self.per_chat_interval = 1.0 / per_chat_rps
+        self._window: deque[float] = deque()
+        self._last_by_chat: dict[int, float] = {}
+        self._message_ids = itertools.count(1)
+        self.calls = 0
+        self.throttled = 0
+
+    async def call(self, method: str, payload: dict) -> dict:
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        now = time.monotonic()
+        chat_id = int(payload.get("chat_id", 0))
+
+        while self._window and now - self._window[0] >= 1.0:
+            self._window.popleft()
+        if len(self._window) >= self.global_rps:
+            self.throttled += 1
+            raise TelegramError(429, "Too Many Requests: retry after 1", retry_after=1)
+        last = self._last_by_chat.get(chat_id)
+        if last is not None and now - last < self.per_chat_interval:
+            self.throttled += 1
+            raise TelegramError(429, "Too Many Requests: retry after 1", retry_after=1)
+
+        self._window.append(now)
+        self._last_by_chat[chat_id] = now
+        if method == "sendMediaGroup":
+            return [{"message_id": next(self._message_ids)} for _ in payload.get("media", [])]
+        return {"message_id": next(self._message_ids)}
+
+    async def call_raw(self, method: str, body: bytes) -> dict:
+        return await self.call(method, json.loads(body))
+
+    async def close(self) -> None:
+        return None
@@ -0,0 +1,193 @@
+# src/dispatcher/worker.py
+# commit: таймаут чтения после отправки — failed/unknown вместо возврата в очередь (дубли у получателя)
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+from src import crud
+from src.config import settings
+from src.database import AsyncSessionLocal
+from src.send_plan import SendPlan, send_plan_cache
+from src.time_msk import now_msk_naive
+
+from .ratelimit import RateLimiter
+from .transport import FakeTransport, TelegramError, TelegramTransport, Transport
+
+logger = logging.getLogger(__name__)
+
+# 403: бот заблокирован / пользователь деактивирован — повторять бессмысленно
+_SKIP_CODES = {403}
+# 400: chat not found и прочие ошибки запроса — финальная ошибка
+_FAIL_CODES = {400}
+# многошаговый план оборвался после успешных вызовов — доставка не повторяется
+_PARTIAL_CODE = "partial"
+# запрос ушёл, ответа нет (таймаут чтения) — сообщение могло дойти, повтор дал бы дубль
+_UNKNOWN_CODE = "unknown"
+
+
+def build_transport() -> Transport:
+    if settings.DISPATCH_TRANSPORT == "fake":
+        return FakeTransport(global_rps=settings.DISPATCH_GLOBAL_RATE, per_chat_rps=settings.DISPATCH_PER_CHAT_RATE)
+    token = settings.BROADCAST_BOT_TOKEN or settings.TELEGRAM_BOT_TOKEN
+    return TelegramTransport(token, base_url=settings.TELEGRAM_API_BASE)
+
+
+class Dispatcher:
+    """
+    Отправщик рассылок (отдельный процесс рядом с main:app).
+
+    Цикл: рассылки в статусе sending → claim пачки доставок под аренду →
+    параллельная отправка через общий RateLimiter (глобальный + на получателя,
+    пауза по 429 retry_after) → один батч-отчёт на пачку. План отправки
+    компилируется один раз на (рассылка, версия) и переиспользуется для всех получателей.
+    """
+
+    def __init__(self, transport: Transport, *, worker_id: str | None = None) -> None:
+        self.transport = transport
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.limiter = RateLimiter(
+            global_rate=settings.DISPATCH_GLOBAL_RATE,
+            per_chat_rate=settings.DISPATCH_PER_CHAT_RATE,
+        )
+        self._stopping = asyncio.Event()
+        self.sent = 0
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def run(self) -> None:
+        logger.info(f"[dispatcher] старт worker_id={self.worker_id}")
+        try:
+            while not self._stopping.is_set():
+                worked = False
+                try:
+                    worked = await self.run_once()
+                except Exception as e:
+                    logger.error(f"[dispatcher] ошибка цикла: {e}", exc_info=True)
+                if not worked:
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), timeout=settings.DISPATCH_IDLE_SEC)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            await self.transport.close()
+            logger.info(f"[dispatcher] остановлен, отправлено={self.sent}")
+
+    async def run_once(self) -> bool:
+        """Один проход по активным рассылкам. True — что-то было отправлено."""
+        async with AsyncSessionLocal() as session:
+            broadcasts = await crud.list_sending_broadcasts(session)
+
+        worked = False
+        for broadcast in broadcasts:
+            try:
+                plan = send_plan_cache.get_or_compile(broadcast)
+            except ValueError as e:
+                logger.error(f"[{broadcast.id}] [dispatcher] контент не компилируется: {e}")
+                continue
+            if await self._dispatch_batch(broadcast.id, plan):
+                worked = True
+            if self._stopping.is_set():
+                break
+        return worked
+
+    async def _dispatch_batch(self, broadcast_id: int, plan: SendPlan) -> bool:
+        async with AsyncSessionLocal() as session:
+            claim = await crud.claim_deliveries(
+                session,
+                broadcast_id=broadcast_id,
+                n=settings.DISPATCH_CLAIM_BATCH,
+                lease_seconds=settings.BROADCAST_LEASE_SEC,
+                worker=self.worker_id,
+            )
+
+        items = claim["items"]
+        if not items:
+            async with AsyncSessionLocal() as session:
+                if await crud.finish_broadcast_if_done(session, broadcast_id=broadcast_id):
+                    logger.info(f"[{broadcast_id}] [dispatcher] рассылка завершена")
+            return False
+
+        sem = asyncio.Semaphore(settings.DISPATCH_CONCURRENCY)
+
+        async def _one(item: dict) -> dict:
+            async with sem:
+                return await self._deliver(plan, item)
+
+        results = await asyncio.gather(*(_one(item) for item in items))
+
+        async with AsyncSessionLocal() as session:
+            report = await crud.report_deliveries(
+                session,
+                broadcast_id=broadcast_id,
+                results=results,
+                chunk_size=settings.BROADCAST_REPORT_CHUNK,
+            )
+        self.sent += report["applied"]["sent"]
+        logger.info(f"[{broadcast_id}] [dispatcher] пачка={len(items)}, applied={report['applied']}")
+        return True
+
+    async def _deliver(self, plan: SendPlan, item: dict) -> dict:
+        chat_id = item["user_id"]
+        result = {"id": item["id"], "attempts": item["attempts"] + 1}
+        message_id = None
+        done = 0
+
+        try:
+            for index, method in enumerate(plan.methods):
+                response = await self._call_with_backoff(method, plan.request_body(index, chat_id), chat_id)
+                done = index + 1
+                if message_id is None:
+                    first = response[0] if isinstance(response, list) and response else response
+                    message_id = first.get("message_id") if isinstance(first, dict) else None
+        except TelegramError as e:
+            result.update(error_code=str(e.error_code), error_message=e.description[:255])
+            if done:
+                # часть плана уже у пользователя: повтор отправил бы её заново — закрываем доставку
+                result.update(
+                    status="failed",
+                    error_code=_PARTIAL_CODE,
+                    error_message=f"отправлено {done}/{len(plan.methods)}, {e.error_code}: {e.description}"[:255],
+                    message_id=message_id,
+                )
+            elif e.delivery_unknown:
+                result.update(status="failed", error_code=_UNKNOWN_CODE)
+            elif e.error_code in _SKIP_CODES:
+                result["status"] = "skipped"
+            elif e.error_code in _FAIL_CODES or result["attempts"] >= settings.BROADCAST_MAX_ATTEMPTS:
+                result["status"] = "failed"
+            else:
+                # соединение не установлено/5xx/исчерпанные 429 — вернуть в очередь
+                result["status"] = "pending"
+            return result
+
+        result.update(status="sent", message_id=message_id, sent_at=now_msk_naive())
+        return result
+
+    async def _call_with_backoff(self, method: str, body: bytes, chat_id: int):
+        for attempt in range(settings.DISPATCH_MAX_429_RETRIES + 1):
+            await self.limiter.acquire(chat_id)
+            try:
+                return await self.transport.call_raw(method, body)
+            except TelegramError as e:
+                if e.error_code != 429 or attempt == settings.DISPATCH_MAX_429_RETRIES:
+                    raise
+                retry_after = float(e.retry_after or 1)
+                logger.warning(f"[{chat_id}] [dispatcher] 429, пауза {retry_after}s")
+                self.limiter.backoff(retry_after)
+
+
+async def run_dispatcher() -> None:
+    dispatcher = Dispatcher(build_transport())
+    loop = asyncio.get_running_loop()
+    try:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, dispatcher.stop)
+    except (NotImplementedError, RuntimeError):
+        pass
+    await dispatcher.run()
@@ -4,6 +4,8 @@ from fastapi import Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.exc import IntegrityError
 
+from src.db_retry import DatabaseUnavailable
+
 async def handle_integrity_error(request: Request, exc: IntegrityError):
     """
     Обработчик для ошибок целостности данных (IntegrityError).
@@ -30,11 +32,25 @@ async def handle_global_exception(request: Request, exc: Exception):
         content={"detail": "Internal Server Error"}
     )
 
+async def handle_database_unavailable(request: Request, exc: DatabaseUnavailable):
+    """
+    Circuit breaker БД открыт: 503 + Retry-After без стектрейса (запрос до БД не дошёл).
+    """
+    logger = logging.getLogger("db_service")
+    logger.warning(f"DatabaseUnavailable: {request.method} {request.url.path}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "База данных временно недоступна"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 def register_exception_handlers(app):
     """
     Регистрирует глобальные обработчики на FastAPI app:
       - IntegrityError → handle_integrity_error
+      - DatabaseUnavailable → handle_database_unavailable
       - Exception      → handle_global_exception
     """
     app.add_exception_handler(IntegrityError, handle_integrity_error)
+    app.add_exception_handler(DatabaseUnavailable, handle_database_unavailable)
     app.add_exception_handler(Exception, handle_global_exception)
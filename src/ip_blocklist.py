@@ -0,0 +1,240 @@
+# src/ip_blocklist.py
+# commit: доверенные прокси и BLOCKLIST_ALLOWLIST (loopback + частные сети) не считаются и не банятся
+
+"""
+Адаптивный блоклист клиентов, шлющих мусор (сканеры путей, неизвестные роуты).
+
+- Попадания считаются в count-min sketch (depth × width счётчиков, память фиксирована
+  независимо от числа IP). Скользящее окно — два скетча, текущий и предыдущий:
+  оценка = текущий + предыдущий × доля окна, ещё не ушедшая за границу.
+- Превысивший threshold за window_sec IP попадает в бан на ban_sec; баны — LRU
+  на max_bans записей (при переполнении вытесняется самый старый).
+- Скетч может только переоценить, поэтому порог стоит держать с запасом: честный
+  клиент, получивший пару 404, в бан не попадёт.
+
+IP клиента берётся из x-real-ip / x-forwarded-for только если соединение пришло
+от доверенного прокси (TRUSTED_PROXIES), иначе — адрес соединения. Если прокси
+заголовок не передал, IP клиента совпадёт с адресом прокси — поэтому доверенные прокси
+и адреса из allowlist (по умолчанию loopback и частные сети) не учитываются и не
+банятся: иначе один сканер за nginx забанил бы всех.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import logging
+import random
+import time
+from collections import OrderedDict
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MASK = (1 << 61) - 1
+
+
+def _parse_networks(spec: str, name: str = "TRUSTED_PROXIES") -> tuple:
+    networks = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            logger.warning(f"[blocklist] {name}: пропущен некорректный адрес {item!r}")
+    return tuple(networks)
+
+
+class _CountMinSketch:
+    __slots__ = ("width", "seeds", "rows")
+
+    def __init__(self, width: int, seeds: tuple[int, ...]) -> None:
+        self.width = width
+        self.seeds = seeds
+        self.rows = [[0] * width for _ in seeds]
+
+    def _cells(self, key: str):
+        h = hash(key)
+        for row, seed in zip(self.rows, self.seeds):
+            yield row, ((h ^ seed) * 0x9E3779B97F4A7C15 & _MASK) % self.width
+
+    def add(self, key: str) -> int:
+        estimate = None
+        for row, i in self._cells(key):
+            row[i] += 1
+            estimate = row[i] if estimate is None else min(estimate, row[i])
+        return estimate or 0
+
+    def estimate(self, key: str) -> int:
+        return min(row[i] for row, i in self._cells(key))
+
+    def clear(self) -> None:
+        for row in self.rows:
+            row[:] = [0] * self.width
+
+
+class ScannerBlocklist:
+    def __init__(
+        self,
+        *,
+        threshold: int,
+        window_sec: float,
+        ban_sec: float,
+        max_bans: int = 10000,
+        width: int = 4096,
+        depth: int = 4,
+        trusted_proxies: str = "",
+        allowlist: str = "",
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.threshold = threshold
+        self.window_sec = window_sec
+        self.ban_sec = ban_sec
+        self.max_bans = max_bans
+        self.trusted = _parse_networks(trusted_proxies)
+        self.allowlist = _parse_networks(allowlist, "BLOCKLIST_ALLOWLIST")
+        self._trusted_cache: dict[str, bool] = {}
+        self._exempt_cache: dict[str, bool] = {}
+
+        seeds = tuple(random.getrandbits(60) for _ in range(depth))
+        self._current = _CountMinSketch(width, seeds)
+        self._previous = _CountMinSketch(width, seeds)
+        self._window_start = time.monotonic()
+        self._bans: OrderedDict[str, float] = OrderedDict()
+
+        self.junk_hits = 0
+        self.exempt_hits = 0
+        self.bans_total = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    # ── IP клиента ──
+
+    def _is_trusted(self, ip: str) -> bool:
+        trusted = self._trusted_cache.get(ip)
+        if trusted is None:
+            try:
+                addr = ipaddress.ip_address(ip)
+                trusted = any(addr in net for net in self.trusted)
+            except ValueError:
+                trusted = False
+            if len(self._trusted_cache) >= 1024:
+                self._trusted_cache.clear()
+            self._trusted_cache[ip] = trusted
+        return trusted
+
+    def is_exempt(self, ip: str) -> bool:
+        """Доверенный прокси или адрес из allowlist — такой IP не считается и не банится."""
+        exempt = self._exempt_cache.get(ip)
+        if exempt is None:
+            exempt = self._is_trusted(ip)
+            if not exempt and self.allowlist:
+                try:
+                    addr = ipaddress.ip_address(ip)
+                    exempt = any(addr in net for net in self.allowlist)
+                except ValueError:
+                    exempt = False
+            if len(self._exempt_cache) >= 1024:
+                self._exempt_cache.clear()
+            self._exempt_cache[ip] = exempt
+        return exempt
+
+    def client_ip(self, scope) -> str:
+        client = scope.get("client")
+        peer = client[0] if client else "-"
+        if not self.trusted or not self._is_trusted(peer):
+            return peer
+
+        real_ip = forwarded = None
+        for key, value in scope.get("headers") or ():
+            if key == b"x-real-ip":
+                real_ip = value.decode("latin-1").strip()
+            elif key == b"x-forwarded-for":
+                forwarded = value.decode("latin-1")
+        if real_ip:
+            return real_ip
+        if forwarded:
+            # справа налево до первого не нашего прокси — левее него клиент может написать что угодно
+            hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+            for hop in reversed(hops):
+                if not self._is_trusted(hop):
+                    return hop
+            if hops:
+                return hops[0]
+        return peer
+
+    # ── окно и баны ──
+
+    def _rotate(self, now: float) -> float:
+        """Сдвигает окно при необходимости; возвращает вес предыдущего скетча."""
+        elapsed = now - self._window_start
+        if elapsed >= self.window_sec:
+            if elapsed >= 2 * self.window_sec:
+                self._previous.clear()
+                self._window_start = now
+            else:
+                self._window_start += self.window_sec
+            self._previous, self._current = self._current, self._previous
+            self._current.clear()
+            elapsed = now - self._window_start
+        return 1.0 - elapsed / self.window_sec
+
+    def is_banned(self, ip: str, now: float | None = None) -> bool:
+        if not self.enabled or not self._bans or self.is_exempt(ip):
+            return False
+        until = self._bans.get(ip)
+        if until is None:
+            return False
+        if (now if now is not None else time.monotonic()) >= until:
+            del self._bans[ip]
+            return False
+        self.rejected += 1
+        return True
+
+    def record_junk(self, ip: str, now: float | None = None) -> bool:
+        """Учитывает мусорный запрос; True — IP только что забанен."""
+        if not self.enabled:
+            return False
+        if self.is_exempt(ip):
+            self.exempt_hits += 1
+            return False
+        now = now if now is not None else time.monotonic()
+        self.junk_hits += 1
+        weight = self._rotate(now)
+        count = self._current.add(ip) + weight * self._previous.estimate(ip)
+        if count < self.threshold:
+            return False
+
+        self._bans[ip] = now + self.ban_sec
+        self._bans.move_to_end(ip)
+        if len(self._bans) > self.max_bans:
+            self._bans.popitem(last=False)
+            self.evicted += 1
+        self.bans_total += 1
+        logger.info(f"[blocklist] бан ip={ip} на {self.ban_sec:.0f} с (~{count:.0f} мусорных запросов за окно)")
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "banned_now": len(self._bans),
+            "bans_total": self.bans_total,
+            "rejected": self.rejected,
+            "junk_hits": self.junk_hits,
+            "exempt_hits": self.exempt_hits,
+            "evicted": self.evicted,
+        }
+
+
+scanner_blocklist = ScannerBlocklist(
+    threshold=settings.BLOCKLIST_THRESHOLD,
+    window_sec=settings.BLOCKLIST_WINDOW_SEC,
+    ban_sec=settings.BLOCKLIST_BAN_SEC,
+    max_bans=settings.BLOCKLIST_MAX_BANS,
+    trusted_proxies=settings.TRUSTED_PROXIES,
+    allowlist=settings.BLOCKLIST_ALLOWLIST,
+    enabled=settings.BLOCKLIST_ENABLED,
+)
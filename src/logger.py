@@ -1,9 +1,13 @@
-# Commit: Добавлены фильтры IgnoreNotHandledUpdatesFilter и IgnoreStaticPathsFilter, а также глобальный RecordFactory для user_id
+# Commit: TelegramHandler — счётчик отброшенных записей под блокировкой (emit зовут из разных потоков)
 
+import collections
 import logging
+import queue
 import sys
 import html
 import http.client
+import threading
+import time
 import httpx
 import aiohttp.http_exceptions
 from aiohttp.http_exceptions import HttpProcessingError, BadHttpMessage, BadStatusLine as AioBadStatusLine
@@ -65,11 +69,48 @@ class IgnoreStaticPathsFilter(logging.Filter):
 
 
 class TelegramHandler(logging.Handler):
-    """Отправляет ERROR+ логи в Telegram через Bot API."""
-    def __init__(self):
+    """
+    Отправляет ERROR+ логи в Telegram через Bot API, не блокируя вызывающий код.
+
+    - emit: только фильтр и put_nowait в ограниченную очередь (O(1), без сети);
+      при переполнении запись отбрасывается и учитывается в счётчике dropped;
+    - фоновый поток раз в flush_interval собирает накопленное в пачку, схлопывает
+      одинаковые записи (сообщение + traceback) в одну с счётчиком «×N»,
+      упаковывает в сообщения ≤ 4096 символов и шлёт с лимитом rate_per_min
+      (учитывая retry_after из 429);
+    - close (logging.shutdown) дожидается отправки остатка, но не дольше 5 с.
+    """
+
+    _MAX_LEN = 4096 - len("<pre></pre>")
+    _STOP = object()
+
+    def __init__(
+        self,
+        token: str | None = None,
+        chat_id: int | None = None,
+        *,
+        api_base: str | None = None,
+        queue_size: int | None = None,
+        flush_interval: float | None = None,
+        rate_per_min: int | None = None,
+    ):
         super().__init__(level=logging.ERROR)
-        self.token = settings.TELEGRAM_BOT_TOKEN
-        self.chat_id = settings.LOG_CHANNEL_ID
+        self.token = token if token is not None else settings.TELEGRAM_BOT_TOKEN
+        self.chat_id = chat_id if chat_id is not None else settings.LOG_CHANNEL_ID
+        self.api_base = (api_base or settings.TELEGRAM_API_BASE).rstrip("/")
+        self.flush_interval = flush_interval if flush_interval is not None else settings.LOG_TG_FLUSH_SEC
+        self.rate_per_min = rate_per_min if rate_per_min is not None else settings.LOG_TG_RATE_PER_MIN
+
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size if queue_size is not None else settings.LOG_TG_QUEUE_SIZE)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self.sent_messages = 0
+        self._send_times: collections.deque[float] = collections.deque()
+        self._not_before = 0.0
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+
+    # ── горячий путь ──
 
     def emit(self, record: logging.LogRecord) -> None:
         if not self.token or not self.chat_id:
@@ -84,22 +125,130 @@ class TelegramHandler(logging.Handler):
             )):
                 return
 
-        text = self.format(record)
-        escaped = html.escape(text)
-        max_len = 4096 - len("<pre></pre>")
-        for start in range(0, len(escaped), max_len):
-            segment = escaped[start:start+max_len]
-            payload = f"<pre>{segment}</pre>"
+        # фиксируем текст сейчас: аргументы могут поменяться до форматирования в потоке
+        record.msg = record.getMessage()
+        record.args = None
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # += не атомарен: emit вызывается из любых потоков, фоновый поток обнуляет счётчик
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="telegram-log-handler", daemon=True)
+                self._thread.start()
+
+    # ── фоновый поток ──
+
+    def _run(self) -> None:
+        with httpx.Client(base_url=f"{self.api_base}/bot{self.token}/", timeout=5.0) as client:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._collect()
+                with self._dropped_lock:
+                    reported_dropped, self.dropped = self.dropped, 0
+                for text in self._pack(batch, reported_dropped):
+                    self._send(client, text)
+
+    def _collect(self) -> tuple[list[logging.LogRecord], bool]:
+        """Ждём первую запись, затем добираем всё, что придёт за flush_interval."""
+        item = self.queue.get()
+        if item is self._STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                return batch, False
             try:
-                resp = httpx.post(
-                    f"https://api.telegram.org/bot{self.token}/sendMessage",
-                    json={"chat_id": self.chat_id, "text": payload, "parse_mode": "HTML"},
-                    timeout=5.0
-                )
-                if resp.status_code != 200:
-                    print(f"[Logger] Telegram API error {resp.status_code}: {resp.text}", file=sys.stderr)
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                return batch, False
+            if item is self._STOP:
+                return batch, True
+            batch.append(item)
+
+    def _pack(self, batch: list[logging.LogRecord], dropped: int) -> list[str]:
+        groups: dict[tuple, list] = {}
+        for record in batch:
+            try:
+                text = self.format(record)
+            except Exception:
+                continue
+            key = (record.levelno, record.name, record.msg, record.exc_text)
+            if key in groups:
+                groups[key][1] += 1
+            else:
+                groups[key] = [text, 1]
+
+        entries = [text if count == 1 else f"{text}\n[×{count}]" for text, count in groups.values()]
+        if dropped:
+            entries.append(f"[Logger] очередь переполнена, пропущено записей: {dropped}")
+
+        messages: list[str] = []
+        current = ""
+        for entry in entries:
+            escaped = html.escape(entry)
+            for start in range(0, len(escaped), self._MAX_LEN):
+                segment = escaped[start:start + self._MAX_LEN]
+                sep = "\n\n" if current else ""
+                if len(current) + len(sep) + len(segment) <= self._MAX_LEN:
+                    current += sep + segment
+                else:
+                    messages.append(current)
+                    current = segment
+        if current:
+            messages.append(current)
+        return [f"<pre>{m}</pre>" for m in messages]
+
+    def _wait_for_slot(self) -> None:
+        now = time.monotonic()
+        while self._send_times and now - self._send_times[0] >= 60:
+            self._send_times.popleft()
+        wait = self._not_before - now
+        if len(self._send_times) >= self.rate_per_min:
+            wait = max(wait, 60 - (now - self._send_times[0]))
+        if wait > 0:
+            time.sleep(wait)
+
+    def _send(self, client: httpx.Client, text: str) -> None:
+        for _ in range(3):
+            self._wait_for_slot()
+            self._send_times.append(time.monotonic())
+            try:
+                resp = client.post("sendMessage", json={"chat_id": self.chat_id, "text": text, "parse_mode": "HTML"})
             except Exception as e:
                 print(f"[Logger] Не удалось отправить лог в Telegram: {e}", file=sys.stderr)
+                return
+            if resp.status_code == 429:
+                try:
+                    retry_after = float(resp.json().get("parameters", {}).get("retry_after", 1))
+                except Exception:
+                    retry_after = 1.0
+                self._not_before = time.monotonic() + retry_after
+                continue
+            if resp.status_code != 200:
+                print(f"[Logger] Telegram API error {resp.status_code}: {resp.text}", file=sys.stderr)
+            else:
+                self.sent_messages += 1
+            return
+
+    def close(self) -> None:
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self.queue.put(self._STOP, timeout=1.0)
+            except queue.Full:
+                pass
+            thread.join(timeout=5.0)
+        super().close()
 
 
 def configure_logging() -> None:
@@ -108,6 +257,7 @@ def configure_logging() -> None:
     # чистим старые хендлеры при повторном вызове
     for h in list(root.handlers):
         root.removeHandler(h)
+        h.close()
     root.setLevel(logging.INFO)
 
     fmt = '%(asctime)s - %(levelname)s - [%(funcName)s/%(module)s] - [%(user_id)s] - %(message)s'
@@ -0,0 +1,239 @@
+# src/metrics.py
+# commit: метрики в формате Prometheus — гистограммы латентности по роутам, пул БД, кеши, лаг event loop
+
+"""
+Метрики процесса в текстовом формате Prometheus (GET /metrics).
+
+Запись на горячем пути — GatewayMiddleware после каждого запроса вызывает
+http_metrics.observe(method, route, status, seconds): два dict.get, bisect по
+границам бакетов и три инкремента в заранее созданных списках. Без блокировок —
+всё происходит в потоке event loop, а рендер читает те же счётчики там же.
+
+Всё остальное (пул БД, кеши, admission, блоклист, ретраи) собирается только при
+скрейпе через зарегистрированные коллекторы — register_collector(fn), fn
+возвращает готовые строки экспозиции.
+"""
+
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+_STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict | None) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return repr(value) if value == value and value not in (float("inf"), float("-inf")) else "NaN"
+    return str(value)
+
+
+def metric(name: str, kind: str, help_text: str, samples: Iterable[tuple[dict | None, float]]) -> list[str]:
+    """Строки экспозиции одной метрики: HELP, TYPE и сэмплы (labels, value)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_labels(labels)} {_number(value)}" for labels, value in samples)
+    return lines
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # последний — +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: dict) -> list[str]:
+        lines, total = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {total}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(self.sum)}")
+        lines.append(f"{name}_count{_labels(labels)} {total}")
+        return lines
+
+
+class _RouteStats:
+    __slots__ = ("statuses", "latency")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.statuses = [0] * len(_STATUS_CLASSES)
+        self.latency = Histogram(bounds)
+
+
+class HttpMetrics:
+    def __init__(self, bounds: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.bounds = bounds
+        self._routes: dict[str, dict[str, _RouteStats]] = {}
+        self.rejected = {"junk": 0, "banned": 0, "overloaded": 0}
+
+    def observe(self, method: str, route: str, status: int, seconds: float) -> None:
+        by_method = self._routes.get(route)
+        if by_method is None:
+            by_method = self._routes[route] = {}
+        stats = by_method.get(method)
+        if stats is None:
+            stats = by_method[method] = _RouteStats(self.bounds)
+        stats.statuses[min(max(status // 100, 1), 5) - 1] += 1
+        stats.latency.observe(seconds)
+
+    def reject(self, reason: str) -> None:
+        self.rejected[reason] += 1
+
+    def render(self) -> list[str]:
+        requests, latency = [], []
+        for route, by_method in sorted(self._routes.items()):
+            for method, stats in sorted(by_method.items()):
+                labels = {"method": method, "route": route}
+                for status_class, count in zip(_STATUS_CLASSES, stats.statuses):
+                    if count:
+                        requests.append(({**labels, "status": status_class}, count))
+                latency.extend(stats.latency.samples("http_request_duration_seconds", labels))
+
+        lines = metric("http_requests_total", "counter", "Запросы по роуту (шаблону) и классу статуса", requests)
+        lines += [
+            "# HELP http_request_duration_seconds Время обработки запроса по роуту",
+            "# TYPE http_request_duration_seconds histogram",
+            *latency,
+        ]
+        lines += metric(
+            "http_rejected_total", "counter", "Запросы, отклонённые GatewayMiddleware до обработчика",
+            (({"reason": reason}, count) for reason, count in self.rejected.items()),
+        )
+        return lines
+
+
+class LoopLag:
+    """
+    Лаг event loop: функция PeriodicTask с интервалом interval вызывается раз в
+    interval + лаг, разница и есть задержка планирования (блокирующий код в цикле).
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.histogram = Histogram(LAG_BUCKETS)
+        self.last = 0.0
+        self.max = 0.0
+        self._previous: float | None = None
+
+    async def measure(self) -> None:
+        now = time.monotonic()
+        if self._previous is not None:
+            lag = max(0.0, now - self._previous - self.interval)
+            self.last = lag
+            self.max = max(self.max, lag)
+            self.histogram.observe(lag)
+        self._previous = now
+
+    def render(self) -> list[str]:
+        lines = metric("event_loop_lag_seconds_last", "gauge", "Последний замер лага event loop", [(None, self.last)])
+        lines += metric("event_loop_lag_seconds_max", "gauge", "Максимальный лаг event loop с запуска", [(None, self.max)])
+        lines += [
+            "# HELP event_loop_lag_seconds Лаг event loop",
+            "# TYPE event_loop_lag_seconds histogram",
+            *self.histogram.samples("event_loop_lag_seconds", {}),
+        ]
+        return lines
+
+
+http_metrics = HttpMetrics()
+_collectors: list[Callable[[], list[str]]] = [http_metrics.render]
+
+
+def register_collector(collector: Callable[[], list[str]]) -> None:
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def render() -> str:
+    lines: list[str] = []
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+def cache_collector(caches: dict[str, object]) -> Callable[[], list[str]]:
+    """Коллектор hits/misses/ratio для кешей с атрибутами hits и misses (метка cache=<имя>)."""
+
+    def collect() -> list[str]:
+        hits, misses, ratios = [], [], []
+        for name, cache in caches.items():
+            labels = {"cache": name}
+            total = cache.hits + cache.misses
+            hits.append((labels, cache.hits))
+            misses.append((labels, cache.misses))
+            ratios.append((labels, cache.hits / total if total else 0.0))
+        return (
+            metric("cache_hits_total", "counter", "Попадания в кеш", hits)
+            + metric("cache_misses_total", "counter", "Промахи кеша", misses)
+            + metric("cache_hit_ratio", "gauge", "Доля попаданий в кеш", ratios)
+        )
+
+    return collect
+
+
+def stats_collector(prefix: str, stats: Callable[[], dict]) -> Callable[[], list[str]]:
+    """Коллектор для .stats() компонентов: числовые поля — gauge <prefix>_<поле>."""
+
+    def collect() -> list[str]:
+        lines: list[str] = []
+        for key, value in stats().items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines += metric(f"{prefix}_{key}", "gauge", f"{prefix}: {key}", [(None, value)])
+            elif isinstance(value, str):
+                lines += metric(f"{prefix}_{key}", "gauge", f"{prefix}: {key}", [({key: value}, 1)])
+        return lines
+
+    return collect
+
+
+def pool_collector(engine) -> Callable[[], list[str]]:
+    """Gauges пула SQLAlchemy; время ожидания checkout — если пул TimedAsyncQueuePool."""
+
+    def collect() -> list[str]:
+        pool = getattr(engine, "sync_engine", engine).pool
+        lines: list[str] = []
+        for name, attr, help_text in (
+            ("db_pool_size", "size", "Размер пула"),
+            ("db_pool_checked_out", "checkedout", "Выданные соединения"),
+            ("db_pool_checked_in", "checkedin", "Свободные соединения в пуле"),
+            ("db_pool_overflow", "overflow", "Текущий overflow пула"),
+        ):
+            fn = getattr(pool, attr, None)
+            if fn is not None:
+                lines += metric(name, "gauge", help_text, [(None, fn())])
+        if hasattr(pool, "wait_seconds_total"):
+            lines += metric(
+                "db_pool_checkout_seconds_total", "counter", "Суммарное время получения соединения из пула",
+                [(None, pool.wait_seconds_total)],
+            )
+            lines += metric("db_pool_checkouts_total", "counter", "Получения соединения из пула", [(None, pool.checkouts_total)])
+            lines += metric(
+                "db_pool_checkout_seconds_max", "gauge", "Максимальное время получения соединения",
+                [(None, pool.wait_seconds_max)],
+            )
+        return lines
+
+    return collect
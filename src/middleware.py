@@ -1,10 +1,23 @@
+# src/middleware.py
+# commit: заголовок Server-Timing с суммарным временем SQL запроса
+
 import logging
 import re
-from fastapi import Request
-from fastapi.responses import PlainTextResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
-from starlette.routing import Match
+import time
+from builtins import BaseExceptionGroup
+
+from sqlalchemy.exc import IntegrityError
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.admission import Overloaded, admission
+from src.config import settings
+from src.db_retry import DatabaseUnavailable, request_deadline
+from src.exceptions import handle_database_unavailable, handle_global_exception, handle_integrity_error
+from src.ip_blocklist import scanner_blocklist
+from src.metrics import http_metrics
+from src.route_index import route_index
+from src.sql_timing import request_queries, server_timing
 
 log = logging.getLogger("http.requests")
 
@@ -36,27 +49,10 @@ _BLOCK_PATH_RE = re.compile(
 _BLOCK_UA_RE = re.compile(r"(?i)(zgrab|masscan|nmap|sqlmap|acunetix)")
 
 
-def _is_known_route(request: Request) -> bool:
-    """
-    Возвращает True, если запрос (path+method) совпал с одним из зарегистрированных роутов приложения.
-    """
-    scope = request.scope
-    app = request.app
-    for route in getattr(app.router, "routes", []):
-        match, _ = route.matches(scope)
-        if match == Match.FULL:
-            return True
-    return False
-
-
-def _should_drop_silently(request: Request) -> bool:
+def _should_drop_silently(method: str, path: str, ua: str) -> bool:
     """
     True => считаем запрос мусором и режем без логирования.
     """
-    method = request.method.upper()
-    path = request.url.path or "/"
-    ua = (request.headers.get("user-agent") or "").strip()
-
     # 1) странные методы (WebDAV/пробники/прокси)
     if method in _BLOCK_METHODS:
         return True
@@ -76,60 +72,149 @@ def _should_drop_silently(request: Request) -> bool:
     return False
 
 
-class SuppressRootAccessLogMiddleware(BaseHTTPMiddleware):
-    """
-    1) GET / -> мгновенно "OK" (без лишней нагрузки)
-    2) Мусор/скан -> 404 без логов
-    3) Неизвестные роуты -> 404 без логов
-    """
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path or "/"
-
-        # Корневой "healthcheck" — часто дергают роботы/балансер/ты сам.
-        if request.method.upper() == "GET" and path == "/":
-            return PlainTextResponse("OK", status_code=200)
-
-        # Сканеры режем сразу и тихо.
-        if _should_drop_silently(request):
-            return PlainTextResponse("Not Found", status_code=404)
+def _header(headers: list[tuple[bytes, bytes]], name: bytes, default: str = "-") -> str:
+    for key, value in headers:
+        if key == name:
+            return value.decode("latin-1")
+    return default
 
-        # Любой неизвестный роут — тоже тихо режем (это главный "пылесос" логов).
-        if not _is_known_route(request):
-            return PlainTextResponse("Not Found", status_code=404)
 
-        return await call_next(request)
+async def _send_plain(
+    send: Send, status: int, body: bytes, *, close: bool = False, extra_headers: list | None = None
+) -> None:
+    headers = [
+        (b"content-type", b"text/plain; charset=utf-8"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    if extra_headers:
+        headers.extend(extra_headers)
+    if close:
+        # uvicorn закрывает keep-alive соединение после такого ответа
+        headers.append((b"connection", b"close"))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
 
 
-class RequestLogMiddleware(BaseHTTPMiddleware):
+class GatewayMiddleware:
     """
-    Логирует только ПРОБЛЕМЫ по вашим реальным эндпоинтам:
-    - 4xx/5xx (401/422/500 и т.п.)
-    Успешные 2xx не логируются, чтобы не дублировать логи хендлеров.
+    Один чистый ASGI-слой вместо трёх BaseHTTPMiddleware (без лишних тасков
+    и обёрток потока — StreamingResponse/SSE идут напрямую):
+
+    0) IP в бане блоклиста -> 403 с Connection: close, без разбора запроса
+    1) GET / -> мгновенно "OK" (без лишней нагрузки)
+    2) Мусор/скан и неизвестные роуты -> 404 без логов; попадание учитывается
+       в блоклисте, и частый источник мусора уходит в бан
+    3) Admission control (src.admission): при перегрузке — 503 + Retry-After
+       вместо ожидания соединения пула до POOL_TIMEOUT
+    4) Дедлайн запроса REQUEST_DEADLINE_SEC для retry_db (src.db_retry);
+       необработанные исключения -> JSON через handle_integrity_error/
+       handle_database_unavailable/handle_global_exception
+       (в т.ч. первое исключение из ExceptionGroup)
+    5) Логируются только 4xx/5xx по реальным эндпоинтам; 2xx не логируются,
+       чтобы не дублировать логи хендлеров.
+    6) Каждый запрос к известному роуту и каждый отказ учитываются в src.metrics.
+    7) Server-Timing: db;dur=<мс SQL за запрос> (src.sql_timing).
     """
-    async def dispatch(self, request: Request, call_next):
-        ua = request.headers.get("user-agent", "-")
-        ct = request.headers.get("content-type", "-")
-        host = request.headers.get("host", "-")
-        xff = request.headers.get("x-forwarded-for", "-")
-        real_ip = request.headers.get("x-real-ip", "-")
 
-        client_ip = request.client.host if request.client else "-"
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.routes = route_index
+        self.blocklist = scanner_blocklist
+        self.admission = admission
+        self.metrics = http_metrics
+        self.server_timing = settings.SQL_TIMING_ENABLED
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client_ip = self.blocklist.client_ip(scope)
+        if self.blocklist.is_banned(client_ip):
+            self.metrics.reject("banned")
+            await _send_plain(send, 403, b"", close=True)
+            return
+
+        method = scope["method"].upper()
+        path = scope.get("path") or "/"
+        headers = scope.get("headers") or []
 
-        resp: Response = await call_next(request)
+        # Корневой "healthcheck" — часто дергают роботы/балансер/ты сам.
+        if method == "GET" and path == "/":
+            await _send_plain(send, 200, b"OK")
+            return
+
+        # Сканеры и любой неизвестный роут режем сразу и тихо (главный "пылесос" логов).
+        ua = _header(headers, b"user-agent", "").strip()
+        route = None if _should_drop_silently(method, path, ua) else self.routes.lookup(scope["app"], scope)
+        if route is None:
+            banned = self.blocklist.record_junk(client_ip)
+            self.metrics.reject("junk")
+            await _send_plain(send, 404, b"Not Found", close=banned)
+            return
+
+        arrived_at = time.perf_counter()
+        try:
+            admitted = await self.admission.acquire(route, method)
+        except Overloaded as exc:
+            self.metrics.reject("overloaded")
+            self.metrics.observe(method, route, 503, time.perf_counter() - arrived_at)
+            await _send_plain(
+                send, 503, b"Service Unavailable",
+                extra_headers=[(b"retry-after", str(exc.retry_after).encode())],
+            )
+            return
+        started_at = time.monotonic()
+
+        status = 500
+        started = False
+        sql_totals = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                started = True
+                if self.server_timing and sql_totals is not None:
+                    message = {
+                        **message,
+                        "headers": [*message.get("headers", ()), (b"server-timing", server_timing(sql_totals))],
+                    }
+            await send(message)
+
+        try:
+            with request_deadline(settings.REQUEST_DEADLINE_SEC), request_queries() as sql_totals:
+                await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            if started:
+                raise
+            if isinstance(exc, BaseExceptionGroup):
+                exc = exc.exceptions[0]
+            request = Request(scope, receive)
+            if isinstance(exc, IntegrityError):
+                response = await handle_integrity_error(request, exc)
+            elif isinstance(exc, DatabaseUnavailable):
+                response = await handle_database_unavailable(request, exc)
+            else:
+                response = await handle_global_exception(request, exc)
+            await response(scope, receive, send_wrapper)
+        finally:
+            if admitted:
+                self.admission.release(route, started_at)
+            self.metrics.observe(method, route, status, time.perf_counter() - arrived_at)
 
         # Логируем только ошибки
-        if resp.status_code >= 400:
+        if status >= 400:
+            client = scope.get("client")
             log.info(
                 "%s %s -> %s | ip=%s | xff=%r | rip=%r | host=%r | ua=%r | ct=%r",
-                request.method,
-                request.url.path,
-                resp.status_code,
-                client_ip,
-                xff,
-                real_ip,
-                host,
-                ua,
-                ct,
+                method,
+                path,
+                status,
+                client[0] if client else "-",
+                _header(headers, b"x-forwarded-for"),
+                _header(headers, b"x-real-ip"),
+                _header(headers, b"host"),
+                _header(headers, b"user-agent"),
+                _header(headers, b"content-type"),
             )
-
-        return resp
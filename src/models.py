@@ -1,22 +1,32 @@
 # src/models.py
-# commit: удалены следы broadcasts/subscriptions; оставлены только актуальные модели из нового models.py
+# commit: broadcasts.claimed_count — число доставок в аренде, ведётся claim/report/reaper
 
 from sqlalchemy import (
+    JSON,
     BigInteger,
     Boolean,
     Column,
+    Date,
     DateTime,
+    Enum,
     ForeignKey,
+    Index,
     Integer,
     SmallInteger,
     String,
+    Text,
+    Time,
     UniqueConstraint,
 )
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import relationship
 
 from src.database import Base
 from src.time_msk import now_msk_naive
 
+# автоинкремент в SQLite есть только у INTEGER PRIMARY KEY (тот же 64-битный rowid)
+BigIntPK = BigInteger().with_variant(Integer, "sqlite")
+
 
 class Chat(Base):
     __tablename__ = "chats"
@@ -68,7 +78,7 @@ class UserMembership(Base):
 class InviteLink(Base):
     __tablename__ = "invite_links_chats"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger)
     chat_id = Column(BigInteger)
     invite_link = Column(String(512), nullable=False)
@@ -83,7 +93,7 @@ class InviteLink(Base):
 class Link(Base):
     __tablename__ = "links"
 
-    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
     link_key = Column(String(512), nullable=False, unique=True)
     resource = Column(String(255), nullable=True)
     visits = Column(Integer, nullable=False, server_default="0")
@@ -103,3 +113,263 @@ class UserAlgorithmProgress(Base):
         default=now_msk_naive,
         onupdate=now_msk_naive,
     )
+
+
+class AlgorithmFunnelCounter(Base):
+    """
+    Счётчики воронки user_algorithm_progress: total, basic, advanced, step:<n>.
+    Двигаются дельтами в той же транзакции, что и запись прогресса (cnt = cnt + :d);
+    строка reconcile — маркер сверки (reconciled_at), её блокирует только сверка.
+    """
+
+    __tablename__ = "algorithm_funnel_counters"
+
+    name = Column(String(32), primary_key=True)
+    cnt = Column(BigInteger, nullable=False, default=0, server_default="0")
+    reconciled_at = Column(DateTime, nullable=True)
+
+
+# ─────────────────────────────
+# Broadcasts
+# ─────────────────────────────
+
+BROADCAST_KINDS = ("news", "meetings", "important")
+BROADCAST_STATUSES = ("draft", "scheduled", "sending", "sent", "failed")
+BROADCAST_TARGET_TYPES = ("ids", "sql", "kind")
+DELIVERY_STATUSES = ("pending", "claimed", "sent", "failed", "skipped")
+
+
+class UserSubscription(Base):
+    __tablename__ = "user_subscriptions"
+
+    user_id = Column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    news_enabled = Column(Boolean, nullable=False, default=False, server_default="0")
+    meetings_enabled = Column(Boolean, nullable=False, default=True, server_default="1")
+    important_enabled = Column(Boolean, nullable=False, default=True, server_default="1")
+    created_at = Column(DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"), nullable=False, default=now_msk_naive)
+    updated_at = Column(
+        DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"),
+        nullable=False,
+        default=now_msk_naive,
+        onupdate=now_msk_naive,
+    )
+
+    __table_args__ = (
+        Index("ix_usubs_news", "news_enabled", "user_id"),
+        Index("ix_usubs_meetings", "meetings_enabled", "user_id"),
+        Index("ix_usubs_important", "important_enabled", "user_id"),
+    )
+
+
+class Broadcast(Base):
+    __tablename__ = "broadcasts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(Enum(*BROADCAST_KINDS, name="broadcast_kind"), nullable=False)
+    title = Column(String(255), nullable=False)
+    # JSON-строка {"text": str, "files": [...]} (исторически колонка TEXT)
+    content = Column(Text, nullable=False)
+    status = Column(
+        Enum(*BROADCAST_STATUSES, name="broadcast_status"),
+        nullable=False,
+        default="draft",
+        server_default="draft",
+    )
+    schedule = Column(String(255), nullable=True)
+    enabled = Column(Boolean, nullable=False, default=True, server_default="1")
+    # растёт при каждом изменении контента — ключ кеша плана отправки
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # завершение (sent/failed) и перенос доставок в broadcast_deliveries_archive
+    finished_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, nullable=True)
+    created_by = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=now_msk_naive)
+    updated_at = Column(DateTime, nullable=False, default=now_msk_naive, onupdate=now_msk_naive)
+
+    # агрегаты по broadcast_deliveries (ведутся путями materialize/report/reaper)
+    total_count = Column(Integer, nullable=False, default=0, server_default="0")
+    sent_count = Column(Integer, nullable=False, default=0, server_default="0")
+    failed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    skipped_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # в аренде у воркеров сейчас (claim +n, report/reaper −n)
+    claimed_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    targets = relationship(
+        "BroadcastTarget",
+        backref="broadcast",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+    __table_args__ = (
+        Index("ix_broadcasts_status", "status"),
+        Index("ix_broadcasts_status_finished", "status", "finished_at"),
+    )
+
+
+class BroadcastTarget(Base):
+    __tablename__ = "broadcast_targets"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    broadcast_id = Column(Integer, ForeignKey("broadcasts.id", ondelete="CASCADE"), nullable=False)
+    type = Column(Enum(*BROADCAST_TARGET_TYPES, name="broadcast_target_type"), nullable=False)
+    user_ids_json = Column(JSON, nullable=True)
+    sql_text = Column(Text, nullable=True)
+    kind = Column(Enum(*BROADCAST_KINDS, name="broadcast_kind_target"), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=now_msk_naive)
+
+    __table_args__ = (
+        Index("ix_btarget_broadcast_id", "broadcast_id"),
+    )
+
+
+class BroadcastDelivery(Base):
+    __tablename__ = "broadcast_deliveries"
+
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
+    broadcast_id = Column(Integer, ForeignKey("broadcasts.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(BigInteger, nullable=False)
+    status = Column(
+        Enum(*DELIVERY_STATUSES, name="delivery_status"),
+        nullable=False,
+        default="pending",
+        server_default="pending",
+    )
+    attempts = Column(SmallInteger, nullable=False, default=0, server_default="0")
+    error_code = Column(String(64), nullable=True)
+    error_message = Column(String(255), nullable=True)
+    message_id = Column(BigInteger, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=now_msk_naive)
+    # аренда воркера-отправщика (status=claimed)
+    lease_until = Column(DateTime, nullable=True)
+    claimed_by = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("broadcast_id", "user_id", name="uq_bdeliveries_broadcast_user"),
+        Index("ix_bdeliveries_broadcast_id", "broadcast_id"),
+        Index("ix_bdeliveries_broadcast_status", "broadcast_id", "status"),
+        Index("ix_bdeliveries_status_lease", "status", "lease_until"),
+    )
+
+
+class BroadcastDeliveryArchive(Base):
+    """Доставки завершённых рассылок (переносятся из broadcast_deliveries батчами)."""
+
+    __tablename__ = "broadcast_deliveries_archive"
+
+    broadcast_id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    status = Column(Enum(*DELIVERY_STATUSES, name="delivery_archive_status"), nullable=False)
+    attempts = Column(SmallInteger, nullable=False, default=0, server_default="0")
+    error_code = Column(String(64), nullable=True)
+    message_id = Column(BigInteger, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = {"mysql_row_format": "COMPRESSED"}
+
+
+# ─────────────────────────────
+# Ads
+# ─────────────────────────────
+
+AD_SCHEDULE_TYPES = ("cron", "n_days", "random")
+
+
+class Ad(Base):
+    __tablename__ = "ads"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    title = Column(String(255), nullable=False)
+
+    chat_id = Column(BigInteger, nullable=False)
+    thread_id = Column(Integer, nullable=True)
+
+    # {"text": str, "files": "csv", "button": {"enabled", "label", "url"}, "link_preview": bool}
+    content_json = Column(JSON, nullable=False)
+
+    schedule_type = Column(Enum(*AD_SCHEDULE_TYPES, name="ad_schedule_type"), nullable=False)
+    schedule_cron = Column(String(255), nullable=True)
+
+    n_days_start_date = Column(Date, nullable=True)
+    n_days_time = Column(Time, nullable=True)
+    n_days_interval = Column(SmallInteger, nullable=True)
+
+    enabled = Column(Boolean, nullable=False, default=True, server_default="1")
+    delete_previous = Column(Boolean, nullable=False, default=True, server_default="1")
+    dedupe_minute = Column(Boolean, nullable=False, default=True, server_default="1")
+
+    auto_delete_ttl_hours = Column(SmallInteger, nullable=True)
+    auto_delete_cron = Column(String(255), nullable=True)
+
+    last_message_id = Column(BigInteger, nullable=True)
+    # следующее срабатывание (ведёт src.ad_schedule); NULL — не запланировано
+    next_run_at = Column(DateTime, nullable=True)
+
+    created_by = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=now_msk_naive)
+    updated_at = Column(DateTime, nullable=False, default=now_msk_naive, onupdate=now_msk_naive)
+
+    __table_args__ = (
+        Index("ix_ads_target", "chat_id", "thread_id", "enabled"),
+        Index("ix_ads_schedule_type", "schedule_type", "enabled"),
+        Index("ix_ads_due", "enabled", "next_run_at"),
+    )
+
+
+class AdRandomBranch(Base):
+    __tablename__ = "ad_random_branches"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    chat_id = Column(BigInteger, nullable=False)
+    thread_id = Column(Integer, nullable=True)
+    window_from = Column(Time, nullable=False)
+    window_to = Column(Time, nullable=False)
+    rebuild_time = Column(Time, nullable=False)
+    enabled = Column(Boolean, nullable=False, default=True, server_default="1")
+    # день, на который слоты уже построены
+    last_rebuilt_on = Column(Date, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("chat_id", "thread_id", name="uq_ad_random_branch_chat_thread"),
+        Index("ix_random_branch_enabled", "enabled"),
+    )
+
+
+class AdRandomSlot(Base):
+    __tablename__ = "ad_random_slots"
+
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
+    branch_id = Column(Integer, ForeignKey("ad_random_branches.id", ondelete="CASCADE"), nullable=False)
+    ad_id = Column(Integer, ForeignKey("ads.id", ondelete="CASCADE"), nullable=False)
+    slot_date = Column(Date, nullable=False)
+    run_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("ad_id", "slot_date", name="uq_ad_slots_ad_date"),
+        Index("ix_ad_slots_run_at", "run_at"),
+        Index("ix_ad_slots_branch_date", "branch_id", "slot_date"),
+    )
+
+
+class AdRun(Base):
+    __tablename__ = "ad_runs"
+
+    id = Column(BigIntPK, primary_key=True, autoincrement=True)
+    ad_id = Column(Integer, ForeignKey("ads.id", ondelete="CASCADE"), nullable=False)
+    chat_id = Column(BigInteger, nullable=False)
+    thread_id = Column(Integer, nullable=True)
+    message_id = Column(BigInteger, nullable=False)
+    # слот расписания, за который опубликовано (для сдвига next_run_at)
+    slot_at = Column(DateTime, nullable=True)
+    posted_at = Column(DateTime, nullable=False, default=now_msk_naive)
+    # когда удалить: auto_delete_ttl_hours / auto_delete_cron или следующая публикация (delete_previous)
+    delete_at = Column(DateTime, nullable=True)
+    deleted_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_ad_runs_ad_id", "ad_id", "posted_at"),
+        Index("ix_ad_runs_delete_due", "deleted_at", "delete_at"),
+        # повторный отчёт постера о той же публикации не создаёт вторую строку
+        UniqueConstraint("ad_id", "message_id", name="uq_ad_runs_ad_message"),
+    )
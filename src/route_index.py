@@ -0,0 +1,167 @@
+# src/route_index.py
+# commit: общий экземпляр route_index (его hits/misses отдаются в /metrics)
+
+"""
+Индекс роутов приложения для быстрого ответа «есть ли такой (method, path)».
+
+Вместо прохода по app.router.routes с route.matches(scope) на каждый запрос:
+- статические пути — dict path → роуты;
+- параметризованные — trie по сегментам пути: литеральные сегменты — dict,
+  сегменты с параметрами — предкомпилированный regex сегмента (по конвертору Starlette);
+- всё, что так не раскладывается (Mount, конвертор path и т.п.), — в короткий
+  fallback-список с обычным route.matches;
+- последние решения (method, path) → шаблон роута кешируются в ограниченном LRU.
+
+Из нескольких подходящих роутов выбирается зарегистрированный раньше — как в Starlette.
+Индекс перестраивается сам, если у приложения поменялся список роутов (include_router
+после старта).
+"""
+
+from __future__ import annotations
+
+import re
+from collections import OrderedDict
+
+from starlette.convertors import CONVERTOR_TYPES
+from starlette.routing import Match, Route
+
+_PARAM_RE = re.compile(r"{([a-zA-Z_][a-zA-Z0-9_]*)(:[a-zA-Z_][a-zA-Z0-9_]*)?}")
+_LRU_SIZE = 4096
+_MISS = object()
+
+# (порядок регистрации, шаблон пути, методы или None — любые)
+_Entry = tuple[int, str, frozenset | None]
+
+
+class _Node:
+    __slots__ = ("children", "params", "entries")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.params: dict[str, tuple[re.Pattern, _Node]] = {}
+        self.entries: list[_Entry] = []
+
+
+def _segment_pattern(segment: str) -> str | None:
+    """Regex сегмента с параметрами; None — сегмент нельзя матчить отдельно (конвертор path)."""
+    parts, pos = [], 0
+    for m in _PARAM_RE.finditer(segment):
+        convertor = (m.group(2) or ":str")[1:]
+        if convertor == "path" or convertor not in CONVERTOR_TYPES:
+            return None
+        parts.append(re.escape(segment[pos:m.start()]))
+        parts.append(f"(?:{CONVERTOR_TYPES[convertor].regex})")
+        pos = m.end()
+    parts.append(re.escape(segment[pos:]))
+    return "".join(parts)
+
+
+def _allows(entry: _Entry, method: str) -> bool:
+    return entry[2] is None or method in entry[2]
+
+
+class RouteIndex:
+    def __init__(self, lru_size: int = _LRU_SIZE) -> None:
+        self.lru_size = lru_size
+        self._signature: tuple | None = None
+        self._static: dict[str, list[_Entry]] = {}
+        self._root = _Node()
+        self._fallback: list[tuple[int, object]] = []
+        self._lru: OrderedDict[tuple[str, str], str | None] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _routes_signature(routes: list) -> tuple:
+        return (len(routes), id(routes[-1]) if routes else None)
+
+    def build(self, routes: list) -> None:
+        static: dict[str, list[_Entry]] = {}
+        root = _Node()
+        fallback: list[tuple[int, object]] = []
+
+        for order, route in enumerate(routes):
+            if not isinstance(route, Route):
+                fallback.append((order, route))
+                continue
+            entry = (order, route.path, frozenset(route.methods) if route.methods else None)
+            if "{" not in route.path:
+                static.setdefault(route.path, []).append(entry)
+                continue
+
+            node = root
+            for segment in route.path.split("/")[1:]:
+                if "{" not in segment:
+                    node = node.children.setdefault(segment, _Node())
+                    continue
+                pattern = _segment_pattern(segment)
+                if pattern is None:
+                    node = None
+                    break
+                if pattern not in node.params:
+                    node.params[pattern] = (re.compile(pattern), _Node())
+                node = node.params[pattern][1]
+            if node is None:
+                fallback.append((order, route))
+            else:
+                node.entries.append(entry)
+
+        self._static, self._root, self._fallback = static, root, fallback
+        self._lru.clear()
+        self._signature = self._routes_signature(routes)
+
+    def _walk(self, node: _Node, segments: list[str], i: int, method: str, best: _Entry | None) -> _Entry | None:
+        if i == len(segments):
+            for entry in node.entries:
+                if _allows(entry, method) and (best is None or entry[0] < best[0]):
+                    best = entry
+            return best
+        segment = segments[i]
+        child = node.children.get(segment)
+        if child is not None:
+            best = self._walk(child, segments, i + 1, method, best)
+        if segment:
+            for regex, param_node in node.params.values():
+                if regex.fullmatch(segment):
+                    best = self._walk(param_node, segments, i + 1, method, best)
+        return best
+
+    def _resolve(self, scope, method: str, path: str) -> str | None:
+        best: _Entry | None = None
+        for entry in self._static.get(path, ()):
+            if _allows(entry, method):
+                best = entry
+                break
+        best = self._walk(self._root, path.split("/")[1:], 0, method, best)
+        for order, route in self._fallback:
+            if best is not None and order > best[0]:
+                break
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", None) or ""
+        return best[1] if best is not None else None
+
+    def lookup(self, app, scope) -> str | None:
+        """Шаблон роута (например, "/broadcasts/{broadcast_id}") или None — роута нет."""
+        routes = app.router.routes
+        if self._signature != self._routes_signature(routes):
+            self.build(routes)
+
+        method = scope["method"].upper()
+        path = scope.get("path") or "/"
+        key = (method, path)
+        template = self._lru.get(key, _MISS)
+        if template is not _MISS:
+            self.hits += 1
+            self._lru.move_to_end(key)
+            return template
+
+        self.misses += 1
+        template = self._resolve(scope, method, path)
+        self._lru[key] = template
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+        return template
+
+
+route_index = RouteIndex()
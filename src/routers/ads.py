@@ -0,0 +1,183 @@
+# src/routers/ads.py
+# commit: POST /ads/runs/report — батч-учёт публикаций; GET /ads/deletions/due и POST /ads/deletions/done
+
+import logging
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+from src.dependencies import get_session
+from src.schemas import (
+    AdDeletionDoneIn,
+    AdDeletionOut,
+    AdDueOut,
+    AdIn,
+    AdOut,
+    AdRandomSlotOut,
+    AdRunReportIn,
+    AdRunReportOut,
+    AdUpdateIn,
+)
+from src.time_msk import now_msk_naive, to_msk_naive
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/ads", tags=["ads"])
+
+
+@router.post("/", response_model=AdOut)
+async def create_ad(
+    ad: AdIn = Body(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        obj = await crud.create_ad(session, **ad.model_dump())
+        logger.info(f"[{obj.id}] - [POST /ads/] created type={obj.schedule_type}, next_run_at={obj.next_run_at}")
+        return obj
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"[POST /ads/] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при создании объявления")
+
+
+@router.get("/due", response_model=list[AdDueOut])
+async def list_due_ads(
+    until: datetime | None = Query(None, description="граница (по умолчанию — сейчас, МСК)"),
+    limit: int = Query(100, ge=1, le=1000),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        until = to_msk_naive(until) if until is not None else now_msk_naive()
+        return await crud.list_due_ads(session, until=until, limit=limit)
+    except Exception as e:
+        logger.error(f"[GET /ads/due] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при выборке объявлений к отправке")
+
+
+@router.get("/random/slots", response_model=list[AdRandomSlotOut])
+async def list_random_slots(
+    since: datetime | None = Query(None, description="начало (по умолчанию — сейчас, МСК)"),
+    until: datetime | None = Query(None, description="конец (по умолчанию — since + сутки)"),
+    chat_id: int | None = Query(None),
+    limit: int = Query(1000, ge=1, le=5000),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        since = to_msk_naive(since) if since is not None else now_msk_naive()
+        until = to_msk_naive(until) if until is not None else since + timedelta(days=1)
+        return await crud.list_random_slots(session, since=since, until=until, chat_id=chat_id, limit=limit)
+    except Exception as e:
+        logger.error(f"[GET /ads/random/slots] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при получении расписания random-объявлений")
+
+
+@router.post("/runs/report", response_model=AdRunReportOut)
+async def report_ad_runs(
+    payload: AdRunReportIn = Body(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        items = []
+        for run in payload.runs:
+            item = run.model_dump()
+            for field in ("posted_at", "slot_at"):
+                if item[field] is not None:
+                    item[field] = to_msk_naive(item[field])
+            items.append(item)
+        result = await crud.report_ad_runs(session, items=items)
+        logger.info(
+            f"[POST /ads/runs/report] received={result['received']}, recorded={result['recorded']}, "
+            f"unknown_ads={result['unknown_ads']}"
+        )
+        return result
+    except Exception as e:
+        logger.error(f"[POST /ads/runs/report] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при сохранении публикаций объявлений")
+
+
+@router.get("/deletions/due", response_model=list[AdDeletionOut])
+async def list_due_deletions(
+    until: datetime | None = Query(None, description="граница (по умолчанию — сейчас, МСК)"),
+    limit: int = Query(500, ge=1, le=5000),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        until = to_msk_naive(until) if until is not None else now_msk_naive()
+        return await crud.list_due_deletions(session, until=until, limit=limit)
+    except Exception as e:
+        logger.error(f"[GET /ads/deletions/due] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при выборке публикаций к удалению")
+
+
+@router.post("/deletions/done")
+async def mark_deletions_done(
+    payload: AdDeletionDoneIn = Body(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        marked = await crud.mark_runs_deleted(session, run_ids=payload.run_ids)
+        logger.info(f"[POST /ads/deletions/done] run_ids={len(payload.run_ids)}, marked={marked}")
+        return {"marked": marked}
+    except Exception as e:
+        logger.error(f"[POST /ads/deletions/done] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при отметке удалённых публикаций")
+
+
+@router.get("/{ad_id}", response_model=AdOut)
+async def get_ad(
+    ad_id: int,
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        obj = await crud.get_ad(session, ad_id=ad_id)
+        if obj is None:
+            raise HTTPException(status_code=404, detail="Объявление не найдено")
+        return obj
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[{ad_id}] - [GET /ads/{ad_id}] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при получении объявления")
+
+
+@router.put("/{ad_id}", response_model=AdOut)
+async def update_ad(
+    ad_id: int,
+    ad: AdUpdateIn = Body(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        obj = await crud.update_ad(session, ad_id=ad_id, fields=ad.model_dump(exclude_unset=True))
+        if obj is None:
+            raise HTTPException(status_code=404, detail="Объявление не найдено")
+        logger.info(f"[{ad_id}] - [PUT /ads/{ad_id}] updated, next_run_at={obj.next_run_at}")
+        return obj
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"[{ad_id}] - [PUT /ads/{ad_id}] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при изменении объявления")
+
+
+@router.post("/{ad_id}/fired", response_model=AdOut)
+async def mark_ad_fired(
+    ad_id: int,
+    fired_at: datetime | None = Query(None, description="слот, за который отправлено (по умолчанию — сейчас)"),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        fired_at = to_msk_naive(fired_at) if fired_at is not None else now_msk_naive()
+        obj = await crud.mark_ad_fired(session, ad_id=ad_id, fired_at=fired_at)
+        if obj is None:
+            raise HTTPException(status_code=404, detail="Объявление не найдено")
+        logger.info(f"[{ad_id}] - [POST /ads/{ad_id}/fired] next_run_at={obj.next_run_at}")
+        return obj
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[{ad_id}] - [POST /ads/{ad_id}/fired] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при отметке срабатывания объявления")
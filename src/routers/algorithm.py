@@ -1,5 +1,5 @@
 # src/routers/algorithm.py
-# commit: вариант A — роутер переведён на CRUD.get_progress (ORM) вместо разрозненных get_user_step/get_basic...; response_model = AlgorithmProgressModel
+# commit: /algo/stats/funnel читает счётчики из algorithm_funnel_counters — одни числа у всех воркеров
 
 import logging
 
@@ -8,12 +8,31 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src import crud
 from src.dependencies import get_session
-from src.schemas import AlgorithmProgressModel
+from src.schemas import AlgorithmFunnelOut, AlgorithmProgressModel
+from src.serialization import serializer
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/algo", tags=["algorithm"])
 
 
+@router.get(
+    "/stats/funnel",
+    response_model=AlgorithmFunnelOut,
+    description=(
+        "Воронка онбординга из таблицы счётчиков: дельты пишутся в транзакции каждой записи прогресса, "
+        "дрейф (каскадные удаления, ручные правки) сверяется раз в ALGO_FUNNEL_RECONCILE_SEC (время — reconciled_at)."
+    ),
+)
+async def get_funnel_stats(session: AsyncSession = Depends(get_session)):
+    try:
+        snapshot = await crud.load_funnel_snapshot(session)
+        logger.info(f"[GET /algo/stats/funnel] total={snapshot['total']}, steps={len(snapshot['steps'])}")
+        return snapshot
+    except Exception as e:
+        logger.error(f"[GET /algo/stats/funnel] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при получении статистики воронки")
+
+
 @router.get("/{user_id}", response_model=AlgorithmProgressModel)
 async def get_user_progress(user_id: int, session: AsyncSession = Depends(get_session)):
     try:
@@ -30,7 +49,7 @@ async def get_user_progress(user_id: int, session: AsyncSession = Depends(get_se
             return response
 
         logger.info(f"[{user_id}] GET /algo/{user_id} — прогресс найден")
-        return obj
+        return serializer(AlgorithmProgressModel).response(obj)
     except Exception as e:
         logger.error(f"[{user_id}] GET /algo/{user_id} — ошибка: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка при получении прогресса пользователя")
@@ -0,0 +1,346 @@
+# src/routers/broadcasts.py
+# commit: дельта прогресса по отчёту — из аренды уходят только строки, которые в ней были (released)
+
+import logging
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+from src.broadcast_progress import progress_hub
+from src.send_plan import send_plan_cache
+from src.config import settings
+from src.dependencies import get_session
+from src.schemas import (
+    BroadcastAudienceOut,
+    BroadcastIn,
+    BroadcastMaterializeOut,
+    BroadcastOut,
+    BroadcastProgressOut,
+    BroadcastStatusIn,
+    BroadcastTargetIn,
+    BroadcastTargetOut,
+    BroadcastUpdateIn,
+    DeliveryClaimOut,
+    DeliveryReportIn,
+    DeliveryReportOut,
+)
+from src.time_msk import to_msk_naive
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/broadcasts", tags=["broadcasts"])
+
+
+@router.post("/", response_model=BroadcastOut)
+async def create_broadcast(
+    broadcast: BroadcastIn = Body(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        obj = await crud.create_broadcast(session, **broadcast.model_dump())
+        logger.info(f"[{obj.id}] - [POST /broadcasts/] created kind={obj.kind}, title={obj.title!r}")
+        return obj
+    except Exception as e:
+        logger.error(f"[POST /broadcasts/] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при создании рассылки")
+
+
+@router.get("/{broadcast_id}", response_model=BroadcastOut)
+async def get_broadcast(
+    broadcast_id: int,
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        obj = await crud.get_broadcast(session, broadcast_id=broadcast_id)
+        if obj is None:
+            raise HTTPException(status_code=404, detail="Рассылка не найдена")
+        return obj
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[{broadcast_id}] - [GET /broadcasts/{broadcast_id}] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при получении рассылки")
+
+
+@router.put("/{broadcast_id}", response_model=BroadcastOut)
+async def update_broadcast(
+    broadcast_id: int,
+    broadcast: BroadcastUpdateIn = Body(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        obj = await crud.update_broadcast(
+            session,
+            broadcast_id=broadcast_id,
+            fields=broadcast.model_dump(exclude_unset=True),
+        )
+        if obj is None:
+            raise HTTPException(status_code=404, detail="Рассылка не найдена")
+        logger.info(f"[{broadcast_id}] - [PUT /broadcasts/{broadcast_id}] updated, version={obj.version}")
+        return obj
+    except HTTPException:
+        raise
+    except crud.BroadcastStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Контент рассылки не компилируется: {e}")
+    except Exception as e:
+        logger.error(f"[{broadcast_id}] - [PUT /broadcasts/{broadcast_id}] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при изменении рассылки")
+
+
+@router.patch("/{broadcast_id}/status", response_model=BroadcastOut)
+async def set_broadcast_status(
+    broadcast_id: int,
+    payload: BroadcastStatusIn = Body(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        obj = await crud.set_broadcast_status(session, broadcast_id=broadcast_id, status=payload.status)
+        if obj is None:
+            raise HTTPException(status_code=404, detail="Рассылка не найдена")
+        logger.info(f"[{broadcast_id}] - [PATCH /broadcasts/{broadcast_id}/status] status={obj.status}")
+        return obj
+    except HTTPException:
+        raise
+    except crud.BroadcastStateError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Контент рассылки не компилируется: {e}")
+    except Exception as e:
+        logger.error(f"[{broadcast_id}] - [PATCH /broadcasts/{broadcast_id}/status] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при смене статуса рассылки")
+
+
+@router.get("/{broadcast_id}/plan")
+async def get_broadcast_plan(
+    broadcast_id: int,
+    if_none_match: str | None = Header(None),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Скомпилированный план отправки: готовые байты JSON, воркер пересылает их без
+    перекодирования. ETag = "<id>-<version>"; при совпадении If-None-Match — 304
+    (проверка стоит одного SELECT version по PK).
+    """
+    try:
+        version = await crud.get_broadcast_version(session, broadcast_id=broadcast_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Рассылка не найдена")
+        etag = f'"{broadcast_id}-{version}"'
+        if if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        plan = send_plan_cache.get(broadcast_id, version)
+        if plan is None:
+            broadcast = await crud.get_broadcast(session, broadcast_id=broadcast_id)
+            if broadcast is None:
+                raise HTTPException(status_code=404, detail="Рассылка не найдена")
+            plan = send_plan_cache.get_or_compile(broadcast)
+        return Response(content=plan.body, media_type="application/json", headers={"ETag": plan.etag})
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Контент рассылки не компилируется: {e}")
+    except Exception as e:
+        logger.error(f"[{broadcast_id}] - [GET /broadcasts/{broadcast_id}/plan] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при получении плана отправки")
+
+
+@router.post("/{broadcast_id}/targets", response_model=BroadcastTargetOut)
+async def add_broadcast_target(
+    broadcast_id: int,
+    target: BroadcastTargetIn = Body(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        obj = await crud.add_broadcast_target(
+            session,
+            broadcast_id=broadcast_id,
+            type_=target.type,
+            user_ids=target.user_ids,
+            sql_text=target.sql_text,
+            kind=target.kind,
+        )
+        if obj is None:
+            raise HTTPException(status_code=404, detail="Рассылка не найдена")
+        logger.info(f"[{broadcast_id}] - [POST /broadcasts/{broadcast_id}/targets] type={target.type}")
+        return obj
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"[{broadcast_id}] - [POST /broadcasts/{broadcast_id}/targets] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при добавлении таргета рассылки")
+
+
+@router.post("/{broadcast_id}/materialize", response_model=BroadcastMaterializeOut)
+async def materialize_broadcast(
+    broadcast_id: int,
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        result = await crud.materialize_broadcast(
+            session,
+            broadcast_id=broadcast_id,
+            chunk_size=settings.BROADCAST_MATERIALIZE_CHUNK,
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Рассылка не найдена")
+        logger.info(
+            f"[{broadcast_id}] - [POST /broadcasts/{broadcast_id}/materialize] "
+            f"inserted={result['inserted']}, chunks={result['chunks']}, total={result['total']}"
+        )
+        return result
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        logger.error(f"[{broadcast_id}] - [POST /broadcasts/{broadcast_id}/materialize] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при материализации аудитории рассылки")
+
+
+@router.post("/{broadcast_id}/claim", response_model=DeliveryClaimOut)
+async def claim_deliveries(
+    broadcast_id: int,
+    n: int = Query(100, ge=1, description="сколько доставок забрать"),
+    worker: str | None = Query(None, max_length=64, description="идентификатор воркера"),
+    lease_sec: int | None = Query(None, ge=1, description="срок аренды, сек"),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        result = await crud.claim_deliveries(
+            session,
+            broadcast_id=broadcast_id,
+            n=min(n, settings.BROADCAST_CLAIM_MAX),
+            lease_seconds=lease_sec or settings.BROADCAST_LEASE_SEC,
+            worker=worker,
+        )
+        claimed = len(result["items"])
+        progress_hub.apply_delta(broadcast_id, pending=-claimed, claimed=claimed)
+        logger.info(
+            f"[{broadcast_id}] - [POST /broadcasts/{broadcast_id}/claim] "
+            f"worker={worker!r}, requested={n}, claimed={len(result['items'])}"
+        )
+        return result
+    except Exception as e:
+        logger.error(f"[{broadcast_id}] - [POST /broadcasts/{broadcast_id}/claim] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при выдаче доставок рассылки")
+
+
+@router.post("/{broadcast_id}/deliveries/report", response_model=DeliveryReportOut)
+async def report_deliveries(
+    broadcast_id: int,
+    report: DeliveryReportIn = Body(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        results = []
+        for item in report.results:
+            row = item.model_dump()
+            if row["sent_at"] is not None:
+                row["sent_at"] = to_msk_naive(row["sent_at"])
+            results.append(row)
+
+        result = await crud.report_deliveries(
+            session,
+            broadcast_id=broadcast_id,
+            results=results,
+            chunk_size=settings.BROADCAST_REPORT_CHUNK,
+        )
+        applied = result["applied"]
+        finished = applied["sent"] + applied["failed"] + applied["skipped"]
+        # из claimed уходят только арендованные строки; pending — остаток total за вычетом остальных
+        progress_hub.apply_delta(
+            broadcast_id,
+            sent=applied["sent"],
+            failed=applied["failed"],
+            skipped=applied["skipped"],
+            claimed=-result["released"],
+            pending=result["released"] - finished,
+        )
+        logger.info(
+            f"[{broadcast_id}] - [POST /broadcasts/{broadcast_id}/deliveries/report] "
+            f"received={result['received']}, applied={result['applied']}, ignored={result['ignored']}"
+        )
+        return result
+    except Exception as e:
+        logger.error(
+            f"[{broadcast_id}] - [POST /broadcasts/{broadcast_id}/deliveries/report] Ошибка: {e}",
+            exc_info=True,
+        )
+        raise HTTPException(status_code=500, detail="Ошибка при сохранении результатов доставки")
+
+
+@router.get("/{broadcast_id}/progress", response_model=BroadcastProgressOut)
+async def get_broadcast_progress(broadcast_id: int):
+    try:
+        snapshot = await progress_hub.get(broadcast_id)
+        if snapshot is None:
+            raise HTTPException(status_code=404, detail="Рассылка не найдена")
+        return snapshot
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[{broadcast_id}] - [GET /broadcasts/{broadcast_id}/progress] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при получении прогресса рассылки")
+
+
+@router.get("/{broadcast_id}/progress/stream")
+async def stream_broadcast_progress(broadcast_id: int):
+    try:
+        if await progress_hub.get(broadcast_id) is None:
+            raise HTTPException(status_code=404, detail="Рассылка не найдена")
+        logger.info(f"[{broadcast_id}] - [GET /broadcasts/{broadcast_id}/progress/stream] подписка")
+        return StreamingResponse(
+            progress_hub.stream(broadcast_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[{broadcast_id}] - [GET /broadcasts/{broadcast_id}/progress/stream] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при подписке на прогресс рассылки")
+
+
+@router.get("/{broadcast_id}/audience", response_model=BroadcastAudienceOut)
+async def get_broadcast_audience(
+    broadcast_id: int,
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        broadcast = await crud.get_broadcast(session, broadcast_id=broadcast_id)
+        if broadcast is None:
+            raise HTTPException(status_code=404, detail="Рассылка не найдена")
+        counts: dict[str, int] = {}
+
+        async def kind_count(kind: str) -> int:
+            if kind not in counts:
+                counts[kind] = await crud.count_kind_subscribers(session, kind=kind)
+            return counts[kind]
+
+        targets = []
+        for target in await crud.list_broadcast_targets(session, broadcast_id=broadcast_id):
+            if target.type == "kind":
+                estimated = await kind_count(target.kind)
+            elif target.type == "ids":
+                estimated = len(set(target.user_ids_json or []))
+            else:
+                estimated = None
+            targets.append({"target_id": target.id, "type": target.type, "estimated": estimated})
+
+        return {
+            "broadcast_id": broadcast_id,
+            "kind": broadcast.kind,
+            "kind_subscribers": await kind_count(broadcast.kind),
+            "targets": targets,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"[{broadcast_id}] - [GET /broadcasts/{broadcast_id}/audience] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при оценке аудитории рассылки")
@@ -0,0 +1,36 @@
+# src/routers/debug.py
+# commit: GET /debug/queries/top — самые дорогие отпечатки SQL; POST /debug/queries/reset
+
+import logging
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query
+
+from src.schemas import QueryTopOut
+from src.sql_timing import query_stats
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+@router.get("/queries/top", response_model=QueryTopOut)
+async def queries_top(
+    order: Literal["total", "avg", "max", "count"] = Query("total"),
+    limit: int = Query(20, ge=1, le=200),
+):
+    try:
+        return {**query_stats.stats(), "top": query_stats.top(limit=limit, order=order)}
+    except Exception as e:
+        logger.error(f"[GET /debug/queries/top] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при формировании отчёта по SQL")
+
+
+@router.post("/queries/reset")
+async def queries_reset():
+    try:
+        query_stats.reset()
+        logger.info("[POST /debug/queries/reset] статистика SQL сброшена")
+        return {"status": "ok"}
+    except Exception as e:
+        logger.error(f"[POST /debug/queries/reset] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при сбросе статистики SQL")
@@ -1,10 +1,14 @@
 # src/routers/health.py
-# commit: упрощение и стабилизация health-эндпоинтов; контракты ответов без изменений
+# commit: GET /health/db-retry — состояние circuit breaker и бюджета ретраев БД
 
 import logging
 
 from fastapi import APIRouter, HTTPException
 
+from src.admission import admission
+from src.db_retry import db_retry_policy
+from src.ip_blocklist import scanner_blocklist
+
 router = APIRouter(tags=["health"])
 logger = logging.getLogger(__name__)
 
@@ -31,6 +35,33 @@ async def health():
         raise HTTPException(status_code=500, detail="Ошибка при проверке состояния системы")
 
 
+@router.get("/health/blocklist", tags=["health"])
+async def blocklist_stats():
+    try:
+        return scanner_blocklist.stats()
+    except Exception as e:
+        logger.error(f"[GET /health/blocklist] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при получении статистики блоклиста")
+
+
+@router.get("/health/admission", tags=["health"])
+async def admission_stats():
+    try:
+        return admission.stats()
+    except Exception as e:
+        logger.error(f"[GET /health/admission] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при получении статистики admission control")
+
+
+@router.get("/health/db-retry", tags=["health"])
+async def db_retry_stats():
+    try:
+        return db_retry_policy.stats()
+    except Exception as e:
+        logger.error(f"[GET /health/db-retry] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при получении статистики ретраев БД")
+
+
 @router.get("/panic")
 async def panic():
     try:
@@ -1,5 +1,5 @@
 # src/routers/invite_links.py
-# commit: вариант A — pydantic v2 model_dump в логах, response_model оставлен на InviteLinkModel
+# commit: списки ссылок сериализуются напрямую из Core-строк (serializer), response_model — для OpenAPI
 
 import logging
 from typing import List
@@ -10,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src import crud
 from src.dependencies import get_session
 from src.schemas import InviteLinkIn, InviteLinkModel
+from src.serialization import serializer
 
 router = APIRouter(prefix="/invite_links", tags=["invite_links"])
 logger = logging.getLogger(__name__)
@@ -43,7 +44,7 @@ async def get_all_invite_links(
     try:
         result = await crud.get_invite_links(session, user_id=user_id)
         logger.info(f"[{user_id}] - [GET /invite_links/all/{user_id}] total={len(result)}")
-        return result
+        return serializer(InviteLinkModel).response_many(result)
     except Exception as e:
         logger.error(f"[{user_id}] - [GET /invite_links/all/{user_id}] Ошибка: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка при получении ссылок приглашений")
@@ -57,7 +58,7 @@ async def get_valid_invite_links(
     try:
         result = await crud.get_valid_invite_links(session, user_id=user_id)
         logger.info(f"[{user_id}] - [GET /invite_links/{user_id}] valid_total={len(result)}")
-        return result
+        return serializer(InviteLinkModel).response_many(result)
     except Exception as e:
         logger.error(f"[{user_id}] - [GET /invite_links/{user_id}] Ошибка: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка при получении действующих ссылок")
@@ -1,9 +1,10 @@
 # src/routers/memberships.py
-# commit: вариант A — list_by_chat возвращает list[int] (без dict), остальные ответы оставлены ok-обёрткой
+# commit: ORJSONResponse из fastapi.responses вместо локальной копии
 
 import logging
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src import crud
@@ -71,7 +72,7 @@ async def list_by_chat(
     try:
         rows = await crud.list_memberships_by_chat(session, chat_id=chat_id, limit=limit, offset=offset)
         logger.info(f"[GET /memberships/by-chat] chat_id={chat_id}, limit={limit}, offset={offset}, rows={len(rows)}")
-        return rows
+        return ORJSONResponse(rows)
     except Exception as e:
         logger.error(f"[GET /memberships/by-chat] Ошибка: chat_id={chat_id}, ошибка={e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Ошибка при получении списка мемберств")
@@ -0,0 +1,23 @@
+# src/routers/metrics.py
+# commit: GET /metrics — экспозиция метрик в формате Prometheus (публичный, вне secured-роутеров)
+
+import logging
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from src.metrics import render
+
+router = APIRouter(tags=["metrics"])
+logger = logging.getLogger(__name__)
+
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    try:
+        return PlainTextResponse(render(), media_type=_CONTENT_TYPE)
+    except Exception as e:
+        logger.error(f"[GET /metrics] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при формировании метрик")
@@ -0,0 +1,73 @@
+# src/routers/subscriptions.py
+# commit: API подписок без резолвера в памяти — источник истины одна таблица
+
+import logging
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src import crud
+from src.crud.subscriptions import subscription_flags
+from src.dependencies import get_session
+from src.schemas import BroadcastKind, SubscriptionBulkIn, SubscriptionOut
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/subscriptions", tags=["subscriptions"])
+
+
+@router.get("/{user_id}", response_model=SubscriptionOut)
+async def get_subscription(user_id: int, session: AsyncSession = Depends(get_session)):
+    try:
+        obj = await crud.get_subscription(session, user_id=user_id)
+        return {"user_id": user_id, **subscription_flags(obj)}
+    except Exception as e:
+        logger.error(f"[{user_id}] - [GET /subscriptions/{user_id}] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при получении подписок пользователя")
+
+
+@router.put("/bulk", response_model=list[SubscriptionOut])
+async def bulk_update_subscriptions(
+    payload: SubscriptionBulkIn = Body(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        current = await crud.upsert_subscriptions(
+            session,
+            items=[item.model_dump() for item in payload.items],
+        )
+        logger.info(f"[PUT /subscriptions/bulk] items={len(payload.items)}, users={len(current)}")
+        return [{"user_id": user_id, **flags} for user_id, flags in current.items()]
+    except IntegrityError as e:
+        logger.error(f"[PUT /subscriptions/bulk] FK error: {e.orig}")
+        raise HTTPException(status_code=422, detail="Среди user_id есть отсутствующие в users")
+    except Exception as e:
+        logger.error(f"[PUT /subscriptions/bulk] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при сохранении подписок")
+
+
+@router.put("/{user_id}/{kind}", response_model=SubscriptionOut)
+async def toggle_subscription(
+    user_id: int,
+    kind: BroadcastKind,
+    enabled: bool = Query(...),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        current = await crud.upsert_subscriptions(
+            session,
+            items=[{"user_id": user_id, f"{kind}_enabled": enabled}],
+        )
+        flags = current.get(user_id)
+        if flags is None:
+            raise HTTPException(status_code=404, detail="Пользователь не найден")
+        logger.info(f"[{user_id}] - [PUT /subscriptions/{user_id}/{kind}] enabled={enabled}")
+        return {"user_id": user_id, **flags}
+    except HTTPException:
+        raise
+    except IntegrityError as e:
+        logger.error(f"[{user_id}] - [PUT /subscriptions/{user_id}/{kind}] FK error: {e.orig}")
+        raise HTTPException(status_code=422, detail="Пользователь не найден в users")
+    except Exception as e:
+        logger.error(f"[{user_id}] - [PUT /subscriptions/{user_id}/{kind}] Ошибка: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Ошибка при изменении подписки")
@@ -1,5 +1,5 @@
 # src/routers/users.py
-# commit: вариант A — убрана ручная сериализация, response_model переведён на UserOut, upsert_with_membership возвращает пользователя
+# commit: GET /users/{user_id} сериализуется из ORM-атрибутов (serializer) без повторной валидации UserOut
 
 import logging
 
@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src import crud
 from src.dependencies import get_session
 from src.schemas import UserModel, UserOut, UserUpdate
+from src.serialization import serializer
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/users", tags=["users"])
@@ -101,7 +102,7 @@ async def get_user(
             raise HTTPException(status_code=404, detail="Пользователь не найден")
 
         logger.info(f"[{user_id}] - [GET /users/{user_id}] Пользователь найден")
-        return user_obj
+        return serializer(UserOut).response(user_obj)
     except HTTPException:
         raise
     except Exception as e:
@@ -1,10 +1,11 @@
 # src/schemas.py
-# commit: подготовка к варианту A: добавлены Out-схемы с id, сохранена совместимость с текущими In-схемами
+# commit: claimed_count в BroadcastOut, released в отчёте доставок
 
-from datetime import datetime
-from typing import Optional
+import json
+from datetime import date, datetime, time
+from typing import Any, Literal, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
 
 # ─────────────────────────────
@@ -100,6 +101,16 @@ class AlgorithmProgressModel(AlgorithmProgressOut):
     pass
 
 
+class AlgorithmFunnelOut(BaseModel):
+    total: int
+    steps: dict[int, int]
+    basic_completed: int
+    advanced_completed: int
+    basic_rate: float
+    advanced_rate: float
+    reconciled_at: Optional[datetime] = None
+
+
 # ─────────────────────────────
 # Links
 # ─────────────────────────────
@@ -125,3 +136,308 @@ class UserWithChatModel(ORMBase):
     full_name: Optional[str] = None
     terms_accepted: Optional[bool] = None
     chat_id: int
+
+
+# ─────────────────────────────
+# Broadcasts
+# ─────────────────────────────
+
+BroadcastKind = Literal["news", "meetings", "important"]
+BroadcastStatus = Literal["draft", "scheduled", "sending", "sent", "failed"]
+
+
+class BroadcastIn(BaseModel):
+    kind: BroadcastKind
+    title: str = Field(..., max_length=255)
+    content: dict[str, Any]
+    schedule: Optional[str] = None
+    enabled: bool = True
+    created_by: Optional[int] = None
+
+
+class BroadcastUpdateIn(BaseModel):
+    kind: Optional[BroadcastKind] = None
+    title: Optional[str] = Field(None, max_length=255)
+    content: Optional[dict[str, Any]] = None
+    schedule: Optional[str] = None
+    enabled: Optional[bool] = None
+
+
+class BroadcastStatusIn(BaseModel):
+    status: BroadcastStatus
+
+
+class BroadcastOut(ORMBase):
+    id: int
+    kind: BroadcastKind
+    title: str
+    content: dict[str, Any]
+    status: BroadcastStatus
+    version: int = 1
+    schedule: Optional[str] = None
+    enabled: bool
+    created_by: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+    archived_at: Optional[datetime] = None
+    total_count: int = 0
+    sent_count: int = 0
+    failed_count: int = 0
+    skipped_count: int = 0
+    claimed_count: int = 0
+
+    @field_validator("content", mode="before")
+    @classmethod
+    def _parse_content(cls, v):
+        if isinstance(v, (str, bytes)):
+            return json.loads(v) if v else {}
+        return v
+
+
+class BroadcastTargetIn(BaseModel):
+    type: Literal["ids", "sql", "kind"]
+    user_ids: Optional[list[int]] = None
+    sql_text: Optional[str] = None  # для type=sql — имя аудитории из BROADCAST_SQL_AUDIENCES
+    kind: Optional[BroadcastKind] = None
+
+    @model_validator(mode="after")
+    def _check_payload(self):
+        required = {"ids": self.user_ids, "sql": self.sql_text, "kind": self.kind}[self.type]
+        if required is None:
+            raise ValueError(f"для таргета type={self.type!r} не передано соответствующее поле")
+        return self
+
+
+class BroadcastTargetOut(ORMBase):
+    id: int
+    broadcast_id: int
+    type: Literal["ids", "sql", "kind"]
+    user_ids_json: Optional[list[int]] = None
+    sql_text: Optional[str] = None
+    kind: Optional[BroadcastKind] = None
+    created_at: datetime
+
+
+class BroadcastMaterializeOut(BaseModel):
+    broadcast_id: int
+    targets: int
+    inserted: int
+    chunks: int
+    total: int
+
+
+class DeliveryClaimItem(BaseModel):
+    id: int
+    user_id: int
+    attempts: int
+
+
+class DeliveryClaimOut(BaseModel):
+    broadcast_id: int
+    lease_until: datetime
+    items: list[DeliveryClaimItem]
+
+
+class DeliveryReportItem(BaseModel):
+    id: int
+    # pending — вернуть в очередь (повторить позже), остальные статусы финальные
+    status: Literal["sent", "failed", "skipped", "pending"]
+    message_id: Optional[int] = None
+    error_code: Optional[str] = Field(None, max_length=64)
+    error_message: Optional[str] = Field(None, max_length=255)
+    sent_at: Optional[datetime] = None
+    attempts: Optional[int] = Field(None, ge=0)
+
+
+class DeliveryReportIn(BaseModel):
+    results: list[DeliveryReportItem] = Field(..., max_length=20000)
+
+
+class DeliveryReportOut(BaseModel):
+    broadcast_id: int
+    received: int
+    applied: dict[str, int]
+    released: int = 0
+    ignored: int
+
+
+class BroadcastProgressOut(BaseModel):
+    broadcast_id: int
+    status: BroadcastStatus
+    total: int
+    pending: int
+    claimed: int
+    sent: int
+    failed: int
+    skipped: int
+
+
+# ─────────────────────────────
+# Subscriptions
+# ─────────────────────────────
+
+class SubscriptionOut(BaseModel):
+    user_id: int
+    news_enabled: bool
+    meetings_enabled: bool
+    important_enabled: bool
+
+
+class SubscriptionUpdateItem(BaseModel):
+    user_id: int
+    news_enabled: Optional[bool] = None
+    meetings_enabled: Optional[bool] = None
+    important_enabled: Optional[bool] = None
+
+
+class SubscriptionBulkIn(BaseModel):
+    items: list[SubscriptionUpdateItem] = Field(..., min_length=1, max_length=1000)
+
+
+class BroadcastAudienceTarget(BaseModel):
+    target_id: int
+    type: Literal["ids", "sql", "kind"]
+    # None — размер не известен без выполнения запроса (sql-таргет)
+    estimated: Optional[int] = None
+
+
+class BroadcastAudienceOut(BaseModel):
+    broadcast_id: int
+    kind: BroadcastKind
+    kind_subscribers: int
+    targets: list[BroadcastAudienceTarget]
+
+
+# ─────────────────────────────
+# Ads
+# ─────────────────────────────
+
+AdScheduleType = Literal["cron", "n_days", "random"]
+
+
+class AdIn(BaseModel):
+    title: str = Field(..., max_length=255)
+    chat_id: int
+    thread_id: Optional[int] = None
+    content_json: dict[str, Any]
+    schedule_type: AdScheduleType
+    schedule_cron: Optional[str] = Field(None, max_length=255)
+    n_days_start_date: Optional[date] = None
+    n_days_time: Optional[time] = None
+    n_days_interval: Optional[int] = Field(None, ge=1)
+    enabled: bool = True
+    delete_previous: bool = True
+    dedupe_minute: bool = True
+    auto_delete_ttl_hours: Optional[int] = Field(None, ge=1)
+    auto_delete_cron: Optional[str] = Field(None, max_length=255)
+    created_by: Optional[int] = None
+
+
+class AdUpdateIn(BaseModel):
+    title: Optional[str] = Field(None, max_length=255)
+    chat_id: Optional[int] = None
+    thread_id: Optional[int] = None
+    content_json: Optional[dict[str, Any]] = None
+    schedule_type: Optional[AdScheduleType] = None
+    schedule_cron: Optional[str] = Field(None, max_length=255)
+    n_days_start_date: Optional[date] = None
+    n_days_time: Optional[time] = None
+    n_days_interval: Optional[int] = Field(None, ge=1)
+    enabled: Optional[bool] = None
+    delete_previous: Optional[bool] = None
+    dedupe_minute: Optional[bool] = None
+    auto_delete_ttl_hours: Optional[int] = Field(None, ge=1)
+    auto_delete_cron: Optional[str] = Field(None, max_length=255)
+
+
+class AdOut(ORMBase):
+    id: int
+    title: str
+    chat_id: int
+    thread_id: Optional[int] = None
+    content_json: dict[str, Any]
+    schedule_type: AdScheduleType
+    schedule_cron: Optional[str] = None
+    n_days_start_date: Optional[date] = None
+    n_days_time: Optional[time] = None
+    n_days_interval: Optional[int] = None
+    enabled: bool
+    delete_previous: bool
+    dedupe_minute: bool
+    auto_delete_ttl_hours: Optional[int] = None
+    auto_delete_cron: Optional[str] = None
+    last_message_id: Optional[int] = None
+    next_run_at: Optional[datetime] = None
+    created_by: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+class AdDueOut(ORMBase):
+    id: int
+    chat_id: int
+    thread_id: Optional[int] = None
+    schedule_type: AdScheduleType
+    next_run_at: datetime
+
+
+class AdRandomSlotOut(BaseModel):
+    ad_id: int
+    branch_id: int
+    chat_id: int
+    thread_id: Optional[int] = None
+    run_at: datetime
+
+
+class AdRunReportItem(BaseModel):
+    ad_id: int
+    message_id: int
+    posted_at: Optional[datetime] = None
+    # слот расписания, за который опубликовано (как в GET /ads/due)
+    slot_at: Optional[datetime] = None
+
+
+class AdRunReportIn(BaseModel):
+    runs: list[AdRunReportItem] = Field(..., min_length=1, max_length=1000)
+
+
+class AdRunReportOut(BaseModel):
+    received: int
+    recorded: int
+    unknown_ads: list[int]
+
+
+class AdDeletionOut(ORMBase):
+    id: int
+    ad_id: int
+    chat_id: int
+    thread_id: Optional[int] = None
+    message_id: int
+    delete_at: datetime
+
+
+class AdDeletionDoneIn(BaseModel):
+    run_ids: list[int] = Field(..., min_length=1, max_length=1000)
+
+
+# ─────────────────────────────
+# Debug: SQL
+# ─────────────────────────────
+
+class QueryFingerprintOut(BaseModel):
+    fingerprint: str
+    count: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    share: float
+    example: str
+
+
+class QueryTopOut(BaseModel):
+    queries: int
+    seconds_total: float
+    slow: int
+    fingerprints: int
+    top: list[QueryFingerprintOut]
@@ -0,0 +1,209 @@
+# src/send_plan.py
+# commit: компиляция рассылки в неизменяемый план отправки (HTML-санитайз, медиагруппы, reply_markup) + LRU по (id, version)
+
+from __future__ import annotations
+
+import html
+import json
+from collections import OrderedDict
+from html.parser import HTMLParser
+
+_CAPTION_LIMIT = 1024
+_TEXT_LIMIT = 4096
+_MEDIA_GROUP_LIMIT = 10
+_PLAN_CACHE_SIZE = 256
+
+# Теги/атрибуты, которые понимает parse_mode=HTML Bot API
+_ALLOWED_TAGS = {
+    "b": (), "strong": (), "i": (), "em": (), "u": (), "ins": (), "s": (), "strike": (), "del": (),
+    "tg-spoiler": (), "span": ("class",), "a": ("href",), "code": ("class",), "pre": (),
+    "blockquote": ("expandable",), "tg-emoji": ("emoji-id",),
+}
+
+
+class _TelegramHTMLSanitizer(HTMLParser):
+    """
+    Приводит произвольный HTML к подмножеству Telegram: неизвестные теги выкидываются
+    (текст остаётся), спецсимволы в тексте экранируются, незакрытые теги закрываются.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.out: list[str] = []
+        self.stack: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "br":
+            self.out.append("\n")
+            return
+        allowed = _ALLOWED_TAGS.get(tag)
+        if allowed is None:
+            return
+        parts = [tag]
+        for name, value in attrs:
+            if name in allowed:
+                parts.append(name if value is None else f'{name}="{html.escape(value, quote=True)}"')
+        self.out.append(f"<{' '.join(parts)}>")
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        while self.stack:
+            open_tag = self.stack.pop()
+            self.out.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        self.out.append(html.escape(data, quote=False))
+
+    def result(self) -> str:
+        self.close()
+        while self.stack:
+            self.out.append(f"</{self.stack.pop()}>")
+        return "".join(self.out)
+
+
+def sanitize_telegram_html(text: str) -> str:
+    parser = _TelegramHTMLSanitizer()
+    parser.feed(text or "")
+    return parser.result()
+
+
+def _files(content: dict) -> list[str]:
+    files = content.get("files") or []
+    if isinstance(files, str):
+        files = [f.strip() for f in files.split(",")]
+    return [str(f) for f in files if f]
+
+
+def _reply_markup(content: dict) -> dict | None:
+    button = content.get("button") or {}
+    if not button.get("enabled") or not button.get("url"):
+        return None
+    return {"inline_keyboard": [[{"text": str(button.get("label") or button["url"]), "url": str(button["url"])}]]}
+
+
+def _encode(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def build_send_calls(content: dict) -> list[tuple[str, dict]]:
+    """
+    content ({"text", "files", "button"}) → [(method, params без chat_id), ...].
+
+    Файлы — file_id Telegram, шлём документами: одиночный — с подписью,
+    несколько — sendMediaGroup по 10; текст длиннее лимита подписи — отдельным сообщением.
+    Кнопка (reply_markup) вешается на текстовое сообщение или одиночный документ.
+    """
+    text = sanitize_telegram_html(str(content.get("text") or ""))
+    if len(text) > _TEXT_LIMIT:
+        raise ValueError(f"текст рассылки длиннее {_TEXT_LIMIT} символов после подготовки HTML")
+    files = _files(content)
+    markup = _reply_markup(content)
+
+    if not files:
+        if not text:
+            raise ValueError("в рассылке нет ни текста, ни файлов")
+        params = {"text": text, "parse_mode": "HTML"}
+        if markup:
+            params["reply_markup"] = markup
+        return [("sendMessage", params)]
+
+    calls: list[tuple[str, dict]] = []
+    caption_fits = len(text) <= _CAPTION_LIMIT
+    separate_text = bool(text) and (not caption_fits or (markup is not None and len(files) > 1))
+
+    if len(files) == 1:
+        params = {"document": files[0]}
+        if text and caption_fits:
+            params.update(caption=text, parse_mode="HTML")
+        if markup and not separate_text:
+            params["reply_markup"] = markup
+        calls.append(("sendDocument", params))
+    else:
+        for start in range(0, len(files), _MEDIA_GROUP_LIMIT):
+            media = [{"type": "document", "media": f} for f in files[start:start + _MEDIA_GROUP_LIMIT]]
+            # подпись — на последнем документе последней группы (так Telegram показывает её под альбомом)
+            if text and not separate_text and start + _MEDIA_GROUP_LIMIT >= len(files):
+                media[-1].update(caption=text, parse_mode="HTML")
+            calls.append(("sendMediaGroup", {"media": media}))
+
+    if separate_text:
+        params = {"text": text, "parse_mode": "HTML"}
+        if markup:
+            params["reply_markup"] = markup
+        calls.append(("sendMessage", params))
+    return calls
+
+
+class SendPlan:
+    """
+    Неизменяемый план отправки рассылки.
+
+    body — сериализованный план целиком (отдаётся воркерам как есть);
+    request_body(i, chat_id) — готовое тело i-го вызова: chat_id вклеивается
+    в заранее закодированные params без повторной сериализации JSON.
+    """
+
+    __slots__ = ("broadcast_id", "version", "methods", "_params", "body", "etag")
+
+    def __init__(self, broadcast_id: int, version: int, calls: list[tuple[str, dict]]) -> None:
+        self.broadcast_id = broadcast_id
+        self.version = version
+        self.methods = tuple(method for method, _ in calls)
+        # '{...}' → '...}' — хвост для склейки с '{"chat_id":N,'
+        self._params = tuple(_encode(params)[1:] for _, params in calls)
+        self.body = _encode({
+            "broadcast_id": broadcast_id,
+            "version": version,
+            "calls": [{"method": method, "params": params} for method, params in calls],
+        })
+        self.etag = f'"{broadcast_id}-{version}"'
+
+    def __len__(self) -> int:
+        return len(self.methods)
+
+    def request_body(self, index: int, chat_id: int) -> bytes:
+        return b'{"chat_id":' + str(int(chat_id)).encode() + b"," + self._params[index]
+
+
+def compile_send_plan(broadcast) -> SendPlan:
+    raw = broadcast.content
+    content = json.loads(raw) if isinstance(raw, (str, bytes)) else dict(raw or {})
+    return SendPlan(int(broadcast.id), int(broadcast.version or 1), build_send_calls(content))
+
+
+class SendPlanCache:
+    """LRU скомпилированных планов по (broadcast_id, version); старые версии вытесняются сами."""
+
+    def __init__(self, maxsize: int = _PLAN_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._items: OrderedDict[tuple[int, int], SendPlan] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, broadcast_id: int, version: int) -> SendPlan | None:
+        plan = self._items.get((broadcast_id, version))
+        if plan is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end((broadcast_id, version))
+        return plan
+
+    def put(self, plan: SendPlan) -> SendPlan:
+        key = (plan.broadcast_id, plan.version)
+        self._items[key] = plan
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+        return plan
+
+    def get_or_compile(self, broadcast) -> SendPlan:
+        plan = self.get(int(broadcast.id), int(broadcast.version or 1))
+        return plan if plan is not None else self.put(compile_send_plan(broadcast))
+
+
+send_plan_cache = SendPlanCache()
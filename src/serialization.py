@@ -0,0 +1,69 @@
+# src/serialization.py
+# commit: ORJSONResponse берём из fastapi.responses вместо своей копии
+
+"""
+Сериализация ответов без валидации на выходе.
+
+Обычный путь FastAPI для response_model: валидация возвращённого ORM-объекта
+(from_attributes), dump в python-объекты, json.dumps. Для списков это большая часть
+CPU запроса, хотя данные пришли из БД и уже имеют нужные типы.
+
+serializer(Model) один раз на схему строит TypeAdapter над TypedDict с теми же полями
+и аннотациями. На запросе поля забираются атрибутами у ORM-объекта (или из Core Row),
+а pydantic-core сразу пишет JSON-байты — формат (datetime, Optional и т.п.) тот же,
+что дал бы response_model. response_model в декораторе роута оставляем для OpenAPI:
+возвращённый Response FastAPI отдаёт как есть.
+
+ORJSONResponse из fastapi.responses — default_response_class приложения:
+всё, что идёт обычным путём, рендерится orjson (строки пишутся как есть, без
+ensure_ascii-экранирования; ключи-числа допускаются).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from functools import lru_cache
+from operator import attrgetter
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.engine import Row
+from typing_extensions import TypedDict
+
+
+class ResponseSerializer:
+    def __init__(self, model: type[BaseModel]) -> None:
+        self.model = model
+        self.fields = tuple(model.model_fields)
+        row_type = TypedDict(f"{model.__name__}Row", {name: f.annotation for name, f in model.model_fields.items()})
+        self._one = TypeAdapter(row_type)
+        self._many = TypeAdapter(list[row_type])
+        self._get = attrgetter(*self.fields)
+        self._single = len(self.fields) == 1
+
+    def row(self, obj) -> dict:
+        """Поля схемы из ORM-объекта, pydantic-модели или Core Row (колонки по именам полей)."""
+        if isinstance(obj, Row):
+            mapping = obj._mapping
+            return {name: mapping[name] for name in self.fields}
+        values = self._get(obj)
+        if self._single:
+            return {self.fields[0]: values}
+        return dict(zip(self.fields, values))
+
+    def dump(self, obj) -> bytes:
+        return self._one.dump_json(self.row(obj))
+
+    def dump_many(self, objs: Iterable) -> bytes:
+        return self._many.dump_json([self.row(obj) for obj in objs])
+
+    def response(self, obj, *, status_code: int = 200) -> Response:
+        return Response(self.dump(obj), status_code=status_code, media_type="application/json")
+
+    def response_many(self, objs: Iterable, *, status_code: int = 200) -> Response:
+        return Response(self.dump_many(objs), status_code=status_code, media_type="application/json")
+
+
+@lru_cache(maxsize=None)
+def serializer(model: type[BaseModel]) -> ResponseSerializer:
+    return ResponseSerializer(model)
@@ -0,0 +1,189 @@
+# src/sql_timing.py
+# commit: тайминг SQL по отпечаткам запросов, slow-query лог и сводка для Server-Timing
+
+"""
+Тайминг каждого SQL-оператора через события before/after_cursor_execute движка.
+
+- Время складывается по отпечатку (fingerprint) запроса: литералы → ?, списки
+  плейсхолдеров IN (...) и многострочные VALUES схлопываются, пробелы нормализуются.
+  Отпечаток кешируется по тексту оператора (SQLAlchemy отдаёт одни и те же строки
+  из кеша компиляции), так что на горячем пути это один dict.get.
+- Операторы дольше SQL_SLOW_MS пишутся в лог с «формой» параметров (имена и типы,
+  без значений; для executemany — число строк).
+- Сумма и число запросов за текущий HTTP-запрос копятся в контекстной переменной
+  (SQLAlchemy переносит контекст в свой greenlet) — GatewayMiddleware отдаёт их
+  в заголовке Server-Timing.
+- GET /debug/queries/top — самые дорогие отпечатки.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from src.config import settings
+
+logger = logging.getLogger("sql.slow")
+
+_OTHER = "<прочие отпечатки>"
+_FP_CACHE_SIZE = 4096
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*(?:(?:\?|%s|%\(\w+\)s|:\w+)\s*,\s*)+(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+_VALUES_RE = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\((?:[^()]|\([^()]*\))*\))+", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+_request_totals: ContextVar[list | None] = ContextVar("sql_request_totals", default=None)
+
+
+def fingerprint(statement: str) -> str:
+    fp = _STRING_RE.sub("?", statement)
+    fp = _NUMBER_RE.sub("?", fp)
+    fp = _SPACE_RE.sub(" ", fp).strip()
+    fp = _PLACEHOLDER_LIST_RE.sub("(...)", fp)
+    fp = _VALUES_RE.sub(r"\1", fp)
+    return fp
+
+
+def params_shape(parameters, executemany: bool) -> str:
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = params_shape(parameters[0], False) if parameters else "-"
+        return f"{len(parameters)} строк × {first}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return type(parameters).__name__
+
+
+class _FingerprintStats:
+    __slots__ = ("count", "total", "max", "example")
+
+    def __init__(self, example: str) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.example = example
+
+
+class QueryStats:
+    def __init__(self, *, slow_ms: float, max_fingerprints: int) -> None:
+        self.slow_sec = slow_ms / 1000
+        self.max_fingerprints = max_fingerprints
+        self._fp_cache: dict[str, str] = {}
+        self._stats: dict[str, _FingerprintStats] = {}
+        self.queries = 0
+        self.total = 0.0
+        self.slow = 0
+
+    def _fingerprint(self, statement: str) -> str:
+        fp = self._fp_cache.get(statement)
+        if fp is None:
+            fp = fingerprint(statement)
+            if len(self._fp_cache) >= _FP_CACHE_SIZE:
+                self._fp_cache.clear()
+            self._fp_cache[statement] = fp
+        return fp
+
+    def record(self, statement: str, parameters, executemany: bool, elapsed: float) -> None:
+        fp = self._fingerprint(statement)
+        stats = self._stats.get(fp)
+        if stats is None:
+            if len(self._stats) >= self.max_fingerprints:
+                fp = _OTHER
+                stats = self._stats.get(fp)
+            if stats is None:
+                stats = self._stats[fp] = _FingerprintStats(statement[:2000])
+        stats.count += 1
+        stats.total += elapsed
+        if elapsed > stats.max:
+            stats.max = elapsed
+        self.queries += 1
+        self.total += elapsed
+
+        totals = _request_totals.get()
+        if totals is not None:
+            totals[0] += 1
+            totals[1] += elapsed
+
+        if elapsed >= self.slow_sec:
+            self.slow += 1
+            logger.warning(
+                f"[slow-sql] {elapsed * 1000:.1f} мс | {fp[:500]} | params={params_shape(parameters, executemany)}"
+            )
+
+    def top(self, *, limit: int = 20, order: str = "total") -> list[dict]:
+        key = {
+            "total": lambda s: s.total,
+            "max": lambda s: s.max,
+            "count": lambda s: s.count,
+            "avg": lambda s: s.total / s.count if s.count else 0.0,
+        }[order]
+        ranked = sorted(self._stats.items(), key=lambda item: key(item[1]), reverse=True)[:limit]
+        return [
+            {
+                "fingerprint": fp,
+                "count": s.count,
+                "total_ms": round(s.total * 1000, 2),
+                "avg_ms": round(s.total * 1000 / s.count, 3) if s.count else 0.0,
+                "max_ms": round(s.max * 1000, 2),
+                "share": round(s.total / self.total, 4) if self.total else 0.0,
+                "example": s.example,
+            }
+            for fp, s in ranked
+        ]
+
+    def reset(self) -> None:
+        self._stats.clear()
+        self.queries = 0
+        self.total = 0.0
+        self.slow = 0
+
+    # ── события движка ──
+
+    def install(self, engine) -> None:
+        from sqlalchemy import event
+
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before)
+        event.listen(sync_engine, "after_cursor_execute", self._after)
+
+    @staticmethod
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("sql_timing_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        starts = conn.info.get("sql_timing_start")
+        if not starts:
+            return
+        self.record(statement, parameters, executemany, time.perf_counter() - starts.pop())
+
+    def stats(self) -> dict:
+        return {
+            "queries": self.queries,
+            "seconds_total": round(self.total, 6),
+            "slow": self.slow,
+            "fingerprints": len(self._stats),
+        }
+
+
+@contextmanager
+def request_queries():
+    """Счётчик [число запросов, секунды] SQL текущего HTTP-запроса."""
+    totals = [0, 0.0]
+    token = _request_totals.set(totals)
+    try:
+        yield totals
+    finally:
+        _request_totals.reset(token)
+
+
+def server_timing(totals: list) -> bytes:
+    return f'db;dur={totals[1] * 1000:.1f};desc="{totals[0]} queries"'.encode()
+
+
+query_stats = QueryStats(slow_ms=settings.SQL_SLOW_MS, max_fingerprints=settings.SQL_FINGERPRINTS_MAX)
@@ -0,0 +1,31 @@
+# tests/conftest.py
+# commit: фикстура run_db — сценарий на свежей SQLite в памяти в своём event loop
+
+import asyncio
+import os
+
+import pytest
+
+os.environ.setdefault("DB_BACKEND", "sqlite")
+for _name, _value in (
+    ("TELEGRAM_BOT_TOKEN", "test"), ("LOG_CHANNEL_ID", "0"), ("JWT_SECRET_KEY", "test"), ("API_KEY_VALUE", "test"),
+):
+    os.environ.setdefault(_name, _value)
+
+
+@pytest.fixture
+def run_db():
+    """run_db(scenario) — создаёт таблицы, выполняет корутину, закрывает пул (:memory: уходит вместе с ним)."""
+    from src.database import engine, init_db
+
+    def run(scenario):
+        async def wrapper():
+            await init_db()
+            try:
+                return await scenario()
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(wrapper())
+
+    return run
@@ -0,0 +1,150 @@
+# tests/test_ad_random_slots.py
+# commit: выключение/смена типа/переезд random-объявления снимает будущие слоты, расписание их не отдаёт
+
+from datetime import date, datetime, time
+
+from sqlalchemy import select, update
+
+from src import crud
+from src.ad_schedule import random_day_slots
+from src.database import AsyncSessionLocal
+from src.models import Ad, AdRandomBranch, AdRandomSlot
+
+DAY = date(2026, 10, 19)
+CHAT_ID = -1_001_000_000_000
+
+
+def test_dedupe_minute_ads_keep_their_own_minute():
+    slots = random_day_slots(
+        branch_id=1, day=DAY, window_from=time(10, 0), window_to=time(10, 5),
+        ad_ids=[1, 2, 3], spacing_min=1, shared_ad_ids=[10, 11, 12, 13, 14, 15, 16, 17],
+    )
+    assert set(slots) == {1, 2, 3, 10, 11, 12, 13, 14, 15, 16, 17}
+    dedupe = [slots[ad_id] for ad_id in (1, 2, 3)]
+    shared = [slots[ad_id] for ad_id in range(10, 18)]
+    assert len(set(dedupe)) == 3
+    assert not set(dedupe) & set(shared)
+    # восемь объявлений без dedupe_minute на три свободные минуты — совпадения допустимы
+    assert len(set(shared)) < len(shared)
+
+
+def test_dedupe_minute_layout_is_deterministic():
+    kwargs = dict(
+        branch_id=7, day=DAY, window_from=time(9, 0), window_to=time(21, 0),
+        ad_ids=[5, 3, 1], spacing_min=30, shared_ad_ids=[4, 2],
+    )
+    assert random_day_slots(**kwargs) == random_day_slots(**kwargs)
+
+
+async def _rebuild_after_move() -> tuple[list[tuple[int, int]], int, int]:
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            first = AdRandomBranch(
+                chat_id=CHAT_ID, thread_id=1, window_from=time(12, 0), window_to=time(18, 0), rebuild_time=time(8, 0),
+            )
+            second = AdRandomBranch(
+                chat_id=CHAT_ID, thread_id=2, window_from=time(12, 0), window_to=time(18, 0), rebuild_time=time(9, 0),
+            )
+            session.add_all([first, second])
+    async with AsyncSessionLocal() as session:
+        ad = await crud.create_ad(
+            session, title="moved", chat_id=CHAT_ID, thread_id=1, content_json={}, schedule_type="random",
+        )
+
+    async with AsyncSessionLocal() as session:
+        result = await crud.rebuild_random_branches(
+            session, now=datetime.combine(DAY, time(8, 30)), spacing_min=10, keep_days=7,
+        )
+        assert result == {"branches": 1, "slots": 1}
+
+    async with AsyncSessionLocal() as session:
+        await crud.update_ad(session, ad_id=ad.id, fields={"thread_id": 2})
+
+    # вторая ветка строится в тот же день, прежний слот объявления ещё лежит у первой
+    async with AsyncSessionLocal() as session:
+        result = await crud.rebuild_random_branches(
+            session, now=datetime.combine(DAY, time(9, 30)), spacing_min=10, keep_days=7,
+        )
+        assert result == {"branches": 1, "slots": 1}
+
+    async with AsyncSessionLocal() as session:
+        res = await session.execute(
+            select(AdRandomSlot.ad_id, AdRandomSlot.branch_id).where(AdRandomSlot.slot_date == DAY)
+        )
+        rows = [tuple(r) for r in res.all()]
+    return rows, ad.id, second.id
+
+
+def test_rebuild_replaces_slot_of_ad_moved_from_rebuilt_branch(run_db):
+    rows, ad_id, branch_id = run_db(_rebuild_after_move)
+    assert rows == [(ad_id, branch_id)]
+
+
+FUTURE_DAY = date(2099, 1, 1)
+
+
+async def _built_random_ad() -> int:
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            session.add(AdRandomBranch(
+                chat_id=CHAT_ID, thread_id=None, window_from=time(12, 0), window_to=time(18, 0), rebuild_time=time(8, 0),
+            ))
+    async with AsyncSessionLocal() as session:
+        ad = await crud.create_ad(session, title="r", chat_id=CHAT_ID, content_json={}, schedule_type="random")
+    async with AsyncSessionLocal() as session:
+        await crud.rebuild_random_branches(
+            session, now=datetime.combine(FUTURE_DAY, time(8, 30)), spacing_min=10, keep_days=7,
+        )
+    return ad.id
+
+
+async def _timetable() -> list[dict]:
+    async with AsyncSessionLocal() as session:
+        return await crud.list_random_slots(
+            session, since=datetime.combine(FUTURE_DAY, time(0)), until=datetime.combine(FUTURE_DAY, time(23, 59)),
+        )
+
+
+def _disable_or_switch(fields: dict):
+    async def scenario():
+        ad_id = await _built_random_ad()
+        before = await _timetable()
+        async with AsyncSessionLocal() as session:
+            ad = await crud.update_ad(session, ad_id=ad_id, fields=fields)
+        async with AsyncSessionLocal() as session:
+            res = await session.execute(select(AdRandomSlot.id).where(AdRandomSlot.ad_id == ad_id))
+            left = res.all()
+        return before, await _timetable(), left, ad
+
+    return scenario
+
+
+def test_disabled_random_ad_loses_future_slots(run_db):
+    before, after, left, ad = run_db(_disable_or_switch({"enabled": False}))
+    assert len(before) == 1
+    assert after == [] and left == []
+    assert ad.next_run_at is None
+
+
+def test_random_ad_switched_to_cron_loses_future_slots(run_db):
+    before, after, left, ad = run_db(_disable_or_switch({"schedule_type": "cron", "schedule_cron": "0 10 * * *"}))
+    assert len(before) == 1
+    assert after == [] and left == []
+    assert ad.next_run_at is not None  # уже по cron
+
+
+def test_moved_random_ad_loses_future_slots(run_db):
+    before, after, left, ad = run_db(_disable_or_switch({"thread_id": 5}))
+    assert len(before) == 1
+    assert after == [] and left == []
+
+
+def test_timetable_skips_slots_of_ads_disabled_outside_update_ad(run_db):
+    async def scenario():
+        ad_id = await _built_random_ad()
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                await session.execute(update(Ad).where(Ad.id == ad_id).values(enabled=False))
+        return await _timetable()
+
+    assert run_db(scenario) == []
@@ -0,0 +1,143 @@
+# tests/test_admission.py
+# commit: admission — чтения раньше записей, вытеснение записи, гонка таймаута с выдачей места, release при отмене
+
+import asyncio
+
+import pytest
+
+from src.admission import AdmissionController, Overloaded
+
+ROUTE = "/users/{user_id}"
+
+
+def _controller(**overrides) -> AdmissionController:
+    params = dict(max_inflight=1, route_limit=10, queue_size=10, max_wait=5.0, pool_capacity=10)
+    params.update(overrides)
+    return AdmissionController(**params)
+
+
+async def _queued(ctrl: AdmissionController, method: str, order: list | None = None) -> asyncio.Task:
+    """Запрос, вставший в очередь; при допуске пишет method в order."""
+
+    async def request():
+        await ctrl.acquire(ROUTE, method)
+        if order is not None:
+            order.append(method)
+
+    queued = ctrl.queued
+    task = asyncio.create_task(request())
+    while ctrl.queued == queued and not task.done():
+        await asyncio.sleep(0)
+    return task
+
+
+def test_reads_are_admitted_before_writes():
+    async def scenario():
+        ctrl = _controller()
+        assert await ctrl.acquire(ROUTE, "GET")
+        order: list[str] = []
+        write = await _queued(ctrl, "POST", order)
+        read = await _queued(ctrl, "GET", order)
+
+        ctrl.release(ROUTE)
+        await read
+        assert order == ["GET"] and not write.done()
+        ctrl.release(ROUTE)
+        await write
+        return order
+
+    assert asyncio.run(scenario()) == ["GET", "POST"]
+
+
+def test_read_evicts_last_write_when_queue_is_full():
+    async def scenario():
+        ctrl = _controller(queue_size=1)
+        assert await ctrl.acquire(ROUTE, "POST")
+        write = await _queued(ctrl, "POST")
+        read = await _queued(ctrl, "GET")
+
+        with pytest.raises(Overloaded) as exc_info:
+            await write
+        assert exc_info.value.reason == "queue_full"
+
+        # запись не вытесняет другую запись — отказ сразу
+        with pytest.raises(Overloaded):
+            await ctrl.acquire(ROUTE, "POST")
+
+        ctrl.release(ROUTE)
+        await read
+        return ctrl
+
+    ctrl = asyncio.run(scenario())
+    assert ctrl.shed_queue_full == 2
+    assert ctrl.inflight == 1
+
+
+def test_queue_timeout_sheds_and_drops_waiter():
+    async def scenario():
+        ctrl = _controller(max_wait=0.1)
+        assert await ctrl.acquire(ROUTE, "GET")
+        with pytest.raises(Overloaded) as exc_info:
+            await ctrl.acquire(ROUTE, "GET")
+        assert exc_info.value.reason == "timeout"
+        return ctrl
+
+    ctrl = asyncio.run(scenario())
+    assert (ctrl.queue_depth, ctrl.inflight, ctrl.shed_timeout) == (0, 1, 1)
+
+
+def test_slot_granted_at_timeout_is_kept(monkeypatch):
+    ctrl = _controller(max_wait=0.1)
+    wait_for = asyncio.wait_for
+
+    async def racing_wait_for(aw, timeout):
+        # место выдают в тот же момент, когда истекает таймаут
+        ctrl.release(ROUTE)
+        await asyncio.sleep(0)
+        aw.cancel()
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        assert await ctrl.acquire(ROUTE, "GET")
+        monkeypatch.setattr(asyncio, "wait_for", racing_wait_for)
+        try:
+            return await ctrl.acquire(ROUTE, "GET")
+        finally:
+            monkeypatch.setattr(asyncio, "wait_for", wait_for)
+
+    # shield: future не отменён таймаутом, выданное место засчитано, а не потеряно
+    assert asyncio.run(scenario()) is True
+    assert (ctrl.inflight, ctrl.shed_timeout, ctrl.queue_depth) == (1, 0, 0)
+
+
+def test_cancel_after_grant_releases_slot():
+    async def scenario():
+        ctrl = _controller()
+        assert await ctrl.acquire(ROUTE, "GET")
+        waiter = await _queued(ctrl, "GET")
+
+        # клиент ушёл в тот же момент, когда ему выдали место
+        waiter.cancel()
+        ctrl.release(ROUTE)
+        assert ctrl.inflight == 1
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return ctrl
+
+    ctrl = asyncio.run(scenario())
+    assert (ctrl.inflight, ctrl.queue_depth) == (0, 0)
+    assert ROUTE not in ctrl._route_inflight
+
+
+def test_cancel_in_queue_drops_waiter():
+    async def scenario():
+        ctrl = _controller()
+        assert await ctrl.acquire(ROUTE, "GET")
+        waiter = await _queued(ctrl, "POST")
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return ctrl
+
+    ctrl = asyncio.run(scenario())
+    assert (ctrl.inflight, ctrl.queue_depth) == (1, 0)
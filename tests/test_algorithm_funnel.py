@@ -0,0 +1,90 @@
+# tests/test_algorithm_funnel.py
+# commit: счётчики воронки в БД — дельты set_*/батча коалесера/удаления и сверка дрейфа
+
+from sqlalchemy import delete
+
+from src import crud
+from src.crud.algorithm_progress import _upsert_progress_batch
+from src.database import AsyncSessionLocal
+from src.models import UserAlgorithmProgress
+
+USERS = [700_000_001, 700_000_002, 700_000_003]
+
+
+async def _seed_users() -> None:
+    async with AsyncSessionLocal() as session:
+        for user_id in USERS:
+            await crud.upsert_user(session, id=user_id, username=None, full_name=str(user_id))
+
+
+async def _snapshot() -> dict:
+    async with AsyncSessionLocal() as session:
+        return await crud.load_funnel_snapshot(session)
+
+
+def test_set_calls_move_counters_in_db(run_db):
+    async def scenario():
+        await _seed_users()
+        async with AsyncSessionLocal() as session:
+            await crud.set_user_step(session, user_id=USERS[0], step=2)
+            await crud.set_user_step(session, user_id=USERS[1], step=2)
+            await crud.set_basic_completed(session, user_id=USERS[1], completed=True)
+            await crud.set_user_step(session, user_id=USERS[0], step=3)
+            await crud.set_advanced_completed(session, user_id=USERS[2], completed=True)
+        first = await _snapshot()
+        async with AsyncSessionLocal() as session:
+            await crud.clear_user_data(session, user_id=USERS[2])
+        return first, await _snapshot()
+
+    first, after_clear = run_db(scenario)
+    assert first["total"] == 3
+    assert first["steps"] == {0: 1, 2: 1, 3: 1}
+    assert (first["basic_completed"], first["advanced_completed"]) == (1, 1)
+    assert after_clear["total"] == 2
+    assert after_clear["steps"] == {2: 1, 3: 1}
+    assert after_clear["advanced_completed"] == 0
+
+
+def test_coalescer_batch_counts_created_and_updated_rows(run_db):
+    async def scenario():
+        await _seed_users()
+        async with AsyncSessionLocal() as session:
+            await crud.set_user_step(session, user_id=USERS[0], step=1)
+        async with AsyncSessionLocal() as session:
+            written = await _upsert_progress_batch(session, {
+                USERS[0]: {"current_step": 4, "basic_completed": True},
+                USERS[1]: {"current_step": 4},
+                999_999_999: {"current_step": 1},  # нет в users — строка отбрасывается
+            })
+        return written, await _snapshot()
+
+    written, snapshot = run_db(scenario)
+    assert written == 2
+    assert snapshot["total"] == 2
+    assert snapshot["steps"] == {4: 2}
+    assert snapshot["basic_completed"] == 1
+
+
+def test_reconcile_fixes_drift_and_is_idempotent(run_db):
+    async def scenario():
+        await _seed_users()
+        async with AsyncSessionLocal() as session:
+            for user_id in USERS:
+                await crud.set_basic_completed(session, user_id=user_id, completed=True)
+        # мимо crud (каскад, ручная правка) — счётчики о ней не знают
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                await session.execute(delete(UserAlgorithmProgress).where(UserAlgorithmProgress.user_id == USERS[0]))
+        stale = await _snapshot()
+        async with AsyncSessionLocal() as session:
+            drift = await crud.reconcile_funnel(session)
+        async with AsyncSessionLocal() as session:
+            again = await crud.reconcile_funnel(session)
+        return stale, drift, again, await _snapshot()
+
+    stale, drift, again, fixed = run_db(scenario)
+    assert stale["total"] == 3
+    assert drift == {"total": -1, "step:0": -1, "basic": -1}
+    assert again == {}
+    assert fixed["total"] == 2 and fixed["basic_completed"] == 2
+    assert fixed["reconciled_at"] is not None
@@ -0,0 +1,94 @@
+# tests/test_broadcast_progress.py
+# commit: claimed_count ведётся claim/report/reaper и совпадает с фактическим числом арендованных строк
+
+from sqlalchemy import func, select
+
+from src import crud
+from src.database import AsyncSessionLocal
+from src.models import BroadcastDelivery
+
+USERS = (600_000_001, 600_000_002, 600_000_003, 600_000_004)
+
+
+async def _broadcast_with_deliveries() -> int:
+    async with AsyncSessionLocal() as session:
+        for user_id in USERS:
+            await crud.upsert_user(session, id=user_id, username=None, full_name=f"u{user_id}")
+    async with AsyncSessionLocal() as session:
+        broadcast = await crud.create_broadcast(session, kind="meetings", title="m", content={"text": "hi"})
+    async with AsyncSessionLocal() as session:
+        await crud.add_broadcast_target(session, broadcast_id=broadcast.id, type_="kind", kind="meetings")
+    async with AsyncSessionLocal() as session:
+        await crud.materialize_broadcast(session, broadcast_id=broadcast.id, chunk_size=10)
+    return broadcast.id
+
+
+async def _progress(broadcast_id: int) -> dict:
+    async with AsyncSessionLocal() as session:
+        progress = await crud.load_broadcast_progress(session, broadcast_id=broadcast_id)
+        actual = (
+            await session.execute(
+                select(func.count())
+                .select_from(BroadcastDelivery)
+                .where(BroadcastDelivery.broadcast_id == broadcast_id, BroadcastDelivery.status == "claimed")
+            )
+        ).scalar_one()
+    assert progress["claimed"] == actual
+    return progress
+
+
+def test_claimed_count_follows_claim_report_and_reaper(run_db):
+    async def scenario():
+        broadcast_id = await _broadcast_with_deliveries()
+        async with AsyncSessionLocal() as session:
+            # аренда уже истекла — её подберёт reaper
+            claim = await crud.claim_deliveries(session, broadcast_id=broadcast_id, n=2, lease_seconds=-60)
+        assert await _progress(broadcast_id) == {
+            "broadcast_id": broadcast_id, "status": "draft", "total": 4,
+            "pending": 2, "claimed": 2, "sent": 0, "failed": 0, "skipped": 0,
+        }
+
+        claimed_id = claim["items"][0]["id"]
+        async with AsyncSessionLocal() as session:
+            res = await session.execute(
+                select(BroadcastDelivery.id).where(
+                    BroadcastDelivery.broadcast_id == broadcast_id, BroadcastDelivery.status == "pending"
+                )
+            )
+            pending_id = res.scalars().first()
+        results = [
+            {"id": claimed_id, "status": "sent"},
+            # строка не арендовалась: отчёт применяется, но аренду не уменьшает
+            {"id": pending_id, "status": "failed", "error_code": "400"},
+        ]
+        async with AsyncSessionLocal() as session:
+            report = await crud.report_deliveries(session, broadcast_id=broadcast_id, results=results, chunk_size=10)
+        assert report["released"] == 1
+        progress = await _progress(broadcast_id)
+        assert (progress["pending"], progress["claimed"], progress["sent"], progress["failed"]) == (1, 1, 1, 1)
+
+        async with AsyncSessionLocal() as session:
+            again = await crud.report_deliveries(session, broadcast_id=broadcast_id, results=results, chunk_size=10)
+        assert again["released"] == 0 and again["ignored"] == 2
+
+        async with AsyncSessionLocal() as session:
+            reaped = await crud.reap_expired_leases(session, max_attempts=5)
+        assert reaped == {"requeued": 1, "failed": 0}
+        progress = await _progress(broadcast_id)
+        assert (progress["pending"], progress["claimed"]) == (2, 0)
+
+    run_db(scenario)
+
+
+def test_reaper_fails_exhausted_leases(run_db):
+    async def scenario():
+        broadcast_id = await _broadcast_with_deliveries()
+        async with AsyncSessionLocal() as session:
+            await crud.claim_deliveries(session, broadcast_id=broadcast_id, n=3, lease_seconds=-60)
+        async with AsyncSessionLocal() as session:
+            reaped = await crud.reap_expired_leases(session, max_attempts=1)
+        assert reaped == {"requeued": 0, "failed": 3}
+        progress = await _progress(broadcast_id)
+        assert (progress["pending"], progress["claimed"], progress["failed"]) == (1, 0, 3)
+
+    run_db(scenario)
@@ -0,0 +1,225 @@
+# tests/test_db_retry.py
+# commit: retry_db — breaker и пробный вызов, бюджет ретраев, дедлайн, повтор только самого внешнего вызова
+
+import asyncio
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src import db_retry
+from src.db_retry import (
+    CircuitBreaker,
+    DatabaseUnavailable,
+    RetryBudget,
+    RetryPolicy,
+    request_deadline,
+    retry_db,
+)
+
+OPEN_SEC = 0.05
+
+
+def _db_error(code: int, message: str) -> OperationalError:
+    return OperationalError("SELECT 1", {}, Exception(code, message))
+
+
+def _deadlock() -> OperationalError:
+    return _db_error(1213, "Deadlock found when trying to get lock")
+
+
+def _server_lost() -> OperationalError:
+    return _db_error(2013, "Lost connection to MySQL server during query")
+
+
+@pytest.fixture
+def policy(monkeypatch):
+    """Политика с мгновенными паузами вместо глобальной db_retry_policy."""
+    p = RetryPolicy(
+        max_attempts=4,
+        base_delay=0.0,
+        max_delay=0.0,
+        default_deadline=30.0,
+        budget=RetryBudget(rate=0.0, burst=100),
+        breaker=CircuitBreaker(threshold=3, open_sec=OPEN_SEC),
+    )
+    monkeypatch.setattr(db_retry, "db_retry_policy", p)
+    return p
+
+
+class FakeSession:
+    def __init__(self, in_transaction: bool = False) -> None:
+        self._in_transaction = in_transaction
+        self.rollbacks = 0
+
+    def in_transaction(self) -> bool:
+        return self._in_transaction
+
+    async def rollback(self) -> None:
+        self.rollbacks += 1
+
+
+def _flaky(errors: list[Exception]):
+    """retry_db-функция: падает ошибками из errors по очереди, потом возвращает "ok"."""
+    calls = []
+
+    @retry_db
+    async def op(session=None):
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    return op, calls
+
+
+def test_lock_error_is_retried(policy):
+    op, calls = _flaky([_deadlock(), _deadlock()])
+
+    assert asyncio.run(op()) == "ok"
+    assert len(calls) == 3
+    assert policy.retries == 2
+
+
+def test_non_retriable_error_raises_immediately(policy):
+    op, calls = _flaky([ValueError("bad input")])
+
+    with pytest.raises(ValueError):
+        asyncio.run(op())
+    assert len(calls) == 1
+
+
+def test_only_outermost_call_retries(policy):
+    inner_calls = []
+    outer_calls = []
+    errors = [_deadlock()]
+
+    @retry_db
+    async def inner(session=None):
+        inner_calls.append(1)
+        if errors:
+            raise errors.pop(0)
+
+    @retry_db
+    async def outer(session=None):
+        outer_calls.append(1)
+        await inner()
+        return "ok"
+
+    assert asyncio.run(outer()) == "ok"
+    # вложенный вызов не ретраит сам: повторяется вся внешняя операция
+    assert (len(outer_calls), len(inner_calls)) == (2, 2)
+    assert policy.retries == 1
+
+
+def test_foreign_transaction_is_not_retried(policy):
+    op, calls = _flaky([_deadlock()])
+    session = FakeSession(in_transaction=True)
+
+    with pytest.raises(OperationalError):
+        asyncio.run(op(session))
+    assert len(calls) == 1
+    assert session.rollbacks == 0
+
+
+def test_budget_limits_retries(policy):
+    policy.budget = RetryBudget(rate=0.0, burst=1)
+    op, calls = _flaky([_deadlock()] * 5)
+
+    with pytest.raises(OperationalError):
+        asyncio.run(op())
+    # единственный токен потрачен на первый повтор, второй уже не разрешён
+    assert len(calls) == 2
+    assert policy.budget_exhausted == 1
+
+
+def test_request_deadline_stops_retries(policy, monkeypatch):
+    monkeypatch.setattr(policy, "backoff", lambda attempt: 1.0)
+    op, calls = _flaky([_deadlock()] * 5)
+
+    async def scenario():
+        with request_deadline(0.5):
+            await op()
+
+    with pytest.raises(OperationalError):
+        asyncio.run(scenario())
+    assert len(calls) == 1
+    assert policy.deadline_exceeded == 1
+
+
+def test_default_deadline_outside_request(policy, monkeypatch):
+    monkeypatch.setattr(policy, "backoff", lambda attempt: 1.0)
+    policy.default_deadline = 0.5
+    op, calls = _flaky([_deadlock()] * 5)
+
+    with pytest.raises(OperationalError):
+        asyncio.run(op())
+    assert len(calls) == 1
+    assert policy.deadline_exceeded == 1
+
+
+def test_breaker_opens_and_rejects_without_calling(policy):
+    op, calls = _flaky([_server_lost()] * 3)
+
+    with pytest.raises(OperationalError):
+        asyncio.run(op())
+    assert policy.breaker.state == CircuitBreaker.OPEN
+    # при открытом breaker повторы прекращаются сразу
+    assert len(calls) == 3
+
+    with pytest.raises(DatabaseUnavailable) as exc_info:
+        asyncio.run(op())
+    assert exc_info.value.retry_after >= 1
+    assert len(calls) == 3
+    assert policy.breaker.rejected == 1
+
+
+def test_half_open_lets_a_single_probe_through(policy):
+    policy.breaker.threshold = 1
+    op, calls = _flaky([_server_lost()])
+    with pytest.raises(OperationalError):
+        asyncio.run(op())
+    assert policy.breaker.state == CircuitBreaker.OPEN
+
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    @retry_db
+    async def slow_probe(session=None):
+        started.set()
+        await release.wait()
+        return "probe"
+
+    async def scenario():
+        await asyncio.sleep(OPEN_SEC)
+        probe = asyncio.create_task(slow_probe())
+        await started.wait()
+        assert policy.breaker.state == CircuitBreaker.HALF_OPEN
+        # пока пробный вызов в работе, остальные отклоняются
+        with pytest.raises(DatabaseUnavailable):
+            await op()
+        release.set()
+        return await probe
+
+    assert asyncio.run(scenario()) == "probe"
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+    assert asyncio.run(op()) == "ok"
+
+
+def test_failed_probe_reopens_breaker(policy):
+    policy.breaker.threshold = 1
+    op, calls = _flaky([_server_lost(), _server_lost()])
+    with pytest.raises(OperationalError):
+        asyncio.run(op())
+
+    async def probe_after_open():
+        await asyncio.sleep(OPEN_SEC)
+        await op()
+
+    with pytest.raises(OperationalError):
+        asyncio.run(probe_after_open())
+    # пробный вызов не ретраится: breaker снова открыт
+    assert len(calls) == 2
+    assert policy.breaker.state == CircuitBreaker.OPEN
+    assert policy.breaker.opened_total == 2
+    with pytest.raises(DatabaseUnavailable):
+        asyncio.run(op())
@@ -0,0 +1,100 @@
+# tests/test_dispatcher.py
+# commit: глобальный лимит без всплеска на старте; таймаут чтения после отправки не возвращает доставку в очередь
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from src.dispatcher.ratelimit import RateLimiter
+from src.dispatcher.transport import FakeTransport, TelegramError, TelegramTransport, transport_error
+from src.dispatcher.worker import Dispatcher
+from src.send_plan import SendPlan
+
+
+class LossyTransport(FakeTransport):
+    """FakeTransport, у которого первый вызов обрывается сетевой ошибкой error."""
+
+    def __init__(self, error: httpx.HTTPError, *, delivered: bool) -> None:
+        super().__init__(latency_ms=0, global_rps=1000)
+        self.error = error
+        self.delivered = delivered
+        self.failed = False
+
+    async def call(self, method: str, payload: dict) -> dict:
+        if not self.failed:
+            self.failed = True
+            if self.delivered:
+                # сообщение принято Telegram, ответ потерян по дороге
+                await super().call(method, payload)
+            raise transport_error(self.error)
+        return await super().call(method, payload)
+
+
+def _plan() -> SendPlan:
+    return SendPlan(1, 1, [("sendMessage", {"text": "привет"})])
+
+
+def _deliver(transport: FakeTransport) -> dict:
+    dispatcher = Dispatcher(transport, worker_id="test")
+    return asyncio.run(dispatcher._deliver(_plan(), {"id": 7, "user_id": 42, "attempts": 0}))
+
+
+def test_global_bucket_has_no_startup_burst():
+    limiter = RateLimiter(global_rate=50, per_chat_rate=1000)
+
+    async def scenario():
+        t0 = time.monotonic()
+        for _ in range(10):
+            await limiter.global_bucket.acquire()
+        return time.monotonic() - t0
+
+    # 10 токенов при 50/с — не быстрее 0.2 с, даже на старте
+    assert asyncio.run(scenario()) >= 10 / 50 - 0.01
+
+
+def test_read_timeout_is_not_requeued():
+    transport = LossyTransport(httpx.ReadTimeout("timed out"), delivered=True)
+
+    result = _deliver(transport)
+
+    assert transport.calls == 1
+    assert result["status"] == "failed"
+    assert result["error_code"] == "unknown"
+
+
+def test_connect_error_stays_retryable():
+    transport = LossyTransport(httpx.ConnectError("connection refused"), delivered=False)
+
+    result = _deliver(transport)
+
+    assert transport.calls == 0
+    assert result["status"] == "pending"
+    assert _deliver(transport)["status"] == "sent"
+
+
+@pytest.mark.parametrize(
+    "error, unknown",
+    [
+        (httpx.ReadTimeout("timed out"), True),
+        (httpx.RemoteProtocolError("server disconnected"), True),
+        (httpx.ConnectTimeout("timed out"), False),
+        (httpx.ConnectError("connection refused"), False),
+    ],
+)
+def test_telegram_transport_maps_network_errors(error, unknown):
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise error
+
+    async def scenario():
+        transport = TelegramTransport("123:test", http_transport=httpx.MockTransport(handler))
+        try:
+            await transport.call("sendMessage", {"chat_id": 1, "text": "x"})
+        finally:
+            await transport.close()
+
+    with pytest.raises(TelegramError) as exc_info:
+        asyncio.run(scenario())
+    assert exc_info.value.error_code == 0
+    assert exc_info.value.delivery_unknown is unknown
@@ -0,0 +1,59 @@
+# tests/test_ip_blocklist.py
+# commit: адрес доверенного прокси и allowlist никогда не банятся
+
+from src.ip_blocklist import ScannerBlocklist
+
+PROXY = "10.0.0.5"
+SCANNER = "203.0.113.7"
+
+
+def _blocklist(**kwargs) -> ScannerBlocklist:
+    params = dict(
+        threshold=3, window_sec=60, ban_sec=900,
+        trusted_proxies=PROXY, allowlist="127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7",
+    )
+    params.update(kwargs)
+    return ScannerBlocklist(**params)
+
+
+def _scope(peer: str, headers: list[tuple[bytes, bytes]] = ()) -> dict:
+    return {"type": "http", "client": (peer, 40000), "headers": list(headers)}
+
+
+def test_proxy_without_forwarded_headers_is_never_banned():
+    blocklist = _blocklist()
+    ip = blocklist.client_ip(_scope(PROXY))
+    assert ip == PROXY
+
+    for i in range(100):
+        assert blocklist.record_junk(ip, now=float(i)) is False
+    assert blocklist.is_banned(ip, now=100.0) is False
+    assert blocklist.stats()["banned_now"] == 0
+    assert blocklist.stats()["junk_hits"] == 0
+
+
+def test_proxy_outside_allowlist_is_still_exempt():
+    blocklist = _blocklist(trusted_proxies="198.51.100.10", allowlist="")
+    for i in range(100):
+        assert blocklist.record_junk("198.51.100.10", now=float(i)) is False
+    assert blocklist.is_banned("198.51.100.10", now=100.0) is False
+
+
+def test_client_behind_proxy_is_banned_but_proxy_is_not():
+    blocklist = _blocklist()
+    ip = blocklist.client_ip(_scope(PROXY, [(b"x-forwarded-for", f"{SCANNER}, {PROXY}".encode())]))
+    assert ip == SCANNER
+
+    banned = [blocklist.record_junk(ip, now=float(i)) for i in range(3)]
+    assert banned[-1] is True
+    assert blocklist.is_banned(SCANNER, now=10.0) is True
+    assert blocklist.is_banned(PROXY, now=10.0) is False
+
+
+def test_private_and_loopback_addresses_are_exempt():
+    blocklist = _blocklist(trusted_proxies="")
+    for ip in ("127.0.0.1", "::1", "192.168.1.20", "172.20.0.3", "fd00::1"):
+        for i in range(10):
+            assert blocklist.record_junk(ip, now=float(i)) is False
+        assert blocklist.is_banned(ip, now=10.0) is False
+    assert blocklist.stats()["exempt_hits"] == 50
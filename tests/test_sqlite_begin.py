@@ -0,0 +1,30 @@
+# tests/test_sqlite_begin.py
+# commit: на SQLite BEGIN IMMEDIATE только у пишущих транзакций, чтения — DEFERRED
+
+from sqlalchemy import event
+
+from src import crud
+from src.database import AsyncSessionLocal, engine
+
+
+def test_reads_defer_and_writes_take_write_lock(run_db):
+    begins: list[str] = []
+
+    def capture(conn, cursor, statement, *args):
+        if statement.startswith("BEGIN"):
+            begins.append(statement)
+
+    async def scenario():
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            async with AsyncSessionLocal() as session:
+                await crud.upsert_user(session, id=1, username="u", full_name="U")
+            async with AsyncSessionLocal() as session:
+                await crud.get_user(session, id=1)
+            async with AsyncSessionLocal() as session:
+                await crud.set_user_step(session, user_id=1, step=1)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    run_db(scenario)
+    assert begins == ["BEGIN IMMEDIATE", "BEGIN", "BEGIN IMMEDIATE"]
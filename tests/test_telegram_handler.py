@@ -0,0 +1,119 @@
+# tests/test_telegram_handler.py
+# commit: TelegramHandler против локального медленного fake Bot API — emit не ждёт сеть, переполнение и «×N»
+
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.logger import TelegramHandler
+
+DELAY = 0.5
+
+
+def _fake_bot_api(delay: float):
+    """Класс обработчика со своим состоянием: задержка ответа, принятые тексты, событие первого запроса."""
+
+    class FakeBotAPI(BaseHTTPRequestHandler):
+        texts: list[str] = []
+        received = threading.Event()
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            type(self).received.set()
+            time.sleep(delay)
+            type(self).texts.append(body.get("text", ""))
+            raw = json.dumps({"ok": True, "result": {}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, *args):
+            pass
+
+    return FakeBotAPI
+
+
+@pytest.fixture
+def bot_api():
+    api = _fake_bot_api(DELAY)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), api)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api.base = f"http://127.0.0.1:{server.server_address[1]}"
+    yield api
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def make_logger():
+    handlers = []
+
+    def make(api, **kwargs):
+        handler = TelegramHandler("123:test", -100, api_base=api.base, rate_per_min=1000, **kwargs)
+        handler.setFormatter(logging.Formatter("%(levelname)s - %(message)s"))
+        log = logging.getLogger(f"test.telegram.{len(handlers)}")
+        log.propagate = False
+        log.addHandler(handler)
+        handlers.append((log, handler))
+        return log, handler
+
+    yield make
+    for log, handler in handlers:
+        log.removeHandler(handler)
+        handler.close()
+
+
+def _log_error(log, i: int = 0) -> None:
+    try:
+        raise RuntimeError(f"broken request #{i}")
+    except RuntimeError:
+        log.error("ошибка обработки запроса", exc_info=True)
+
+
+def test_emit_does_not_wait_for_slow_api(bot_api, make_logger):
+    log, handler = make_logger(bot_api, queue_size=1000, flush_interval=0.05)
+
+    timings = []
+    for i in range(200):
+        t0 = time.perf_counter()
+        _log_error(log, i % 3)
+        timings.append(time.perf_counter() - t0)
+        if i == 0:
+            # фоновый поток уже висит в запросе к серверу, который отвечает через DELAY
+            assert bot_api.received.wait(2.0)
+
+    assert max(timings) < DELAY / 5
+    assert sum(timings) < DELAY
+
+
+def test_overflow_is_counted_and_reported(bot_api, make_logger):
+    log, handler = make_logger(bot_api, queue_size=5, flush_interval=0.05)
+
+    _log_error(log)
+    assert bot_api.received.wait(2.0)
+    # фоновый поток ждёт ответа: очередь вмещает 5 записей, остальные 7 отбрасываются
+    for i in range(12):
+        _log_error(log, i)
+    assert handler.dropped == 7
+
+    handler.close()
+    assert handler.dropped == 0
+    assert any("пропущено записей: 7" in text for text in bot_api.texts)
+
+
+def test_duplicates_collapse_into_one_entry(bot_api, make_logger):
+    log, handler = make_logger(bot_api, queue_size=100, flush_interval=0.2)
+
+    for _ in range(5):
+        _log_error(log)
+    handler.close()
+
+    assert len(bot_api.texts) == 1
+    assert bot_api.texts[0].count("broken request #0") == 1
+    assert "[×5]" in bot_api.texts[0]
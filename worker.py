@@ -0,0 +1,19 @@
+# worker.py
+# commit: точка входа диспетчера рассылок — запускается рядом с main:app (python worker.py)
+
+import asyncio
+
+import src.logger  # noqa: F401  (конфиг логгера и TelegramHandler)
+from src.database import engine
+from src.dispatcher import run_dispatcher
+
+
+async def main() -> None:
+    try:
+        await run_dispatcher()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())